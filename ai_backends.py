@@ -0,0 +1,199 @@
+"""
+Pluggable backends for the coach/TTS stack: translation, chat and speech.
+
+    OpenAIBackend  — the hosted models, through the shared pooled upstream client
+    LocalBackend   — no network: memoized/identity translation, templated cue replies,
+                     prerecorded cue clips from static/assets/cues/ or espeak, else silence
+
+DOACH_AI_BACKEND=openai|local|auto picks one (auto = local when OPENAI_API_KEY is unset),
+so load tests and gyms with flaky connectivity can run the whole coaching loop locally.
+
+Speech returns a requests.Response-like object (status_code, iter_content, text, json)
+so callers stream and cache it the same way regardless of backend.
+"""
+import io
+import os
+import re
+import json
+import wave
+import shutil
+import subprocess
+from pathlib import Path
+
+from translation_memo import parse_json_list
+
+CUE_CLIPS_DIR = Path("static") / "assets" / "cues"
+
+
+class OpenAIBackend:
+    name = "openai"
+    tts_model = "gpt-4o-mini-tts"
+    local = False
+
+    def __init__(self, upstream, lang_names=None):
+        self.upstream = upstream
+        self.lang_names = lang_names or {}
+
+    def translate(self, text, lang_code):
+        target = self.lang_names.get(lang_code, lang_code)
+        if lang_code.startswith("en-"):
+            system = (f"Convert the user's text to {target} with appropriate spelling/phrasing. "
+                      "ONLY return the converted text.")
+        else:
+            system = (f"Translate the user's text to {target}. Keep names/numbers. Natural for speech. "
+                      "ONLY return the translation.")
+        resp = self.upstream.chat(
+            model="gpt-4o-mini",
+            messages=[{"role": "system", "content": system},
+                      {"role": "user", "content": text}],
+            temperature=0.2,
+        )
+        # None on an empty reply, so the memo doesn't store the source text as its translation
+        return (resp.choices[0].message.content or "").strip() or None
+
+    def translate_batch(self, texts, lang_code):
+        """One chat call for a whole list of cues (used to prewarm the memo)."""
+        target = self.lang_names.get(lang_code, lang_code)
+        verb = "Convert" if lang_code.startswith("en-") else "Translate"
+        system = (f"{verb} each string in the user's JSON array to {target}. Natural for speech; keep names/numbers. "
+                  "Return ONLY a JSON array of strings, same length and order.")
+        resp = self.upstream.chat(
+            model="gpt-4o-mini",
+            messages=[{"role": "system", "content": system},
+                      {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}],
+            temperature=0.2,
+        )
+        return parse_json_list(resp.choices[0].message.content, len(texts))
+
+    def complete(self, msgs, model, temperature=0.6, shot=None):
+        resp = self.upstream.chat(model=model, messages=msgs, temperature=temperature)
+        return (resp.choices[0].message.content or "").strip()
+
+    def stream(self, msgs, model, temperature=0.6, shot=None):
+        for chunk in self.upstream.chat(model=model, messages=msgs, temperature=temperature, stream=True):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    def speech(self, text, voice):
+        return self.upstream.speech(text, voice, self.tts_model)
+
+
+class _AudioBytes:
+    """Minimal requests.Response stand-in for locally produced audio."""
+
+    status_code = 200
+
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self.text = ""
+
+    def iter_content(self, size=8192):
+        for i in range(0, len(self.data), size):
+            yield self.data[i:i + size]
+
+    def json(self):
+        return {}
+
+
+# miss side / metric → cue (same wording coachAssistant.js uses, so prerecorded clips line up)
+LOCAL_CUES = {
+    "left": "Square both toes to the rim.",
+    "right": "Square both toes to the rim.",
+    "short": "Add more knee bend to generate power.",
+    "flat": "Entry angle is flat — add arc.",
+    "long": "Entry angle is steep — soften the arc.",
+    "miss": "Hold your follow-through for a count.",
+    "make": "Lock that in.",
+}
+LOCAL_KEYWORD_CUES = [
+    ("arc", "Lift the arc slightly (more upward energy)."),
+    ("elbow", "Keep your elbow under the ball."),
+    ("wrist", "Snap the wrist high — finish above the elbow."),
+    ("feet", "Square both toes to the rim."),
+    ("stance", "Open your base a touch for balance."),
+    ("knee", "Add more knee bend to generate power."),
+    ("release", "Release above your shoulder line."),
+]
+
+
+class LocalBackend:
+    name = "local"
+    tts_model = "local"
+    local = True
+
+    def __init__(self, translation_memo=None, clips_dir=CUE_CLIPS_DIR):
+        self.memo = translation_memo
+        self.clips_dir = Path(clips_dir)
+        self.espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def translate(self, text, lang_code):
+        # Only what the memo already knows (prewarmed cues); otherwise speak the original
+        if self.memo is not None:
+            hit = self.memo.peek(text, lang_code)
+            if hit:
+                return hit
+        return text
+
+    def translate_batch(self, texts, lang_code):
+        return [self.translate(t, lang_code) for t in texts]
+
+    def complete(self, msgs, model=None, temperature=None, shot=None):
+        from coach_cache import miss_side
+
+        if isinstance(shot, dict):
+            side = miss_side(shot)
+            opener = "Nice make." if side == "make" else "Close."
+            cue = LOCAL_CUES.get(side, LOCAL_CUES["miss"])
+            entry = shot.get("entryAngle")
+            if side != "make" and isinstance(entry, (int, float)) and entry and entry < 44:
+                cue = LOCAL_CUES["flat"]
+            return f"{opener} Quick cue: {cue}"
+
+        prompt = (msgs[-1]["content"] if msgs else "").lower()
+        for word, cue in LOCAL_KEYWORD_CUES:
+            if word in prompt:
+                return cue
+        return "Hold your follow-through for a count."
+
+    def stream(self, msgs, model=None, temperature=None, shot=None):
+        for word in re.findall(r"\S+\s*", self.complete(msgs, model, temperature, shot)):
+            yield word
+
+    def _clip_for(self, text):
+        slug = re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+        for ext in (".mp3", ".wav"):
+            p = self.clips_dir / f"{slug}{ext}"
+            if p.exists():
+                return p
+        return None
+
+    def speech(self, text, voice):
+        clip = self._clip_for(text)
+        if clip:
+            return _AudioBytes(clip.read_bytes(), "audio/mpeg" if clip.suffix == ".mp3" else "audio/wav")
+        if self.espeak:
+            try:
+                out = subprocess.run([self.espeak, "--stdout", text], capture_output=True, timeout=10, check=True)
+                if out.stdout:
+                    return _AudioBytes(out.stdout, "audio/wav")
+            except Exception as e:
+                print(f"⚠️ espeak failed: {e}")
+        return _AudioBytes(silent_wav(0.3), "audio/wav")
+
+
+def silent_wav(seconds, sr=24000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sr)
+        wf.writeframes(b"\x00\x00" * int(sr * seconds))
+    return buf.getvalue()
+
+
+def get_backend(upstream, translation_memo=None, lang_names=None):
+    choice = os.getenv("DOACH_AI_BACKEND", "auto").lower()
+    if choice == "local" or (choice == "auto" and not upstream.has_key()):
+        print("🧩 AI backend: local (offline cues + local speech)")
+        return LocalBackend(translation_memo)
+    return OpenAIBackend(upstream, lang_names)
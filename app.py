@@ -1,31 +1,55 @@
 # Unified DOACH app.py — optimized for dual model use, cleaned init, and removed /detect_video_init
 
-from flask import Flask, request, Response, jsonify, send_from_directory, send_file
+from flask import Flask, request, Response, jsonify, send_from_directory, send_file, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import numpy as np
-import requests
 import cv2
 import os
 import torch
 from ultralytics.nn.tasks import DetectionModel
 from ultralytics import YOLO
 import base64
-from openai import OpenAI
-from dotenv import load_dotenv
 import traceback
 import re
 import shutil
-import subprocess
 import json
 from pathlib import Path
-import io
-import wave
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from training_jobs import TrainingJobManager, publish_weights, published_weights
+from benchmark_model import run_gate
+from tts_cache import AudioCache, cache_key, mp3_frames
+from upstream import get_upstream
+from translation_memo import TranslationMemo, COACHING_CUES
+from text_chunks import SentenceChunker, split_sentences
+from coach_cache import CoachCache, shot_signature, signature_key
+from preset_store import PresetStore, DEFAULT_NAMESPACE
+from ai_backends import get_backend
+from video_catalog import VideoCatalog
+from chunked_upload import UploadManager, UploadError
+from proxy_transcode import ProxyTranscoder
+from media_cache import install_static_caching, send_media, send_frame, send_video, YEAR
+from frame_sprites import list_frames_page, build_sprite, sprite_paths
+import frame_store
+from frame_dedupe import FrameDeduper
+from motion_timeline import cached_timeline, frame_plan
+from fallback_detector import FallbackSessions
+from multi_tracker import MultiObjectTracker
+from session_pool import SessionPool
+from shot_log import ShotStore, safe_session
+from shot_db import ShotDB
+from metrics import Metrics, model_version
 
 torch.serialization.add_safe_globals([DetectionModel])
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 CORS(app, resources={r"/api/*": {"origins": "*"}})
+install_static_caching(app)  # ETag/Range + cache policy + precompressed assets for /static
+metrics = Metrics()
+metrics.install(app)  # /metrics (Prometheus text) + per-route latency, optional Server-Timing
 
 REQUIRED_LABELS = {'basketball', 'hoop', 'net', 'backboard', 'player'}
 CONFIDENCE_THRESHOLD = 0.85
@@ -39,22 +63,11 @@ DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 PRESET_FILE = DATA_DIR / "voice_presets.json"
 
-client = None
+# Shared, pooled upstream client (keep-alive, retries, circuit breaker); see upstream.py
+upstream = get_upstream()
 
 def get_openai_client():
-    global client
-
-    if client is not None:
-        return client
-
-    load_dotenv()  # Ensure .env is loaded
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("❌ OPENAI_API_KEY not set in environment or .env file.")
-
-    client = OpenAI(api_key=api_key)
-    return client
+    return upstream.openai()
 
 LABEL_TO_CLASS = {
     'basketball': 0,
@@ -66,7 +79,12 @@ LABEL_TO_CLASS = {
 
 # 🔄 Load both models
 BASE_DIR = Path(__file__).resolve().parent
-model_det = YOLO(BASE_DIR / "weights/best.pt")
+# weights/best.pt, unless a training run has been promoted since (shared by all workers)
+_published, _serving_stamp = published_weights()
+serving_weights = _published if _published and os.path.exists(_published) else str(BASE_DIR / "weights/best.pt")
+model_det = YOLO(serving_weights)
+_model_lock = threading.Lock()
+serving_model = model_version(serving_weights)
 # model_backup = YOLO(BASE_DIR / "weights/backup_best.pt")
 print("✅ Model loaded")
 
@@ -83,20 +101,37 @@ ALLOWED_EXTS = {'.mp4', '.mov', '.webm', '.mkv'}
 def _is_video(fname):
     return os.path.splitext(fname)[1].lower() in ALLOWED_EXTS
 
+video_catalog = VideoCatalog(UPLOAD_DIR, url_prefix="/static/videos", frame_dir=FRAME_FOLDER,
+                             exts=ALLOWED_EXTS)
+
+def _int_arg(name, default=None):
+    v = request.args.get(name)
+    try:
+        return int(v) if v not in (None, "") else default
+    except ValueError:
+        return default
+
 @app.get('/videos')
 def list_videos():
-    items = []
-    for fname in sorted(os.listdir(UPLOAD_DIR)):
-        path = os.path.join(UPLOAD_DIR, fname)
-        if os.path.isfile(path) and _is_video(fname):
-            st = os.stat(path)
-            items.append({
-                "name": fname,
-                "url": f"/static/videos/{fname}",  # direct static path
-                "size": st.st_size,
-                "mtime": int(st.st_mtime)
-            })
-    return jsonify({"items": items})
+    """
+    Paginated library listing from the catalog index.
+    ?page=&per_page=&sort=name|date|size|duration&order=asc|desc
+    &q=<name substring>&since=&until=<unix ts>&min_size=&max_size=<bytes>&analyzed=0|1
+    """
+    analyzed = request.args.get('analyzed')
+    result = video_catalog.query(
+        page=_int_arg('page', 1),
+        per_page=_int_arg('per_page', 50),
+        sort=request.args.get('sort', 'name'),
+        order=request.args.get('order', 'asc'),
+        q=(request.args.get('q') or '').strip() or None,
+        since=_int_arg('since'),
+        until=_int_arg('until'),
+        min_size=_int_arg('min_size'),
+        max_size=_int_arg('max_size'),
+        analyzed=None if analyzed in (None, '') else analyzed.lower() in ('1', 'true', 'yes'),
+    )
+    return jsonify(result)
 
 # Optional: allow uploads from the UI
 @app.post('/videos')
@@ -107,10 +142,49 @@ def upload_video():
     ext = os.path.splitext(f.filename)[1].lower()
     if ext not in ALLOWED_EXTS:
         return jsonify({"error": "unsupported format"}), 400
-    fname = secure_filename(f.filename)
-    dest = os.path.join(UPLOAD_DIR, fname)
-    f.save(dest)
-    return jsonify({"ok": True, "name": fname, "url": f"/static/videos/{fname}"})
+    res = uploads.save_stream(f.stream, secure_filename(f.filename), "videos")
+    return jsonify({"ok": True, **res})
+
+
+proxies = ProxyTranscoder()
+
+def _on_upload_complete(target, name):
+    if target == "videos":
+        video_catalog.probe_async(name)  # duration/fps/resolution/thumbnail, once
+    folder = UPLOAD_DIR if target == "videos" else UPLOAD_FOLDER
+    proxies.submit(os.path.join(folder, name))  # 640w analysis + playback proxies
+
+uploads = UploadManager(
+    {"videos": (UPLOAD_DIR, "/static/videos"), "uploads": (UPLOAD_FOLDER, "/uploads")},
+    on_complete=_on_upload_complete,
+)
+
+# Resumable uploads: POST to start, PUT chunks at ?offset=, GET to find where to resume
+@app.post('/api/uploads')
+def create_upload():
+    b = request.get_json(silent=True) or {}
+    fname = secure_filename(b.get("filename") or "")
+    if not _is_video(fname):
+        return jsonify({"error": "unsupported format"}), 400
+    try:
+        return jsonify(uploads.create(fname, b.get("size"), b.get("target") or "videos", b.get("sha256")))
+    except UploadError as e:
+        return jsonify({"error": str(e), **e.extra}), e.status
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def upload_chunk(upload_id):
+    try:
+        if request.method == 'GET':
+            return jsonify(uploads.status(upload_id))
+        if request.method == 'DELETE':
+            uploads.abort(upload_id)
+            return jsonify({"ok": True})
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            return jsonify({"error": "offset is required"}), 400
+        return jsonify(uploads.write_chunk(upload_id, offset, request.stream, request.content_length))
+    except UploadError as e:
+        return jsonify({"error": str(e), **e.extra}), e.status
 
 
 
@@ -136,6 +210,148 @@ def my_doach():
 def list_videos_api():
     return list_videos()
 
+# proxy status; POST queues a (re)build, e.g. for videos uploaded before proxies existed
+@app.route("/api/proxies/<target>/<name>", methods=["GET", "POST"])
+def video_proxies(target, name):
+    folder = {"videos": UPLOAD_DIR, "uploads": UPLOAD_FOLDER}.get(target)
+    path = os.path.join(folder, secure_filename(name)) if folder else None
+    if not path or not os.path.isfile(path):
+        return jsonify({"error": "not found"}), 404
+    if request.method == "POST":
+        proxies.submit(path)
+    return jsonify(proxies.status(path))
+
+# -- shots: compact per-session logs (see shot_log.py), JSON in the old shape on export,
+# plus the SQLite index behind history and the community feed (see shot_db.py)
+shot_store = ShotStore()
+shot_db = ShotDB()
+
+def _shot_user(b=None):
+    """The caller: the random per-browser id the pages keep in localStorage (there are no accounts)."""
+    return request.headers.get("X-Doach-User") or (b or {}).get("user") or request.args.get("user") or None
+
+def _owns(summary, user):
+    """May user write to this session? A session nobody has claimed yet is up for grabs."""
+    return summary is None or summary["user"] == (user or "anonymous")
+
+def _can_see(summary, user):
+    """May user read this session? Sessions without a summary in shots.sqlite are not found."""
+    return summary is not None and (summary["public"] or _owns(summary, user))
+
+def _bool_arg(name):
+    v = request.args.get(name)
+    return None if v in (None, "") else v.lower() in ("1", "true", "yes")
+
+@app.post("/api/shots")
+def save_shots():
+    b = request.get_json(silent=True) or {}
+    shots = b.get("shots") if isinstance(b.get("shots"), list) else [b.get("shot")]
+    shots = [s for s in shots if isinstance(s, dict)]
+    if not shots:
+        return jsonify({"error": "shot or shots is required"}), 400
+    sid = safe_session(b.get("session"))
+    user = _shot_user(b)
+    if not _owns(shot_db.session(sid), user):
+        return jsonify({"error": "session belongs to another user"}), 403
+    try:
+        n = shot_store.append(sid, shots)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    shot_db.add_shots(sid, shots, user=user)
+    return jsonify({"ok": True, "stored": n})
+
+@app.get("/api/shots/<session>")
+def export_shots(session):
+    session = safe_session(session)
+    if not _can_see(shot_db.session(session), _shot_user()):
+        return jsonify({"error": "not found"}), 404
+    if request.args.get("format") == "binary":
+        path = shot_store.path(session)
+        if not os.path.isfile(path):
+            return jsonify({"error": "not found"}), 404
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=os.path.basename(path))
+    try:
+        doc = shot_store.export(session)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    resp = jsonify(doc)
+    if request.args.get("download"):
+        resp.headers["Content-Disposition"] = f"attachment; filename=shots_{doc['session_id']}.json"
+    return resp
+
+@app.get("/api/history")
+def shot_history():
+    """
+    Newest-first shots. ?session=&made=0|1&tag=&since=&until=<ms>
+    &per_page=&before=<next cursor from the previous page> (or &page=)
+    Only the caller's own shots, or one session's shots if it is theirs or public.
+    """
+    user, session = _shot_user(), request.args.get("session") or None
+    if session:
+        session = safe_session(session)
+        if not _can_see(shot_db.session(session), user):
+            return jsonify({"error": "not found"}), 404
+        user = None
+    elif not user:
+        return jsonify({"error": "user is required"}), 400
+    return jsonify(shot_db.query_shots(
+        user=user,
+        session=session,
+        made=_bool_arg("made"),
+        tag=request.args.get("tag") or None,
+        since=_int_arg("since"),
+        until=_int_arg("until"),
+        before=request.args.get("before") or None,
+        page=_int_arg("page", 1),
+        per_page=_int_arg("per_page", 50),
+    ))
+
+@app.get("/api/sessions")
+def list_sessions():
+    """
+    The caller's session summaries, most recently active first. ?tag=&public=0|1&per_page=&before=
+    Without a caller id only public sessions are listed.
+    """
+    user = _shot_user()
+    return jsonify(shot_db.query_sessions(
+        user=user,
+        public=_bool_arg("public") if user else True,
+        tag=request.args.get("tag") or None,
+        before=request.args.get("before") or None,
+        page=_int_arg("page", 1),
+        per_page=_int_arg("per_page", 20),
+    ))
+
+@app.get("/api/feed")
+def community_feed():
+    """Public sessions for the community page. ?tag=&per_page=&before="""
+    return jsonify(shot_db.query_sessions(
+        public=True,
+        tag=request.args.get("tag") or None,
+        before=request.args.get("before") or None,
+        page=_int_arg("page", 1),
+        per_page=_int_arg("per_page", 20),
+    ))
+
+@app.route("/api/sessions/<session>", methods=["GET", "POST"])
+def session_summary(session):
+    sid = safe_session(session)
+    summary = shot_db.session(sid)
+    if request.method == "POST":
+        b = request.get_json(silent=True) or {}
+        user = _shot_user(b)
+        if not _owns(summary, user):
+            return jsonify({"error": "session belongs to another user"}), 403
+        shot_db.upsert_session(sid, user=user, title=b.get("title"), video_url=b.get("video_url"),
+                               notes=b.get("notes"), tags=b.get("tags"), public=b.get("public"))
+        summary = shot_db.session(sid)
+    elif not _can_see(summary, _shot_user()):
+        summary = None
+    if not summary:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(summary)
+
 # ------------------------ coach routes --------------------------
 
 # Where we store named voice presets (JSON file on disk)
@@ -159,20 +375,15 @@ LANG_NAMES = {
     "zh-CN": "Chinese (Simplified)",
 }
 
-def _read_presets():
-    if PRESET_FILE.exists():
-        try:
-            return json.loads(PRESET_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-    return []
+preset_store = PresetStore(legacy_file=PRESET_FILE)
 
-def _write_presets(items):
-    PRESET_FILE.write_text(json.dumps(items, indent=2, ensure_ascii=False), encoding="utf-8")
+def _preset_namespace():
+    # Per-user presets: X-Doach-User header or ?user=, else the shared default list
+    return (request.headers.get("X-Doach-User") or request.args.get("user") or DEFAULT_NAMESPACE).strip()[:64]
 
 @app.get("/api/voice_presets")
 def get_voice_presets():
-    return jsonify({"presets": _read_presets()})
+    return jsonify({"presets": preset_store.list(_preset_namespace())})
 
 @app.post("/api/voice_presets")
 def upsert_voice_preset():
@@ -180,55 +391,117 @@ def upsert_voice_preset():
     p = b.get("preset") or {}
     if not p.get("name"):
         return jsonify({"error": "missing preset.name"}), 400
-    items = _read_presets()
-    i = next((k for k, it in enumerate(items) if it.get("name") == p["name"]), -1)
-    if i >= 0:
-        items[i] = p
-    else:
-        items.append(p)
-    _write_presets(items)
+    preset_store.upsert(p, _preset_namespace())
     return jsonify({"ok": True, "preset": p})
 
 @app.delete("/api/voice_presets/<name>")
 def delete_voice_preset(name):
-    items = [it for it in _read_presets() if it.get("name") != name]
-    _write_presets(items)
+    preset_store.delete(name, _preset_namespace())
     return jsonify({"ok": True})
 
+translation_memo = TranslationMemo()
+
+# OpenAI or offline stand-in for translate/chat/speech (DOACH_AI_BACKEND); see ai_backends.py
+ai = get_backend(upstream, translation_memo, LANG_NAMES)
+
 def translate_if_needed(text: str, lang_code: str) -> str:
     """
     OpenAI TTS infers language from text. If user selected a non-US English
     locale or a non-English language, convert/translate first so speech sounds right.
+    Results are memoized per locale, so repeated cues skip the LLM call.
     """
     if not lang_code or lang_code in ("en", "en-US"):
         return text
+    # the offline backend echoes anything it has no prewarmed translation for
+    return translation_memo.translate(text, lang_code, ai.translate, memoize=not ai.local)
 
-    client = get_openai_client()
-    target = LANG_NAMES.get(lang_code, lang_code)
+@app.post("/api/translations/prewarm")
+def prewarm_translations():
+    b = request.get_json(silent=True) or {}
+    langs = b.get("langs") or [l for l in LANG_NAMES if l != "en-US"]
+    langs = [l for l in langs if l in LANG_NAMES and l != "en-US"]
+    threading.Thread(target=translation_memo.prewarm, args=(langs, ai.translate_batch), daemon=True).start()
+    return jsonify({"ok": True, "langs": langs, "cues": len(COACHING_CUES)}), 202
 
-    if lang_code.startswith("en-"):
-        system = (f"Convert the user's text to {target} with appropriate spelling/phrasing. "
-                  "ONLY return the converted text.")
-        user = text
-    else:
-        system = (f"Translate the user's text to {target}. Keep names/numbers. Natural for speech. "
-                  "ONLY return the translation.")
-        user = text
-
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": system},
-                  {"role": "user", "content": user}],
-        temperature=0.2,
-    )
-    out = (resp.choices[0].message.content or "").strip()
-    return out or text
+@app.get("/api/translations/stats")
+def translation_stats():
+    return jsonify(translation_memo.stats())
 
 # Voices your server will accept (front-end should match these)
 ALLOWED_VOICES = {
     "alloy", "verse", "amber", "aria", "coral", "sage", "vivid", "bright"
 }
 
+TTS_MODEL = ai.tts_model
+tts_cache = AudioCache()
+
+def _send_cached_audio(path, key):
+    # conditional=True gives Range/206 and If-None-Match/304 handling (werkzeug applies it to GET/HEAD)
+    resp = send_file(path, mimetype=tts_cache.mimetype(path), conditional=True, etag=key, max_age=86400)
+    resp.headers["X-TTS-Cache"] = "hit"
+    resp.headers["X-TTS-Url"] = f"/api/tts/audio/{key}"
+    return resp
+
+@app.get("/api/tts/audio/<key>")
+def tts_cached_audio(key):
+    """Cached clips by content key — cacheable, seekable URLs for <audio src>."""
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return jsonify({"error": "bad key"}), 400
+    path = tts_cache.get(key)
+    if not path:
+        return jsonify({"error": "not cached"}), 404
+    resp = _send_cached_audio(path, key)
+    resp.cache_control.immutable = True
+    return resp
+
+tts_pool = ThreadPoolExecutor(max_workers=8)
+
+def _synthesize_cached(text, voice, lang, translate=True):
+    """Make sure a clip for (text, voice, lang) is in tts_cache; returns its key."""
+    key = cache_key(text, voice, lang, TTS_MODEL)
+    if tts_cache.get(key):
+        return key
+    speak_text = translate_if_needed(text, lang) if translate else text
+    r = ai.speech(speak_text, voice)
+    if r.status_code != 200:
+        raise RuntimeError(f"TTS failed: {r.status_code} {r.text[:200]}")
+    for _ in tts_cache.tee(key, r.iter_content(8192)):
+        pass
+    return key
+
+def _tts_pipelined(chunks, key, voice, lang):
+    """
+    Long text: translate + synthesize every sentence concurrently and stream the clips
+    back in order as each one is ready. Each clip goes out as bare MP3 frames (no ID3 tag
+    or Xing/Info header, whose lengths would describe only that sentence), so the joined
+    stream plays as one file. It is cached under the full-text key only once every
+    sentence made it out; each sentence is cached under its own key too.
+
+    The first sentence's errors come back as JSON. A later sentence failing aborts the
+    stream without its terminating chunk, so the client sees a failed download rather
+    than a short 200, and nothing is cached for the full text.
+    """
+    futures = [tts_pool.submit(_synthesize_cached, c, voice, lang) for c in chunks]
+    futures[0].result()  # surface upstream errors as JSON before we commit to a 200
+
+    def generate():
+        try:
+            for i, (chunk, fut) in enumerate(zip(chunks, futures)):
+                ckey = fut.result()
+                path = tts_cache.get(ckey) or tts_cache.path_for(_synthesize_cached(chunk, voice, lang))
+                with open(path, "rb") as f:
+                    yield mp3_frames(f.read())
+        except Exception as e:
+            print(f"❌ TTS sentence {i + 1}/{len(chunks)} failed, aborting stream: {e}")
+            raise
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    return Response(tts_cache.tee(key, generate()), mimetype="audio/mpeg",
+                    headers={"ETag": f'"{key}"', "X-TTS-Cache": "miss", "X-TTS-Chunks": str(len(chunks)),
+                             "X-TTS-Url": f"/api/tts/audio/{key}"})
+
 @app.post("/api/tts")
 def api_tts():
     try:
@@ -242,19 +515,26 @@ def api_tts():
         if voice not in ALLOWED_VOICES:
             voice = "alloy"
 
+        # Repeat cues are served straight from disk — no translation, no upstream call
+        lap = metrics.lap()
+        key = cache_key(text, voice, lang, TTS_MODEL)
+        cached = tts_cache.get(key)
+        lap("cache")
+        if cached:
+            return _send_cached_audio(cached, key)
+
+        # Multi-sentence text (session recaps): pipeline per-sentence translate → synthesize
+        # (local WAV clips don't concatenate, so the offline backend synthesizes in one go)
+        chunks = split_sentences(text)
+        if len(chunks) > 1 and not ai.local:
+            return _tts_pipelined(chunks, key, voice, lang)
+
         speak_text = translate_if_needed(text, lang)
+        lap("translate")
 
-        # Use OpenAI TTS (model name must be valid)
-        r = requests.post(
-            "https://api.openai.com/v1/audio/speech",
-            headers={
-                "Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}",
-                "Content-Type": "application/json",
-                "Accept": "audio/mpeg"
-            },
-            json={"model": "gpt-4o-mini-tts", "voice": voice, "input": speak_text},
-            stream=True, timeout=60
-        )
+        # Use OpenAI TTS (model name must be valid) over the pooled keep-alive session
+        r = ai.speech(speak_text, voice)
+        lap("synthesize")  # time to first byte; the audio streams after the request is timed
 
         if r.status_code != 200:
             # Bubble API error details back to the client UI
@@ -263,14 +543,15 @@ def api_tts():
             except Exception:
                 return jsonify({"error": r.text}), r.status_code
 
-        return Response(r.iter_content(8192), mimetype="audio/mpeg")
+        return Response(tts_cache.tee(key, r.iter_content(8192)), mimetype=getattr(r, "mimetype", "audio/mpeg"),
+                        headers={"ETag": f'"{key}"', "X-TTS-Cache": "miss",
+                                 "X-TTS-Url": f"/api/tts/audio/{key}"})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.post("/api/coach")
-def api_coach():
-    b = request.get_json(force=True) or {}
+def _coach_messages(b):
+    """Chat messages for /api/coach from the request body -> (msgs, model, lang)."""
     prompt  = (b.get("prompt")  or "").strip()
     model   =  b.get("model")   or "gpt-4o-mini"
     lang    =  b.get("lang")    or "en-US"
@@ -278,9 +559,8 @@ def api_coach():
     profile =  b.get("profile")
 
     if not prompt:
-        return jsonify({"error": "prompt is required"}), 400
+        return None, model, lang
 
-    client = get_openai_client()
     lang_hint = "" if lang in ("en", "en-US") else f" Respond in {LANG_NAMES.get(lang, lang)}."
 
     system = (
@@ -295,16 +575,116 @@ def api_coach():
     if shot:
         msgs.append({"role":"system","content": f"Shot data: {shot}"})
     msgs.append({"role": "user",   "content": prompt})
+    return msgs, model, lang
+
+coach_cache = CoachCache()
+
+# cache hit rates, breaker state and the serving model, read when /metrics is scraped
+metrics.add_cache("tts", tts_cache.stats)
+metrics.add_cache("translation", translation_memo.stats)
+metrics.add_cache("coach", coach_cache.stats)
+metrics.add_collector("upstream_breaker_failures", "gauge", "Consecutive upstream failures by endpoint",
+                      ("endpoint", "state"),
+                      lambda: [((k, b["state"]), b["failures"]) for k, b in upstream.stats()["breakers"].items()])
+metrics.add_collector("model_info", "gauge", "Detector weights currently serving /detect_frame",
+                      ("model",), lambda: [((serving_model,), 1)])
 
-    resp = client.chat.completions.create(model=model, messages=msgs, temperature=0.6)
-    text = (resp.choices[0].message.content or "").strip()
+@app.post("/api/coach")
+def api_coach():
+    b = request.get_json(force=True) or {}
+    msgs, model, lang = _coach_messages(b)
+    if not msgs:
+        return jsonify({"error": "prompt is required"}), 400
+
+    # Structured shot feedback repeats a lot (same miss pattern, same player): serve from cache.
+    # Keyed on the client's structured prompt inputs (`cue`); a free-form prompt is only cached
+    # when the client opts in with cache: true, and then the prompt text itself is part of the key.
+    cue = b.get("cue") if isinstance(b.get("cue"), dict) else None
+    use_cache = not ai.local and (b.get("cache") is True or (cue is not None and b.get("cache", True)))
+    context = {"system": msgs[0]["content"], "cue": cue} if cue is not None else \
+              {"system": msgs[0]["content"], "prompt": msgs[-1]["content"]}
+    sig = shot_signature(b.get("shot"), b.get("profile"), lang, model, context=context) if use_cache else None
+    key = signature_key(sig) if sig else None
+    lap = metrics.lap()
+    if key:
+        cached = coach_cache.get(key)
+        lap("cache")
+        if cached:
+            return jsonify({"text": cached, "cached": True})
+
+    text = ai.complete(msgs, model, temperature=0.6, shot=b.get("shot"))
+    lap("complete")
+    if key:
+        coach_cache.put(key, text)
     return jsonify({"text": text})
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/coach/stream")
+def api_coach_stream():
+    """
+    Same request body as /api/coach, answered as server-sent events:
+      token    {"text": delta}                      as the model generates
+      sentence {"index": i, "text": s}             each time a sentence completes
+      audio    {"index": i, "url": "/api/tts/..."}  if body.tts = {"voice": ...}: that sentence's clip is ready
+      done     {"text": full_text}
+    Sentences are handed to TTS as soon as they complete, so speech can start after the first one.
+    """
+    b = request.get_json(force=True) or {}
+    msgs, model, lang = _coach_messages(b)
+    if not msgs:
+        return jsonify({"error": "prompt is required"}), 400
+
+    tts_opts = b.get("tts") if isinstance(b.get("tts"), dict) else None
+    voice = ((tts_opts or {}).get("voice") or "alloy").strip().lower()
+    if voice not in ALLOWED_VOICES:
+        voice = "alloy"
+
+    def generate():
+        chunker = SentenceChunker()
+        pending = []   # (index, future) in sentence order
+        parts = []
+        index = 0
+
+        def on_sentences(sentences):
+            nonlocal index
+            for s in sentences:
+                yield _sse("sentence", {"index": index, "text": s})
+                if tts_opts is not None:
+                    # reply is already in the target language — synthesize without re-translating
+                    pending.append((index, tts_pool.submit(_synthesize_cached, s, voice, lang, False)))
+                index += 1
+
+        def ready_audio(block=False):
+            while pending and (block or pending[0][1].done()):
+                i, fut = pending.pop(0)
+                try:
+                    yield _sse("audio", {"index": i, "url": f"/api/tts/audio/{fut.result()}"})
+                except Exception as e:
+                    yield _sse("audio", {"index": i, "error": str(e)})
+
+        try:
+            for delta in ai.stream(msgs, model, temperature=0.6, shot=b.get("shot")):
+                parts.append(delta)
+                yield _sse("token", {"text": delta})
+                yield from on_sentences(chunker.feed(delta))
+                yield from ready_audio()
+            yield from on_sentences(chunker.flush())
+            yield from ready_audio(block=True)
+            yield _sse("done", {"text": "".join(parts).strip()})
+        except Exception as e:
+            traceback.print_exc()
+            yield _sse("error", {"error": str(e)})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 #-----------app routes --------------
 @app.route('/frames/<video_name>/<frame_file>')
 def serve_frame(video_name, frame_file):
-    return send_from_directory(os.path.join('frame_cache', video_name), frame_file)
+    return send_frame(os.path.join('frame_cache', video_name), frame_file)
 
 @app.route('/test_openai')
 def test_openai():
@@ -319,10 +699,14 @@ def list_frames(video_name):
     folder_path = os.path.join('frame_cache', video_name)
     if not os.path.exists(folder_path):
         return jsonify({'error': 'Folder not found'}), 404
+    if 'page' in request.args:
+        return jsonify(list_frames_page(video_name, request.args.get('page', 1, type=int),
+                                        request.args.get('per_page', 100, type=int)))
 
-    frames = [f for f in os.listdir(folder_path) if f.endswith('.jpg')]
-    frames.sort()
-    return jsonify({'frames': frames})
+    versions = frame_store.frame_names(folder_path, ('.jpg',))  # loose + packed
+    frames = sorted(versions)
+    # ?v=<version> on /frames/ URLs makes them immutable-cacheable
+    return jsonify({'frames': frames, 'versions': versions})
 
 
 # new frame extraction routes
@@ -387,21 +771,76 @@ def compile_dataset(folder):
 
 
 
+def _sync_serving_model():
+    """Switch to weights another worker promoted; one stat per call when nothing changed."""
+    global model_det, serving_model, serving_weights, _serving_stamp
+    path, stamp = published_weights()
+    if stamp is None or stamp == _serving_stamp:
+        return
+    with _model_lock:
+        if stamp == _serving_stamp:
+            return
+        if path != serving_weights and os.path.exists(path):
+            candidate = YOLO(path)
+            try:
+                candidate.fuse()
+            except Exception:
+                pass
+            model_det = candidate
+            serving_weights = path
+            serving_model = model_version(path)
+            print(f"🔁 Serving model switched to {path}")
+        _serving_stamp = stamp
+
+def _promote_weights(job):
+    """Publish a finished run's best.pt as the serving model; every worker loads it on its next detect."""
+    _sync_serving_model()
+    # gate against what is served now, which may be an earlier promotion
+    passed, report = run_gate(job["weights"], baseline=serving_weights, thresholds="app",
+                              report_path=os.path.join(job["run_dir"], "benchmark.json"))
+    if not passed:
+        print(f"⚠️ Not promoting {job['weights']}: " + "; ".join(report["reasons"]))
+        return
+    publish_weights(job["weights"])
+    _sync_serving_model()
+    print(f"✅ Serving model promoted to {job['weights']}")
+
+training_jobs = TrainingJobManager(on_complete=_promote_weights)
+
 @app.route('/start_training/<folder>')
 def start_training(folder):
     try:
         # Make sure to point to the correct data.yaml
         yaml_path = os.path.join('datasets', 'doach_seg', 'data.yaml')
-        command = f"yolo task=detect mode=train model=yolov8n.pt data={yaml_path} name=doach_gpt_v13 epochs=60 imgsz=640"
-
-        print("🚀 Running:", command)
-        subprocess.Popen(command, shell=True)
-        return jsonify({ 'status': '🚀 Training started.' })
+        job = training_jobs.submit(
+            yaml_path,
+            name=request.args.get('name') or None,
+            epochs=request.args.get('epochs', 60, type=int),
+            imgsz=request.args.get('imgsz', 640, type=int),
+            promote=request.args.get('promote', '0') in ('1', 'true', 'yes'),
+        )
+        status = '🚀 Training started.' if job['status'] == 'running' else '⏳ Training queued.'
+        return jsonify({ 'status': status, 'job': job })
     except Exception as e:
         print(f"❌ Training failed: {e}")
         return jsonify({ 'status': '❌ Training failed.' })
 
+@app.get('/api/training/jobs')
+def list_training_jobs():
+    return jsonify({'jobs': training_jobs.list()})
 
+@app.get('/api/training/jobs/<job_id>')
+def training_job_status(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job)
+
+@app.post('/api/training/jobs/<job_id>/cancel')
+def cancel_training_job(job_id):
+    if not training_jobs.cancel(job_id):
+        return jsonify({'error': 'job not found or already finished'}), 404
+    return jsonify({'ok': True, 'job': training_jobs.get(job_id, with_metrics=False)})
 
 
 @app.route('/manual_review/<video_name>')
@@ -409,68 +848,88 @@ def list_manual_review_frames(video_name):
     folder = os.path.join('frame_cache', video_name, 'manual_review')
     if not os.path.exists(folder):
         return jsonify({'frames': []})
+    if 'page' in request.args:
+        return jsonify(list_frames_page(video_name, request.args.get('page', 1, type=int),
+                                        request.args.get('per_page', 100, type=int), subdir='manual_review'))
 
     frames = [f for f in os.listdir(folder) if f.endswith('.jpg')]
     frames.sort()
     return jsonify({'frames': frames})
 
 
+# Paginated listing + one tiled thumbnail sheet per page for the review grids
+SPRITE_SUBDIRS = {None, 'manual_review', 'rejected'}
+
+@app.get('/api/frames/<video_name>')
+def frames_page(video_name):
+    video_name = secure_filename(video_name)
+    subdir = request.args.get('subdir') or None
+    if subdir not in SPRITE_SUBDIRS:
+        return jsonify({'error': 'unknown subdir'}), 400
+    listing = list_frames_page(video_name, request.args.get('page', 1, type=int),
+                               request.args.get('per_page', 100, type=int), subdir=subdir)
+    if listing is None:
+        return jsonify({'error': 'Folder not found'}), 404
+    if listing['frames'] and request.args.get('sprite', '1') != '0':
+        try:
+            key, index = build_sprite(video_name, listing, subdir=subdir)
+            listing['sprite'] = {'url': f'/frame_sprites/{video_name}/{key}.jpg', **index}
+        except Exception as e:
+            print(f"⚠️ sprite build failed for {video_name}: {e}")
+    return jsonify(listing)
+
+@app.get('/frame_sprites/<video_name>/<key>.jpg')
+def serve_frame_sprite(video_name, key):
+    img_path, _ = sprite_paths(secure_filename(video_name), secure_filename(key))
+    return send_media(str(img_path.parent), img_path.name, max_age=YEAR)  # content-keyed
+
+
 @app.route('/upload', methods=['POST'])
 def upload():
     video = request.files.get('video')
     if video:
-        filename = secure_filename(video.filename)
-        path = os.path.join(UPLOAD_FOLDER, filename)
-        video.save(path)
+        res = uploads.save_stream(video.stream, secure_filename(video.filename), "uploads")
+        filename = res["name"]
         frame_memory['ball_path'].clear()
         frame_memory['frame_id'] = 0
-        global kalman
-        kalman = init_kalman()
+        tracker_sessions.reset(_detect_session_id(request.form))
         return jsonify({'video': f'/uploads/{filename}'})
     return jsonify({'error': 'No video uploaded'}), 400
 
 @app.route('/uploads/<filename>')
 def serve_video(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
-
-# 🧠 Kalman filter setup
-kalman = None
-
-def init_kalman():
-    kf = cv2.KalmanFilter(4, 2)
-    kf.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=np.float32)
-    kf.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float32)
-    kf.processNoiseCov = np.eye(4, dtype=np.float32) * 1e-2
-    kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * 1e-1
-    kf.errorCovPost = np.eye(4, dtype=np.float32)
-    return kf
-
-def track_ball_with_kalman(ball_point):
-    global kalman
-    if ball_point:
-        measured = np.array([[np.float32(ball_point['x'])], [np.float32(ball_point['y'])]])
-        kalman.correct(measured)
-    predicted = kalman.predict()
-    return int(predicted[0]), int(predicted[1])
-
-last_gray = None
-
-def fallback_motion_ball(frame, min_area=30, max_area=5000):
-    global last_gray
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (7, 7), 0)
-    if last_gray is None:
-        last_gray = gray
+    return send_video(UPLOAD_FOLDER, filename)
+
+# Motion fallback for the ball, one background model per client session (see fallback_detector.py)
+fallback_sessions = FallbackSessions()
+# Ball/player/hoop tracks, one MultiObjectTracker per client session (see multi_tracker.py)
+tracker_sessions = SessionPool(MultiObjectTracker)
+
+def _detect_session_id(data):
+    sid = data.get('session') or request.headers.get('X-Doach-Session')
+    if sid:
+        return str(sid)[:64]
+    return f"{request.remote_addr}|{request.headers.get('User-Agent', '')}"
+
+def _ball_fallback(data, frame, detections):
+    """YOLO missed the basketball: try this session's background-subtraction detector."""
+    tracker = fallback_sessions.get(_detect_session_id(data))
+    ball = next((d for d in detections if d['label'] == 'basketball'), None)
+    if ball:
+        if 'x' not in ball:
+            ball = {'x': (ball['box'][0] + ball['box'][2]) / 2, 'y': (ball['box'][1] + ball['box'][3]) / 2}
+        tracker.observe(ball, frame)
         return None
-    frame_delta = cv2.absdiff(last_gray, gray)
-    thresh = cv2.threshold(frame_delta, 20, 255, cv2.THRESH_BINARY)[1]
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    candidates = [cv2.boundingRect(c) for c in contours if min_area < cv2.contourArea(c) < max_area]
-    if candidates:
-        x, y, w, h = max(candidates, key=lambda r: r[2] * r[3])
-        return {'x': x + w // 2, 'y': y + h // 2, 'frame': frame_memory['frame_id'], 'confidence': 0.05}
-    last_gray = gray
-    return None
+    return tracker.detect(frame)
+
+def _update_tracks(data, detections):
+    """Feed this frame's detections to the session's tracker; tags them with track_id."""
+    frame_index = data.get('frameIndex')
+    try:
+        frame_index = int(frame_index) if frame_index is not None else None
+    except (TypeError, ValueError):
+        frame_index = None
+    return tracker_sessions.get(_detect_session_id(data)).update(detections, frame_index)
 
 # run extract for every 5th frame from training video
 @app.route('/extract_frames', methods=['POST'])
@@ -487,19 +946,69 @@ def extract_frames():
     out_dir = os.path.join(FRAME_FOLDER, os.path.splitext(filename)[0])
     os.makedirs(out_dir, exist_ok=True)
 
+    # near-duplicate filter (dHash + motion); {"dedupe": false} keeps every 5th frame as before
+    deduper = None
+    if data.get('dedupe', True):
+        deduper = FrameDeduper(threshold=int(data.get('dedupe_bits', 6)))
+
     try:
-        saved_filenames = extract_video_frames(video_path, out_dir, step=5)
+        # always decode the 640w analysis proxy (built now if the background job hasn't
+        # finished), so re-running a clip gives the same frames; they keep the original's name
+        source, source_kind = proxies.analysis_source(video_path)
+        keep, timeline = None, None
+        if data.get('mode') == 'motion':
+            # dense inside shot windows, sparse through dead time
+            timeline = cached_timeline(source, out_dir, hoop=data.get('hoop'))
+            keep = frame_plan(timeline, dense_step=int(data.get('dense_step', 2)),
+                              idle_step=int(data.get('idle_step', 30)))
+        saved_filenames = extract_video_frames(source, out_dir, step=5, base_name=os.path.splitext(filename)[0],
+                                               deduper=deduper, keep=keep)
+        video_catalog.mark_analyzed(filename)
+        if deduper:
+            deduper.write_manifest(out_dir, filename)
+        _write_extract_meta(out_dir, {'video': filename, 'source': os.path.basename(source),
+                                      'source_kind': source_kind, 'mode': data.get('mode') or 'step',
+                                      'count': len(saved_filenames)})
         return jsonify({
             'frames': saved_filenames,
-            'count': len(saved_filenames)
+            'count': len(saved_filenames),
+            'source': os.path.basename(source),
+            'source_kind': source_kind,
+            'dropped': len(deduper.dropped) if deduper else 0,
+            'segments': timeline['segments'] if timeline else None
         })
     except Exception as e:
         print("❌ extract_frames failed:", e)
         return jsonify({'error': f'Frame extraction failed: {str(e)}'}), 500
 
 
+def _write_extract_meta(out_dir, meta):
+    """out_dir/extract.json: which file the frames were decoded from, and how."""
+    path = os.path.join(out_dir, 'extract.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump({**meta, 'extracted': int(time.time())}, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+# Motion-score timeline for the UI (which stretches of the clip have shot activity)
+@app.post('/api/motion_timeline')
+def motion_timeline_api():
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    video_path = os.path.join(UPLOAD_FOLDER, filename)
+    if not filename or not os.path.exists(video_path):
+        return jsonify({'error': 'File not found'}), 404
+    out_dir = os.path.join(FRAME_FOLDER, os.path.splitext(filename)[0])
+    try:
+        source, _ = proxies.analysis_source(video_path)  # same input extract_frames decodes
+        return jsonify(cached_timeline(source, out_dir, hoop=data.get('hoop')))
+    except Exception as e:
+        print("❌ motion timeline failed:", e)
+        return jsonify({'error': str(e)}), 500
+
+
 # Utility: frame extractor
-def extract_video_frames(video_path, out_dir, step=5):
+def extract_video_frames(video_path, out_dir, step=5, base_name=None, deduper=None, keep=None):
     import cv2
     import os
 
@@ -510,20 +1019,35 @@ def extract_video_frames(video_path, out_dir, step=5):
     frame_id = 0
     saved = []
 
-    base_name = os.path.splitext(os.path.basename(video_path))[0]  # e.g., IMG_3033
+    base_name = base_name or os.path.splitext(os.path.basename(video_path))[0]  # e.g., IMG_3033
+
+    # DOACH_FRAME_STORE=pack -> one memory-mapped container instead of a JPEG per frame
+    pack = frame_store.FramePackWriter(out_dir) if frame_store.PACK_ENABLED else None
 
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
-        if i % step == 0:
+        if (i in keep) if keep is not None else (i % step == 0):
             filename = f'{base_name}_frame_{frame_id:03d}.jpg'
-            cv2.imwrite(os.path.join(out_dir, filename), frame)
+            if deduper and not deduper.check(frame, i, filename):
+                i += 1
+                continue
+            if pack:
+                ok, buf = cv2.imencode('.jpg', frame)
+                if ok:
+                    pack.add(filename, buf.tobytes())
+            else:
+                cv2.imwrite(os.path.join(out_dir, filename), frame)
             saved.append(filename)
             frame_id += 1
         i += 1
 
     cap.release()
+    if pack:
+        pack.close()
+    # a previous run of this clip may have kept more frames; don't serve its leftovers
+    frame_store.drop_stale(out_dir, f'{base_name}_frame_', saved, packed=bool(pack))
     return saved
 
 #use openai to label objects in ea frame
@@ -536,14 +1060,15 @@ def label_frame():
         return jsonify({'error': 'Invalid path'}), 400
 
     abs_path = os.path.join('frame_cache', *path.split('/')[2:])
-    if not os.path.exists(abs_path):
+    lap = metrics.lap()
+    img_bytes = frame_store.read_frame(os.path.dirname(abs_path), os.path.basename(abs_path))  # loose or packed
+    if img_bytes is None:
         return jsonify({'error': f'Frame not found: {abs_path}'}), 404
+    lap("read")
 
     try:
-        # 🔍 Load image and encode to base64
-        with open(abs_path, "rb") as f:
-            img_bytes = f.read()
-            b64_img = base64.b64encode(img_bytes).decode('utf-8')
+        # 🔍 Encode to base64
+        b64_img = base64.b64encode(img_bytes).decode('utf-8')
 
         # 🧠 GPT prompt
         vision_prompt = {
@@ -564,7 +1089,8 @@ def label_frame():
             ]
         }
 
-        response = get_openai_client().chat.completions.create(
+        response = upstream.chat(
+            endpoint="vision",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": (
@@ -575,8 +1101,10 @@ def label_frame():
             max_tokens=500
         )
 
+        lap("vision")
         raw_text = response.choices[0].message.content.strip()
         boxes = parse_vision_boxes(raw_text)
+        lap("parse")
 
         # ✅ Filter by confidence
         high_conf_boxes = [b for b in boxes if b.get('confidence', 1.0) >= CONFIDENCE_THRESHOLD]
@@ -607,6 +1135,7 @@ def label_frame():
 
         # Copy image
         shutil.copy(abs_path, os.path.join(train_image_dir, os.path.basename(abs_path)))
+        lap("save")
 
         return jsonify({
             'summary': raw_text,
@@ -636,7 +1165,10 @@ def copy_label_to_dataset():
     os.makedirs(os.path.dirname(image_dst), exist_ok=True)
 
     shutil.copy2(src_txt, label_dst)
-    shutil.copy2(src_img, image_dst)
+    if os.path.exists(src_img):
+        shutil.copy2(src_img, image_dst)
+    else:
+        frame_store.materialize(os.path.join('frame_cache', folder), image, image_dst)
 
     return jsonify({ 'status': f'✅ Copied {filename} and {image} to training folders.' })
 
@@ -668,7 +1200,10 @@ def auto_detect_frame():
             print(f"✅ Found: {image_path}")
             break
 
+    img = None
     if not image_path:
+        img = frame_store.decode_frame(os.path.join('frame_cache', folder), filename)  # packed?
+    if not image_path and img is None:
         print("❌ Not found in any listed paths.")
         return jsonify({ 'error': f"Frame not found: {filename}" }), 500
 
@@ -676,8 +1211,9 @@ def auto_detect_frame():
         model = YOLO("runs/detect/doach_gpt_v1313/weights/best.pt")
         model.model.names = ['basketball', 'hoop', 'net', 'backboard', 'player']  # must assign to model.model.names
 
-        results = model.predict(image_path, conf=0.05, imgsz=1280)[0]
-        img = cv2.imread(image_path)
+        if img is None:
+            img = cv2.imread(image_path)
+        results = model.predict(img, conf=0.05, imgsz=1280)[0]
         orig_h, orig_w = img.shape[:2]
 
         detections = []
@@ -722,7 +1258,12 @@ def move_to_manual_review(abs_path, boxes, reason, extra=None):
     manual_dir = os.path.join("frame_cache", video_name, "manual_review")
     os.makedirs(manual_dir, exist_ok=True)
     dest_path = os.path.join(manual_dir, os.path.basename(abs_path))
-    shutil.move(abs_path, dest_path)
+    if os.path.exists(abs_path):
+        shutil.move(abs_path, dest_path)
+    else:  # packed frame: copy it out and hide it in the pack
+        src_dir, name = os.path.split(abs_path)
+        frame_store.materialize(src_dir, name, dest_path)
+        frame_store.remove_packed(src_dir, name)
 
     # Move label file if it exists
     label_name = os.path.splitext(os.path.basename(abs_path))[0] + ".txt"
@@ -848,20 +1389,25 @@ def detect_frame():
     data = request.get_json()
     if not data or 'frame' not in data:
         return jsonify({'error': 'Missing frame'}), 400
+    _sync_serving_model()
+    lap = metrics.lap()
 
     try:
         # Decode base64 image
         b64 = data['frame'].split(',')[-1]
         img_data = base64.b64decode(b64)
         frame = cv2.imdecode(np.frombuffer(img_data, np.uint8), cv2.IMREAD_COLOR)
+        lap("decode")
 
         # Optional: crisp it up a bit
         sharpen_kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
         frame = cv2.filter2D(frame, -1, sharpen_kernel)
         frame = cv2.convertScaleAbs(frame, alpha=1.3, beta=15)
+        lap("preprocess")
 
         # YOLO predict (low-ish conf; we'll filter below)
         results = model_det.predict(frame, conf=0.15, imgsz=1280)[0]
+        lap("predict")
 
         # Class ID -> label (must match training/export)
         label_map = {
@@ -901,6 +1447,10 @@ def detect_frame():
                 'box': [x1, y1, x2, y2]
             })
 
+        fallback = _ball_fallback(data, frame, detections)
+        if fallback:
+            detections.append(fallback)
+
         # ---------- POST-PROCESS CORRECTIONS (runs BEFORE return) ----------
         # helpers
         def _w_h_ar(box):
@@ -979,11 +1529,17 @@ def detect_frame():
         # from collections import Counter
         # print("Counts:", Counter([d['label'] for d in detections]))
 
-        return jsonify({
+        tracks = _update_tracks(data, detections)
+        lap("postprocess")
+
+        resp = jsonify({
             'frameIndex': frame_memory['frame_id'],
             'objects': detections,
+            'tracks': tracks,
             'ball_path': frame_memory['ball_path']
         })
+        lap("encode")
+        return resp
 
     except Exception as e:
         traceback.print_exc()
@@ -0,0 +1,228 @@
+"""
+Benchmark a candidate weights file against the served model on a fixed held-out frame set.
+
+    python benchmark_model.py runs/detect/doach_gpt_v14/weights/best.pt
+    python benchmark_model.py cand.pt --baseline weights/best.pt --frames datasets/doach_holdout/images
+
+The held-out set (datasets/doach_holdout/images with labels/ alongside, or DOACH_HOLDOUT_DIR)
+must be frames training never saw: doach_seg's val split picks best.pt, so scoring on it
+flatters every candidate. The gate refuses to run without a holdout, or on a training split.
+
+Reports per-class precision/recall at the same per-class thresholds /detect_frame applies,
+plus CPU latency p50/p95/p99 and peak RSS at imgsz 640 and 1280. Each (model, imgsz) pair
+runs in its own benchmark_worker.py process so peak RSS isn't polluted by the other model
+(or by the app that asked for the gate); a process that crashes or runs past BENCH_TIMEOUT
+counts as an error, which fails the gate.
+Exit code is 1 when the candidate fails the gate.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+SERVED_WEIGHTS = BASE_DIR / "weights" / "best.pt"
+HOLDOUT_DIR = Path(os.getenv("DOACH_HOLDOUT_DIR", BASE_DIR / "datasets" / "doach_holdout" / "images"))
+TRAINING_SPLITS = BASE_DIR / "datasets" / "doach_seg"   # train + val: never a valid holdout
+WORKER = BASE_DIR / "benchmark_worker.py"
+IMG_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Class order used in training labels (same as LABEL_TO_CLASS in app.py)
+CLASS_NAMES = ['basketball', 'hoop', 'net', 'backboard', 'player']
+
+# Per-class thresholds from /detect_frame — keep in sync with app.py / PA_app.py
+DETECT_THRESHOLDS = {
+    'app': {'basketball': 0.46, 'hoop': 0.12, 'backboard': 0.10, 'player': 0.40, 'net': 0.15},
+    'pa':  {'basketball': 0.35, 'hoop': 0.15, 'backboard': 0.25, 'player': 0.40, 'net': 0.15},
+}
+
+# Normalize synonyms from older training runs → UI labels (same as PA_app detect_frame)
+LABEL_SYNONYMS = {'ball': 'basketball', 'person': 'player', 'rim': 'hoop', 'human': 'player'}
+
+IMG_SIZES = (640, 1280)
+IOU_MATCH = 0.5
+BENCH_TIMEOUT = float(os.getenv("DOACH_BENCH_TIMEOUT", "1800"))  # seconds per (model, imgsz) run
+
+
+def check_holdout(frames_dir):
+    """Raise unless frames_dir is an existing folder outside the training dataset."""
+    path = Path(frames_dir).resolve()
+    if not path.is_dir():
+        raise FileNotFoundError(
+            f"No held-out set at {frames_dir}: put frames best.pt was never trained or selected on in "
+            f"{HOLDOUT_DIR} (labels/ alongside images/) or point DOACH_HOLDOUT_DIR at one")
+    splits = TRAINING_SPLITS.resolve()
+    if path == splits or splits in path.parents:
+        raise ValueError(f"{frames_dir} is part of the training dataset {TRAINING_SPLITS}; "
+                         f"benchmark on a separate holdout split")
+
+
+def list_frames(frames_dir, limit=None):
+    frames = sorted(str(p) for p in Path(frames_dir).iterdir() if p.suffix.lower() in IMG_EXTS)
+    return frames[:limit] if limit else frames
+
+
+def _label_path(img_path):
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return sb.join(img_path.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt'
+
+
+def load_ground_truth(img_path, w, h):
+    """YOLO bbox labels → list of (label, [x1, y1, x2, y2]) in pixels."""
+    path = _label_path(img_path)
+    out = []
+    if not os.path.exists(path):
+        return out
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 5:
+                continue  # polygon rows aren't part of the detect benchmark
+            cls = int(parts[0])
+            if cls >= len(CLASS_NAMES):
+                continue
+            cx, cy, bw, bh = (float(v) for v in parts[1:])
+            out.append((CLASS_NAMES[cls], [(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h]))
+    return out
+
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    ua = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / ua if ua > 0 else 0.0
+
+
+def match_counts(preds, gts, counts):
+    """Greedy per-class matching by confidence; accumulates tp/fp/fn into counts."""
+    for label in CLASS_NAMES:
+        p = sorted((d for d in preds if d[0] == label), key=lambda d: -d[1])
+        g = [box for lab, box in gts if lab == label]
+        used = set()
+        for _, _, box in p:
+            best, best_j = 0.0, -1
+            for j, gbox in enumerate(g):
+                if j in used:
+                    continue
+                v = _iou(box, gbox)
+                if v > best:
+                    best, best_j = v, j
+            if best >= IOU_MATCH:
+                used.add(best_j)
+                counts[label]['tp'] += 1
+            else:
+                counts[label]['fp'] += 1
+        counts[label]['fn'] += len(g) - len(used)
+
+
+def benchmark(weights, frames, imgsz, thresholds, warmup=3, timeout=BENCH_TIMEOUT):
+    """Run benchmark_worker.py on one (weights, imgsz) pair; errors come back as {'error': ...}."""
+    with tempfile.TemporaryDirectory(prefix="doach_bench_") as tmp:
+        job_path, result_path = os.path.join(tmp, "job.json"), os.path.join(tmp, "result.json")
+        with open(job_path, "w", encoding="utf-8") as f:
+            json.dump({'weights': str(weights), 'frames': frames, 'imgsz': imgsz,
+                       'thresholds': thresholds, 'warmup': warmup}, f)
+        try:
+            proc = subprocess.run([sys.executable, str(WORKER), job_path, result_path],
+                                  cwd=str(BASE_DIR), timeout=timeout)
+        except subprocess.TimeoutExpired:
+            result = {'error': f"benchmark timed out after {timeout:.0f}s"}
+        else:
+            try:
+                with open(result_path, encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = {'error': f"benchmark process died (exit code {proc.returncode})"}
+    result.setdefault('weights', str(weights))
+    result.setdefault('imgsz', imgsz)
+    return result
+
+
+def compare(candidate, baseline, max_latency_regress=0.10, max_recall_drop=0.02):
+    """Gate: candidate p95 may not regress more than max_latency_regress, nor any class recall drop more than max_recall_drop."""
+    reasons = []
+    if candidate.get('error') or baseline.get('error'):
+        return False, [candidate.get('error') or baseline.get('error')]
+
+    c95, b95 = candidate['latency_ms']['p95'], baseline['latency_ms']['p95']
+    if b95 and c95 > b95 * (1 + max_latency_regress):
+        reasons.append(f"imgsz {candidate['imgsz']}: p95 {c95}ms vs {b95}ms")
+
+    for cls, cm in candidate['per_class'].items():
+        bm = baseline['per_class'].get(cls, {})
+        if cm['recall'] is None or bm.get('recall') is None:
+            continue
+        if cm['recall'] < bm['recall'] - max_recall_drop:
+            reasons.append(f"imgsz {candidate['imgsz']}: {cls} recall {cm['recall']} vs {bm['recall']}")
+    return not reasons, reasons
+
+
+def run_gate(candidate, baseline=SERVED_WEIGHTS, frames_dir=HOLDOUT_DIR, thresholds='app',
+             img_sizes=IMG_SIZES, limit=None, report_path=None, **gate_kw):
+    """Benchmark candidate vs baseline at each imgsz. Returns (passed, report)."""
+    check_holdout(frames_dir)
+    frames = list_frames(frames_dir, limit)
+    if not frames:
+        raise FileNotFoundError(f"No held-out frames in {frames_dir}")
+    th = DETECT_THRESHOLDS[thresholds] if isinstance(thresholds, str) else thresholds
+
+    report = {'candidate': str(candidate), 'baseline': str(baseline), 'frames_dir': str(frames_dir),
+              'thresholds': th, 'results': [], 'passed': True, 'reasons': []}
+    for imgsz in img_sizes:
+        cand = benchmark(candidate, frames, imgsz, th)
+        base = benchmark(baseline, frames, imgsz, th) if baseline and Path(baseline).exists() else None
+        ok, reasons = compare(cand, base, **gate_kw) if base else (not cand.get('error'), [])
+        report['results'].append({'imgsz': imgsz, 'candidate': cand, 'baseline': base, 'passed': ok})
+        report['passed'] = report['passed'] and ok
+        report['reasons'].extend(reasons)
+
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return report['passed'], report
+
+
+def print_report(report):
+    for r in report['results']:
+        print(f"\n📏 imgsz={r['imgsz']}")
+        for tag in ('candidate', 'baseline'):
+            m = r[tag]
+            if not m:
+                continue
+            if m.get('error'):
+                print(f"  {tag:9s} ❌ {m['error']}")
+                continue
+            lat = m['latency_ms']
+            print(f"  {tag:9s} p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms rss={m['peak_rss_mb']}MB")
+            for cls, pc in m['per_class'].items():
+                print(f"    {cls:10s} P={pc['precision']}  R={pc['recall']}")
+    print("\n✅ Candidate passes gate" if report['passed'] else "\n❌ Candidate fails gate:\n  " + "\n  ".join(report['reasons']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark candidate YOLO weights against the served model.")
+    parser.add_argument('candidate')
+    parser.add_argument('--baseline', default=str(SERVED_WEIGHTS))
+    parser.add_argument('--frames', default=str(HOLDOUT_DIR), help="held-out images/ folder (labels/ alongside)")
+    parser.add_argument('--thresholds', default='app', choices=sorted(DETECT_THRESHOLDS))
+    parser.add_argument('--imgsz', default=",".join(map(str, IMG_SIZES)))
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--max-latency-regress', type=float, default=0.10)
+    parser.add_argument('--max-recall-drop', type=float, default=0.02)
+    parser.add_argument('--report', default=None, help="write JSON report here")
+    args = parser.parse_args(argv)
+
+    passed, report = run_gate(
+        args.candidate, args.baseline, args.frames, args.thresholds,
+        [int(s) for s in args.imgsz.split(',')], args.limit, args.report,
+        max_latency_regress=args.max_latency_regress, max_recall_drop=args.max_recall_drop,
+    )
+    print_report(report)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
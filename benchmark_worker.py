@@ -0,0 +1,98 @@
+"""
+Child process for benchmark_model: load one weights file, predict the held-out frames at one
+imgsz, write the metrics as JSON.
+
+    python benchmark_worker.py job.json result.json
+
+Kept separate from benchmark_model so the child starts from a bare interpreter: a spawn()ed
+multiprocessing child re-imports the parent's __main__ (app.py, with its model and job manager),
+which is exactly the RSS the benchmark is trying to measure.
+"""
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+from benchmark_model import CLASS_NAMES, LABEL_SYNONYMS, load_ground_truth, match_counts
+
+
+def _peak_rss_mb():
+    import resource
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024.0 if sys.platform != 'darwin' else kb / (1024.0 * 1024.0)
+
+
+def run_one(weights, frames, imgsz, thresholds, warmup):
+    """Load model, predict every frame, return metrics."""
+    import cv2
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(int(os.getenv("OMP_NUM_THREADS", "1")))
+    model = YOLO(weights)
+    try:
+        model.fuse()
+    except Exception:
+        pass
+    names = getattr(model.model, 'names', {}) or {}
+
+    imgs = [cv2.imread(p) for p in frames]
+    for im in imgs[:warmup]:
+        model.predict(im, imgsz=imgsz, conf=0.05, device='cpu', verbose=False)
+
+    counts = {c: {'tp': 0, 'fp': 0, 'fn': 0} for c in CLASS_NAMES}
+    latencies = []
+    for path, im in zip(frames, imgs):
+        if im is None:
+            continue
+        t0 = time.perf_counter()
+        res = model.predict(im, imgsz=imgsz, conf=0.05, device='cpu', verbose=False)[0]
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        preds = []
+        for box in res.boxes:
+            raw = str(names.get(int(box.cls[0]), int(box.cls[0]))).lower()
+            label = LABEL_SYNONYMS.get(raw, raw)
+            conf = float(box.conf[0])
+            if label in thresholds and conf >= thresholds[label]:
+                preds.append((label, conf, box.xyxy[0].tolist()))
+        h, w = im.shape[:2]
+        match_counts(preds, load_ground_truth(path, w, h), counts)
+
+    per_class = {}
+    for c, k in counts.items():
+        per_class[c] = {
+            'precision': round(k['tp'] / (k['tp'] + k['fp']), 4) if k['tp'] + k['fp'] else None,
+            'recall': round(k['tp'] / (k['tp'] + k['fn']), 4) if k['tp'] + k['fn'] else None,
+            **k,
+        }
+
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        'weights': str(weights),
+        'imgsz': imgsz,
+        'frames': len(latencies),
+        'latency_ms': {q: round(float(np.percentile(lat, int(q[1:]))), 2) for q in ('p50', 'p95', 'p99')},
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'per_class': per_class,
+    }
+
+
+def main(argv=None):
+    job_path, result_path = (argv or sys.argv[1:])[:2]
+    with open(job_path, encoding='utf-8') as f:
+        job = json.load(f)
+    try:
+        result = run_one(job['weights'], job['frames'], job['imgsz'], job['thresholds'], job['warmup'])
+    except Exception as e:
+        result = {'error': str(e), 'weights': job['weights'], 'imgsz': job['imgsz']}
+    tmp = result_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    os.replace(tmp, result_path)
+
+
+if __name__ == '__main__':
+    main()
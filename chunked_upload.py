@@ -0,0 +1,373 @@
+"""
+Chunked, resumable video uploads with a running content hash.
+
+Protocol (all JSON except the chunk bodies):
+    POST /api/uploads            {filename, size, target, sha256?}  -> {id, offset, chunk_size}
+                                 (or {duplicate: true, name, url} when sha256 is already stored)
+    PUT  /api/uploads/<id>?offset=N   raw bytes                     -> {offset, size, done, ...}
+    GET  /api/uploads/<id>                                          -> {offset, size}   (resume point)
+    DELETE /api/uploads/<id>
+
+Chunks are streamed straight from the request into data/upload_parts/<id>.part. Session
+state is a small JSON file next to it, so any gunicorn worker can take the next chunk;
+the sha256 state lives in the process and is rebuilt from the partial file only when a
+chunk lands in a different worker than the previous one. Finished files are keyed by
+sha256 in data/uploads.sqlite, so re-uploading the same clip returns the stored copy.
+Files that were already in the target folders before the index existed are hashed into it
+by a background backfill (one process at a time, already-indexed names are skipped).
+A finished upload leaves a small <id>.done.json behind for DONE_TTL, so a client that lost
+the response to its final chunk gets the same result when it retries instead of a 404.
+"""
+import os
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+PARTS_DIR = Path("data") / "upload_parts"
+UPLOADS_DB = Path("data") / "uploads.sqlite"
+CHUNK_SIZE = 8 * 1024 * 1024       # what clients are told to send
+COPY_BUF = 1024 * 1024             # request stream -> disk
+STALE_AFTER = 24 * 3600            # abandoned partial uploads are swept after a day
+DONE_TTL = 3600                    # completion records answer retried final chunks this long
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def _copy_hashing(stream, f, hasher, limit=None):
+    """Copy a file-like stream to f in COPY_BUF pieces, updating hasher. Returns bytes written."""
+    n = 0
+    while limit is None or n < limit:
+        want = COPY_BUF if limit is None else min(COPY_BUF, limit - n)
+        buf = stream.read(want)
+        if not buf:
+            break
+        f.write(buf)
+        hasher.update(buf)
+        n += len(buf)
+    return n
+
+
+class UploadManager:
+    def __init__(self, targets, parts_dir=PARTS_DIR, db_path=UPLOADS_DB, on_complete=None, backfill=True):
+        """
+        targets: {"videos": ("static/videos", "/static/videos"), "uploads": ("uploads", "/uploads")}
+        on_complete(target, name) runs after a new (non-duplicate) file lands.
+        backfill: index files already in the target folders from a daemon thread.
+        """
+        self.targets = {k: (Path(d), url.rstrip("/")) for k, (d, url) in targets.items()}
+        self.parts_dir = Path(parts_dir)
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.on_complete = on_complete
+        self._local = threading.local()
+        self._hashers = {}   # upload id -> (offset, sha256 object)
+        self._lock = threading.Lock()
+
+        with self._conn() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS uploads (
+                            sha256 TEXT NOT NULL,
+                            target TEXT NOT NULL,
+                            name TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created REAL NOT NULL,
+                            PRIMARY KEY (sha256, target))""")
+        self._sweep()
+        if backfill:
+            threading.Thread(target=self.backfill, name="upload-backfill", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- paths / state ----------
+    def _part(self, uid):
+        return self.parts_dir / f"{uid}.part"
+
+    def _meta_path(self, uid):
+        return self.parts_dir / f"{uid}.json"
+
+    def _done_path(self, uid):
+        return self.parts_dir / f"{uid}.done.json"
+
+    def _completed(self, uid):
+        """Result of an upload that already finished (within DONE_TTL), else None."""
+        try:
+            p = self._done_path(uid)
+            if time.time() - p.stat().st_mtime > DONE_TTL:
+                return None
+            return json.loads(p.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _mark_done(self, uid, result):
+        tmp = self._done_path(uid).with_suffix(".tmp")
+        tmp.write_text(json.dumps(dict(result, id=uid)))
+        os.replace(tmp, self._done_path(uid))
+
+    @staticmethod
+    def _check_id(uid):
+        if not uid or len(uid) != 32 or not all(c in "0123456789abcdef" for c in uid):
+            raise UploadError("unknown upload", 404)
+
+    def _load(self, uid):
+        self._check_id(uid)
+        try:
+            return json.loads(self._meta_path(uid).read_text())
+        except FileNotFoundError:
+            raise UploadError("unknown upload", 404)
+
+    def _save(self, meta):
+        tmp = self._meta_path(meta["id"]).with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self._meta_path(meta["id"]))
+
+    def _target(self, target):
+        if target not in self.targets:
+            raise UploadError(f"unknown target '{target}'")
+        return self.targets[target]
+
+    def url_for(self, target, name):
+        return f"{self._target(target)[1]}/{name}"
+
+    def _sweep(self):
+        now = time.time()
+        for p in self.parts_dir.glob("*"):
+            ttl = DONE_TTL if p.name.endswith(".done.json") else STALE_AFTER
+            try:
+                if p.stat().st_mtime < now - ttl:
+                    p.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------- dedupe index ----------
+    def find(self, sha256, target):
+        """Existing upload with this content in this target, if its file is still there."""
+        row = self._conn().execute(
+            "SELECT name FROM uploads WHERE sha256=? AND target=?", (sha256, target)).fetchone()
+        if row and (self._target(target)[0] / row[0]).exists():
+            return row[0]
+        return None
+
+    def _record(self, sha256, target, name, size):
+        with self._conn() as c:
+            c.execute("""INSERT INTO uploads (sha256, target, name, size, created) VALUES (?, ?, ?, ?, ?)
+                         ON CONFLICT (sha256, target) DO UPDATE SET name=excluded.name, size=excluded.size,
+                         created=excluded.created""",
+                      (sha256, target, name, size, time.time()))
+
+    def backfill(self):
+        """Hash files that landed in the target folders without going through the index."""
+        lock_path = self.db_path.with_suffix(".backfill.lock")
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0   # another worker is already on it
+            added = 0
+            for target, (folder, _) in self.targets.items():
+                if not folder.is_dir():
+                    continue
+                known = {r[0] for r in self._conn().execute(
+                    "SELECT name FROM uploads WHERE target=?", (target,))}
+                for p in sorted(folder.iterdir()):
+                    if p.name in known or p.name.startswith(".") or not p.is_file():
+                        continue
+                    hasher = hashlib.sha256()
+                    try:
+                        with open(p, "rb") as f:
+                            for buf in iter(lambda: f.read(COPY_BUF), b""):
+                                hasher.update(buf)
+                        size = p.stat().st_size
+                    except OSError as e:
+                        print(f"⚠️ upload backfill skipped {p}: {e}")
+                        continue
+                    sha = hasher.hexdigest()
+                    if self.find(sha, target):
+                        continue   # keep the name an upload already recorded for this content
+                    self._record(sha, target, p.name, size)
+                    added += 1
+            if added:
+                print(f"📇 upload index backfilled {added} existing file(s)")
+            return added
+
+    def _duplicate(self, target, name):
+        return {"done": True, "duplicate": True, "name": name, "url": self.url_for(target, name)}
+
+    def _place(self, src, target, filename, sha256, size):
+        """Move a finished file into the target folder (never over a different file) and index it."""
+        folder = self._target(target)[0]
+        folder.mkdir(parents=True, exist_ok=True)
+        stem, ext = os.path.splitext(filename)
+        name, n = filename, 1
+        while (folder / name).exists():
+            name = f"{stem}_{n}{ext}"
+            n += 1
+        os.replace(src, folder / name)
+        self._record(sha256, target, name, size)
+        if self.on_complete:
+            try:
+                self.on_complete(target, name)
+            except Exception as e:
+                print(f"⚠️ upload on_complete failed for {name}: {e}")
+        return {"done": True, "duplicate": False, "name": name, "url": self.url_for(target, name),
+                "sha256": sha256, "size": size}
+
+    # ---------- single-request uploads (legacy multipart routes) ----------
+    def save_stream(self, stream, filename, target):
+        """Stream an already-open upload to disk with hashing + dedupe (used by /upload and POST /videos)."""
+        self._target(target)
+        tmp = self.parts_dir / f"{uuid.uuid4().hex}.part"
+        hasher = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as f:
+                size = _copy_hashing(stream, f, hasher)
+            sha = hasher.hexdigest()
+            existing = self.find(sha, target)
+            if existing:
+                return self._duplicate(target, existing)
+            return self._place(tmp, target, filename, sha, size)
+        finally:
+            try:
+                tmp.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------- resumable protocol ----------
+    def create(self, filename, size, target, sha256=None):
+        self._target(target)
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise UploadError("size is required")
+        if size <= 0:
+            raise UploadError("size must be positive")
+        if sha256:
+            existing = self.find(sha256.lower(), target)
+            if existing:
+                return self._duplicate(target, existing)
+        uid = uuid.uuid4().hex
+        meta = {"id": uid, "filename": filename, "size": size, "target": target,
+                "sha256": (sha256 or "").lower() or None, "created": time.time()}
+        self._part(uid).touch()
+        self._save(meta)
+        return {"id": uid, "offset": 0, "size": size, "chunk_size": CHUNK_SIZE, "done": False}
+
+    def status(self, uid):
+        self._check_id(uid)
+        done = self._completed(uid)
+        if done:
+            return done
+        meta = self._load(uid)
+        try:
+            offset = self._part(uid).stat().st_size
+        except FileNotFoundError:
+            raise UploadError("unknown upload", 404)
+        return {"id": uid, "offset": offset, "size": meta["size"], "chunk_size": CHUNK_SIZE, "done": False}
+
+    def _hasher_at(self, uid, offset):
+        """sha256 state covering the first `offset` bytes of the partial file."""
+        with self._lock:
+            held = self._hashers.pop(uid, None)
+        if held and held[0] == offset:
+            return held[1]
+        # chunk landed in another worker (or after a restart): rebuild from disk
+        h = hashlib.sha256()
+        with open(self._part(uid), "rb") as f:
+            remaining = offset
+            while remaining:
+                buf = f.read(min(COPY_BUF, remaining))
+                if not buf:
+                    break
+                h.update(buf)
+                remaining -= len(buf)
+        return h
+
+    def write_chunk(self, uid, offset, stream, length=None):
+        self._check_id(uid)
+        done = self._completed(uid)
+        if done:
+            return done   # retry of a final chunk whose response was lost
+        meta = self._load(uid)
+        try:
+            f = open(self._part(uid), "r+b")
+        except FileNotFoundError:
+            # finished (or aborted) by another request between _load and open
+            done = self._completed(uid)
+            if done:
+                return done
+            raise UploadError("unknown upload", 404)
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX)   # one writer per upload, across workers
+            if not self._meta_path(uid).exists():
+                # the request holding the lock before us finished it; f is the moved file now
+                done = self._completed(uid)
+                if done:
+                    return done
+                raise UploadError("unknown upload", 404)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError("offset mismatch", 409, offset=current)
+            try:
+                hasher = self._hasher_at(uid, current)
+            except FileNotFoundError:
+                raise UploadError("unknown upload", 404)
+            f.seek(current)
+            limit = meta["size"] - current
+            if length is not None:
+                limit = min(limit, int(length))
+            written = _copy_hashing(stream, f, hasher, limit=limit)
+            f.flush()
+            offset = current + written
+
+            if offset < meta["size"]:
+                with self._lock:
+                    self._hashers[uid] = (offset, hasher)
+                return {"id": uid, "offset": offset, "size": meta["size"], "done": False}
+            # finish while still holding the lock so a concurrent chunk can't see a half-moved upload
+            return self._finish(meta, hasher)
+
+    def _finish(self, meta, hasher):
+        uid, target = meta["id"], meta["target"]
+        sha = hasher.hexdigest()
+        if meta.get("sha256") and meta["sha256"] != sha:
+            self.abort(uid)
+            raise UploadError("checksum mismatch", 422, expected=meta["sha256"], actual=sha)
+        try:
+            existing = self.find(sha, target)
+            if existing:
+                result = self._duplicate(target, existing)
+            else:
+                result = self._place(self._part(uid), target, meta["filename"], sha, meta["size"])
+        except FileNotFoundError:
+            raise UploadError("upload is no longer available", 404)
+        try:
+            self._mark_done(uid, result)
+        except OSError as e:
+            print(f"⚠️ could not record completion of upload {uid}: {e}")
+        self.abort(uid)
+        return result
+
+    def abort(self, uid):
+        self._check_id(uid)
+        with self._lock:
+            self._hashers.pop(uid, None)
+        for p in (self._part(uid), self._meta_path(uid)):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,137 @@
+"""
+Response cache for structured /api/coach shot-feedback calls.
+
+Shot metrics are canonicalized into coarse buckets (release angle, entry angle, arc,
+made / miss side) plus locale, model, player profile and a hash of the prompt inputs
+(cue category, draft line, personality, recent categories, system text), so "same miss
+pattern, same player, same ask" maps to one key. Each key keeps up to K reply variants; once K are stored,
+replies rotate through them until the TTL runs out and fresh ones are generated.
+Stored in SQLite so gunicorn workers share it.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+COACH_CACHE_DB = Path("data") / "coach_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_VARIANTS = 4
+
+RELEASE_BUCKET = 5   # degrees
+ENTRY_BUCKET = 4     # degrees
+ARC_BUCKET = 20      # px above rim
+
+
+def _bucket(v, size):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    if v != v:  # NaN
+        return None
+    return int(v // size) * size
+
+
+def miss_side(shot):
+    """Collapse shot_logger's miss reasons into a few sides."""
+    if shot.get("made"):
+        return "make"
+    reason = str(shot.get("missReason") or shot.get("miss_reason") or "").lower()
+    for key, side in (("left", "left"), ("right", "right"), ("short", "short"),
+                      ("rise", "flat"), ("flat", "flat"), ("long", "long")):
+        if key in reason:
+            return side
+    return "miss"
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def shot_signature(shot, profile=None, lang="en-US", model="gpt-4o-mini", context=None):
+    """
+    Canonical bucket dict for a shot payload, or None if there's nothing structured to key on
+    (no shot, or none of its metrics present). `context` is whatever else shaped the prompt;
+    it is hashed into the key so different asks about the same shot never share replies.
+    """
+    if not isinstance(shot, dict):
+        return None
+    sig = {
+        "side": miss_side(shot),
+        "release": _bucket(shot.get("releaseAngle"), RELEASE_BUCKET),
+        "entry": _bucket(shot.get("entryAngle"), ENTRY_BUCKET),
+        "arc": _bucket(shot.get("arcHeight"), ARC_BUCKET),
+        "lang": lang,
+        "model": model,
+    }
+    if sig["release"] is None and sig["entry"] is None and sig["arc"] is None:
+        return None
+    if profile:
+        sig["profile"] = _digest(profile)[:12]
+    if context is not None:
+        sig["context"] = _digest(context)
+    return sig
+
+
+def signature_key(sig):
+    return hashlib.sha256(json.dumps(sig, sort_keys=True).encode()).hexdigest()
+
+
+class CoachCache:
+    def __init__(self, db_path=COACH_CACHE_DB, ttl=DEFAULT_TTL, variants=DEFAULT_VARIANTS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._rotation = defaultdict(int)
+        with self._conn() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS coach_replies (
+                            key TEXT NOT NULL,
+                            text TEXT NOT NULL,
+                            created REAL NOT NULL)""")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_coach_key ON coach_replies (key, created)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """A cached reply once the key has K live variants (rotating); None means 'call the model'."""
+        cutoff = time.time() - self.ttl
+        rows = self._conn().execute(
+            "SELECT text FROM coach_replies WHERE key=? AND created>=? ORDER BY created", (key, cutoff)).fetchall()
+        if len(rows) < self.variants:
+            self.misses += 1
+            return None
+        i = self._rotation[key] % len(rows)
+        self._rotation[key] += 1
+        self.hits += 1
+        return rows[i][0]
+
+    def put(self, key, text):
+        if not text:
+            return
+        now = time.time()
+        with self._conn() as c:
+            c.execute("DELETE FROM coach_replies WHERE key=? AND created<?", (key, now - self.ttl))
+            c.execute("INSERT INTO coach_replies (key, text, created) VALUES (?, ?, ?)", (key, text, now))
+            # keep only the newest K variants
+            c.execute("""DELETE FROM coach_replies WHERE key=? AND rowid NOT IN (
+                            SELECT rowid FROM coach_replies WHERE key=? ORDER BY created DESC LIMIT ?)""",
+                      (key, key, self.variants))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "variants": self.variants, "ttl": self.ttl}
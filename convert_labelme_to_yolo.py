@@ -1,56 +1,183 @@
 import os
 import json
-import shutil
-import numpy as np
-import cv2
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 LABELS = ['backboard', 'ball', 'hoop', 'net']  # Ensure order is consistent
 
-input_dir = 'datasets/doach_seg/images/train'
-output_images = 'datasets/doach_seg/images/train'  # Stays same
-output_labels = 'datasets/doach_seg/labels/train'
+INPUT_DIR = 'datasets/doach_seg/images/train'
+OUTPUT_LABELS = 'datasets/doach_seg/labels/train'
+OUTPUT_BBOX_LABELS = 'datasets/doach_seg/labels_bbox/train'
 
-os.makedirs(output_labels, exist_ok=True)
+FORMATS = ('seg', 'bbox', 'both')
 
-def create_mask(image_shape, points):
-    mask = np.zeros(image_shape[:2], dtype=np.uint8)
-    cv2.fillPoly(mask, [np.array(points, dtype=np.int32)], color=1)
-    return mask
 
-def convert():
-    for filename in os.listdir(input_dir):
-        if not filename.endswith('.json'):
+def read_image_size(data, json_path):
+    """Return (width, height) from LabelMe JSON, falling back to the image header only."""
+    width, height = data.get('imageWidth'), data.get('imageHeight')
+    if width and height:
+        return int(width), int(height)
+
+    from PIL import Image  # Image.open only parses the header until pixels are touched
+
+    image_path = os.path.join(os.path.dirname(json_path), data.get('imagePath') or '')
+    with Image.open(image_path) as im:
+        return im.size
+
+
+def shape_to_polygon(shape):
+    """Normalize a LabelMe shape to a list of (x, y) points, or None if it isn't usable."""
+    points = shape.get('points') or []
+    shape_type = shape.get('shape_type') or 'polygon'
+
+    if shape_type == 'rectangle' and len(points) == 2:
+        (x1, y1), (x2, y2) = points
+        points = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+    elif shape_type != 'polygon':
+        return None
+
+    if len(points) < 3:
+        return None
+
+    # Shoelace area — drop degenerate (collinear / zero-area) polygons
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        area += x1 * y2 - x2 * y1
+    if abs(area) < 1e-6:
+        return None
+
+    return [(float(x), float(y)) for x, y in points]
+
+
+def _clamp01(v):
+    return min(1.0, max(0.0, v))
+
+
+def to_yolo_lines(data, width, height, labels, fmt):
+    """Build (seg_lines, bbox_lines, warnings) for one LabelMe document."""
+    seg_lines, bbox_lines, warnings = [], [], []
+
+    for shape in data.get('shapes', []):
+        label_name = shape.get('label')
+        if label_name not in labels:
+            warnings.append(f"unknown label: {label_name}")
+            continue
+
+        polygon = shape_to_polygon(shape)
+        if polygon is None:
+            warnings.append(f"invalid {shape.get('shape_type') or 'polygon'} for {label_name}")
             continue
 
-        json_path = os.path.join(input_dir, filename)
+        label_id = labels.index(label_name)
+        norm = [(_clamp01(x / width), _clamp01(y / height)) for x, y in polygon]
+
+        if fmt in ('seg', 'both'):
+            coords = " ".join(f"{nx:.6f} {ny:.6f}" for nx, ny in norm)
+            seg_lines.append(f"{label_id} {coords}")
+
+        if fmt in ('bbox', 'both'):
+            xs = [p[0] for p in norm]
+            ys = [p[1] for p in norm]
+            w, h = max(xs) - min(xs), max(ys) - min(ys)
+            if w <= 0 or h <= 0:
+                warnings.append(f"empty bbox for {label_name}")
+                continue
+            cx, cy = min(xs) + w / 2, min(ys) + h / 2
+            bbox_lines.append(f"{label_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}")
+
+    return seg_lines, bbox_lines, warnings
+
+
+def write_atomic(path, lines):
+    """Write to a temp file in the same directory then rename, so readers never see partial labels."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as out:
+        out.write("\n".join(lines) + ("\n" if lines else ""))
+    os.replace(tmp, path)
+
+
+def convert_file(json_path, seg_dir, bbox_dir, labels, fmt):
+    """Convert one LabelMe JSON; returns a small result dict (safe to send across processes)."""
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    try:
         with open(json_path, 'r') as f:
             data = json.load(f)
 
-        image_path = os.path.join(input_dir, data['imagePath'])
-        image = cv2.imread(image_path)
-        height, width = image.shape[:2]
+        width, height = read_image_size(data, json_path)
+        if width <= 0 or height <= 0:
+            raise ValueError(f"bad image size {width}x{height}")
+
+        seg_lines, bbox_lines, warnings = to_yolo_lines(data, width, height, labels, fmt)
+
+        if fmt in ('seg', 'both'):
+            write_atomic(os.path.join(seg_dir, name + '.txt'), seg_lines)
+        if fmt in ('bbox', 'both'):
+            write_atomic(os.path.join(bbox_dir, name + '.txt'), bbox_lines)
+
+        return {'file': name, 'ok': True, 'shapes': max(len(seg_lines), len(bbox_lines)), 'warnings': warnings}
+    except Exception as e:
+        return {'file': name, 'ok': False, 'error': str(e), 'warnings': []}
+
+
+def convert(input_dir=INPUT_DIR, output_labels=OUTPUT_LABELS, bbox_labels=OUTPUT_BBOX_LABELS,
+            labels=LABELS, fmt='seg', workers=None, strict=False):
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"duplicate names in label map: {labels}")
+
+    if fmt in ('seg', 'both'):
+        os.makedirs(output_labels, exist_ok=True)
+    if fmt in ('bbox', 'both'):
+        os.makedirs(bbox_labels, exist_ok=True)
+
+    json_files = sorted(
+        os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith('.json')
+    )
+    if not json_files:
+        print(f"⚠️ No LabelMe JSON found in {input_dir}")
+        return []
+
+    args = [(p, output_labels, bbox_labels, list(labels), fmt) for p in json_files]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        results = [convert_file(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(args) // (workers * 4))
+            results = list(pool.map(convert_file, *zip(*args), chunksize=chunksize))
+
+    failed = [r for r in results if not r['ok']]
+    unknown = sorted({w for r in results for w in r['warnings'] if w.startswith('unknown label')})
 
-        label_file = os.path.join(output_labels, os.path.splitext(filename)[0] + '.txt')
+    for r in results:
+        if not r['ok']:
+            print(f"❌ {r['file']}: {r['error']}")
+        for w in r['warnings']:
+            print(f"⚠️ {r['file']}: {w}")
 
-        with open(label_file, 'w') as out:
-            for shape in data['shapes']:
-                label_name = shape['label']
-                if label_name not in LABELS:
-                    print(f"⚠️ Skipping unknown label: {label_name}")
-                    continue
+    print(f"✅ Converted {len(results) - len(failed)}/{len(results)} files ({fmt})")
+    if strict and (failed or unknown):
+        raise SystemExit(f"❌ strict mode: {len(failed)} failed, unknown labels: {unknown}")
+    return results
 
-                label_id = LABELS.index(label_name)
-                polygon = shape['points']
 
-                # Normalize points
-                norm_points = []
-                for x, y in polygon:
-                    nx, ny = x / width, y / height
-                    norm_points.extend([nx, ny])
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert LabelMe JSON annotations to YOLO labels.")
+    parser.add_argument('--input', default=INPUT_DIR, help="folder with LabelMe .json files")
+    parser.add_argument('--out', default=OUTPUT_LABELS, help="segmentation label output folder")
+    parser.add_argument('--bbox-out', default=OUTPUT_BBOX_LABELS, help="bbox label output folder")
+    parser.add_argument('--labels', default=",".join(LABELS), help="comma-separated class names, in class-id order")
+    parser.add_argument('--format', default='seg', choices=FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument('--strict', action='store_true', help="fail on unknown labels or unreadable files")
+    args = parser.parse_args(argv)
 
-                out.write(f"{label_id} " + " ".join(map(str, norm_points)) + "\n")
+    labels = [s.strip() for s in args.labels.split(',') if s.strip()]
+    convert(args.input, args.out, args.bbox_out, labels, args.format, args.workers, args.strict)
+    print("🎯 All annotations converted to YOLOv8 format.")
 
-        print(f"✅ Converted {filename}")
 
-convert()
-print("🎯 All annotations converted to YOLOv8 format.")
+if __name__ == '__main__':
+    main()
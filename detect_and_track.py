@@ -2,39 +2,14 @@
 
 from ultralytics import YOLO
 import cv2
-import numpy as np
-from filterpy.kalman import KalmanFilter
-
-class KalmanFilter2D:
-    def __init__(self):
-        self.kf = KalmanFilter(dim_x=4, dim_z=2)
-        self.kf.F = np.array([[1, 0, 1, 0],
-                              [0, 1, 0, 1],
-                              [0, 0, 1, 0],
-                              [0, 0, 0, 1]])
-        self.kf.H = np.array([[1, 0, 0, 0],
-                              [0, 1, 0, 0]])
-        self.kf.R *= 5
-        self.kf.P *= 10
-        self.kf.Q *= 0.01
-        self.kf.x = np.zeros((4, 1))
-
-    def update(self, pt):
-        if pt is not None:
-            z = np.array([[pt[0]], [pt[1]]])
-            self.kf.predict()
-            self.kf.update(z)
-        else:
-            self.kf.predict()
-        return (int(self.kf.x[0]), int(self.kf.x[1]))
-
+from multi_tracker import MultiObjectTracker
 
 model = YOLO("weights/best.pt")
 label_map = {0: "basketball", 1: "hoop", 2: "human"}
 
 video_path = "videos/input_video.mp4"
 cap = cv2.VideoCapture(video_path)
-kf = KalmanFilter2D()
+tracker = MultiObjectTracker()
 trajectory = []
 hoop_box = None
 scoring_zone = None
@@ -67,7 +42,7 @@ while cap.isOpened():
     results = model.predict(frame, conf=0.25, verbose=False)
     detections = results[0].boxes
 
-    ball_center = None
+    tracked = []
     for det in detections:
         cls_id = int(det.cls[0])
         label = label_map.get(cls_id, str(cls_id))
@@ -75,8 +50,10 @@ while cap.isOpened():
 
         print(f"Detected {label} at frame {int(cap.get(cv2.CAP_PROP_POS_FRAMES))}")
 
+        tracked.append({"label": "player" if label == "human" else label,
+                        "confidence": float(det.conf[0]), "box": [x1, y1, x2, y2]})
+
         if label == "basketball":
-            ball_center = ((x1 + x2) // 2, (y1 + y2) // 2)
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
             cv2.putText(frame, "ball", (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
@@ -85,8 +62,11 @@ while cap.isOpened():
             cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 100, 100), 2)
             cv2.putText(frame, "hoop", (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 100, 100), 2)
 
-    smoothed = kf.update(ball_center)
-    trajectory.append(smoothed)
+    tracks = tracker.update(tracked, frame_index=int(cap.get(cv2.CAP_PROP_POS_FRAMES)))
+    balls = [t for t in tracks if t["label"] == "basketball"]
+    if balls:
+        ball = max(balls, key=lambda t: (t["missed"] == 0, t["hits"]))
+        trajectory.append((ball["x"], ball["y"]))
 
     if hoop_box:
         draw_scoring_zone(frame, hoop_box)
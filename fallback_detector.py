@@ -0,0 +1,127 @@
+"""
+Per-session motion fallback for the basketball, used only when YOLO misses it.
+
+Each client session gets its own background model (MOG2, or a running average when
+DOACH_FALLBACK_BG=avg) at WORK_WIDTH px. The model learns from every frame (every
+LEARN_EVERY-th when YOLO found the ball), so it stays current through long stretches
+of hits; the blob search only runs on a miss. Foreground blobs are filtered by size,
+aspect and circularity, then the one nearest the last known ball wins. That is a
+small fraction of a YOLO pass, and no state leaks between clients the way the old
+module-level last_gray did.
+
+Sessions are keyed by the id the client sends with /detect_frame and are dropped
+after IDLE_TTL seconds or when more than MAX_SESSIONS are live (least recently used).
+"""
+import os
+
+import cv2
+import numpy as np
+
+from session_pool import SessionPool, MAX_SESSIONS, IDLE_TTL
+
+WORK_WIDTH = 320
+BG_METHOD = os.getenv("DOACH_FALLBACK_BG", "mog2").lower()
+FALLBACK_CONFIDENCE = 0.2
+LEARN_EVERY = max(1, int(os.getenv("DOACH_FALLBACK_LEARN_EVERY", "1")))
+
+
+class MotionBallDetector:
+    def __init__(self, method=BG_METHOD, work_width=WORK_WIDTH, min_circularity=0.6,
+                 min_radius_frac=0.004, max_radius_frac=0.03, max_jump_frac=0.25, learn_every=LEARN_EVERY):
+        self.method = method
+        self.work_width = work_width
+        self.learn_every = learn_every
+        self._seen = 0
+        self.min_circularity = min_circularity
+        self.min_radius_frac = min_radius_frac    # ball radius as a fraction of frame width
+        self.max_radius_frac = max_radius_frac
+        self.max_jump_frac = max_jump_frac        # how far from the last ball a candidate may be
+        self._mog = None
+        self._avg = None
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self.last_ball = None                     # (x, y) in frame coords
+
+    def _foreground(self, small):
+        if self.method == "avg":
+            # per-channel, since an orange ball on a wood floor barely differs in gray
+            blur = cv2.GaussianBlur(small, (5, 5), 0)
+            if self._avg is None:
+                self._avg = blur.astype(np.float32)
+                return None
+            diff = cv2.absdiff(blur, cv2.convertScaleAbs(self._avg)).max(axis=2)
+            mask = cv2.threshold(diff, 20, 255, cv2.THRESH_BINARY)[1]
+            cv2.accumulateWeighted(blur, self._avg, 0.05)
+            return mask
+        if self._mog is None:
+            self._mog = cv2.createBackgroundSubtractorMOG2(history=120, varThreshold=24, detectShadows=False)
+        return self._mog.apply(small)
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.work_width / float(w)
+        return cv2.resize(frame, (self.work_width, max(1, int(round(h * scale)))), interpolation=cv2.INTER_AREA), scale
+
+    def observe(self, ball, frame=None):
+        """
+        YOLO found the ball: remember where, so the next fallback can gate on distance,
+        and let the background model learn from the frame.
+        """
+        self.last_ball = (float(ball['x']), float(ball['y']))
+        if frame is not None:
+            self._seen += 1
+            if self._seen % self.learn_every == 0:
+                self._foreground(self._small(frame)[0])
+
+    def detect(self, frame):
+        """Best ball-like moving blob as a detection dict (frame coords), or None."""
+        w = frame.shape[1]
+        small, scale = self._small(frame)
+        mask = self._foreground(small)
+        if mask is None:
+            return None
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+
+        r_min, r_max = self.min_radius_frac * self.work_width, self.max_radius_frac * self.work_width
+        a_min, a_max = np.pi * r_min * r_min, np.pi * r_max * r_max
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        best, best_cost = None, None
+        for c in contours:
+            area = cv2.contourArea(c)
+            if not (a_min <= area <= a_max):
+                continue
+            perim = cv2.arcLength(c, True)
+            circ = 4 * np.pi * area / (perim * perim) if perim else 0.0
+            if circ < self.min_circularity:
+                continue
+            x, y, bw, bh = cv2.boundingRect(c)
+            if not (0.6 <= bw / float(bh) <= 1.6):
+                continue
+            cx, cy = (x + bw / 2.0) / scale, (y + bh / 2.0) / scale
+            if self.last_ball is not None:
+                dist = np.hypot(cx - self.last_ball[0], cy - self.last_ball[1])
+                if dist > self.max_jump_frac * w:
+                    continue
+                cost = dist / w - circ * 0.1
+            else:
+                cost = -circ
+            if best_cost is None or cost < best_cost:
+                best, best_cost = (x, y, bw, bh, cx, cy), cost
+
+        if best is None:
+            return None
+        x, y, bw, bh, cx, cy = best
+        self.last_ball = (cx, cy)
+        return {
+            'label': 'basketball',
+            'confidence': FALLBACK_CONFIDENCE,
+            'x': int(cx),
+            'y': int(cy),
+            'box': [int(x / scale), int(y / scale), int((x + bw) / scale), int((y + bh) / scale)],
+            'source': 'motion',
+        }
+
+
+class FallbackSessions(SessionPool):
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_ttl=IDLE_TTL):
+        super().__init__(MotionBallDetector, max_sessions=max_sessions, idle_ttl=idle_ttl)
@@ -0,0 +1,108 @@
+"""
+Paginated frame listings and thumbnail sprite sheets for the labeling/review UI.
+
+A page of frames from frame_cache/<video>[/<subdir>] is tiled into one JPEG
+(SPRITE_COLS columns of THUMB_W-wide thumbnails) plus an offsets index, so a review
+grid of 100 frames is one listing request and one image instead of 100 JPEG fetches.
+
+Sheets are cached in frame_cache/<video>/.sprites/ under a key derived from the page's
+frame names and their mtime/size, so re-extracting or moving frames yields a new key
+and stale sheets are simply never asked for again.
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from frame_store import frame_names, decode_frame
+
+FRAME_ROOT = Path("frame_cache")
+SPRITE_DIRNAME = ".sprites"
+THUMB_W = 160
+SPRITE_COLS = 10
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 400
+FRAME_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def _folder(video, subdir=None, root=FRAME_ROOT):
+    base = Path(root) / video
+    return base / subdir if subdir else base
+
+
+def list_frames_page(video, page=1, per_page=DEFAULT_PER_PAGE, subdir=None, root=FRAME_ROOT):
+    """One page of frame names (sorted) with their mtime/size versions, or None if the folder is missing."""
+    folder = _folder(video, subdir, root)
+    if not folder.is_dir():
+        return None
+    entries = frame_names(str(folder), FRAME_EXTS)  # loose + packed
+    names = sorted(entries)
+    page = max(1, int(page))
+    per_page = max(1, min(MAX_PER_PAGE, int(per_page)))
+    chunk = names[(page - 1) * per_page: page * per_page]
+    return {
+        "frames": chunk,
+        "versions": {n: entries[n] for n in chunk},
+        "total": len(names),
+        "page": page,
+        "per_page": per_page,
+        "pages": (len(names) + per_page - 1) // per_page,
+    }
+
+
+def sprite_key(video, subdir, listing):
+    raw = json.dumps([video, subdir or "", [(n, listing["versions"][n]) for n in listing["frames"]]])
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def sprite_paths(video, key, root=FRAME_ROOT):
+    d = Path(root) / video / SPRITE_DIRNAME
+    return d / f"{key}.jpg", d / f"{key}.json"
+
+
+def build_sprite(video, listing, subdir=None, root=FRAME_ROOT, thumb_w=THUMB_W, cols=SPRITE_COLS):
+    """Tile a listing page into one JPEG; returns (key, index). Cached on disk by key."""
+    import cv2
+    import numpy as np
+
+    key = sprite_key(video, subdir, listing)
+    img_path, idx_path = sprite_paths(video, key, root)
+    if img_path.exists() and idx_path.exists():
+        return key, json.loads(idx_path.read_text())
+
+    folder = _folder(video, subdir, root)
+    thumbs = []
+    for name in listing["frames"]:
+        im = decode_frame(str(folder), name, cv2.IMREAD_REDUCED_COLOR_4)  # decode at 1/4 scale, much cheaper
+        if im is None:
+            thumbs.append((name, None))
+            continue
+        h, w = im.shape[:2]
+        th = max(1, int(round(h * thumb_w / w)))
+        thumbs.append((name, cv2.resize(im, (thumb_w, th), interpolation=cv2.INTER_AREA)))
+
+    tile_h = max([t.shape[0] for _, t in thumbs if t is not None] or [int(thumb_w * 9 / 16)])
+    rows = max(1, (len(thumbs) + cols - 1) // cols)
+    sheet = np.zeros((rows * tile_h, min(cols, max(1, len(thumbs))) * thumb_w, 3), dtype=np.uint8)
+    frames = []
+    for i, (name, t) in enumerate(thumbs):
+        x, y = (i % cols) * thumb_w, (i // cols) * tile_h
+        if t is not None:
+            sheet[y:y + t.shape[0], x:x + thumb_w] = t
+        frames.append({"name": name, "x": x, "y": y, "w": thumb_w,
+                       "h": t.shape[0] if t is not None else tile_h, "ok": t is not None})
+
+    index = {"key": key, "tile_w": thumb_w, "tile_h": tile_h, "cols": cols,
+             "width": int(sheet.shape[1]), "height": int(sheet.shape[0]), "frames": frames}
+
+    img_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_img = img_path.with_name(f"{key}.{os.getpid()}.tmp.jpg")
+    ok, buf = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, 75])
+    if not ok:
+        raise RuntimeError("sprite encode failed")
+    tmp_img.write_bytes(buf.tobytes())
+    os.replace(tmp_img, img_path)
+    tmp_idx = idx_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_idx.write_text(json.dumps(index))
+    os.replace(tmp_idx, idx_path)
+    return key, index
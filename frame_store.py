@@ -0,0 +1,303 @@
+"""
+Optional packed frame store: one container per video instead of thousands of loose JPEGs.
+
+    frame_cache/<video>/frames.pack       concatenated JPEG blobs
+    frame_cache/<video>/frames.idx.npy    (offset, length) per frame
+    frame_cache/<video>/frames.meta.json  frame names (index order) + names removed since packing
+
+The pack is memory-mapped and frames are returned as zero-copy memoryviews. Loose files
+always win over packed ones, so frames moved back out of manual_review/ simply shadow the
+packed copy; re-extraction replaces the whole set (drop_stale clears what an earlier run
+left behind, loose or packed). The pack itself is never rewritten; moving a packed
+frame elsewhere records its name in meta["removed"]. Publishing a pack and updating
+"removed" both hold an flock on frames.lock, so workers can't lose each other's edits.
+
+Extraction writes packs when DOACH_FRAME_STORE=pack. Existing folders can be packed with:
+    python frame_store.py frame_cache/IMG_3033 [--remove-loose]
+"""
+import os
+import json
+import mmap
+import fcntl
+import argparse
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+PACK_NAME = "frames.pack"
+INDEX_NAME = "frames.idx.npy"
+META_NAME = "frames.meta.json"
+LOCK_NAME = "frames.lock"
+FRAME_EXTS = (".jpg", ".jpeg", ".png")
+PACK_ENABLED = os.getenv("DOACH_FRAME_STORE", "files").lower() == "pack"
+
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+])
+
+
+@contextmanager
+def folder_lock(folder):
+    """Exclusive, cross-process lock on a folder's pack metadata."""
+    with open(os.path.join(folder, LOCK_NAME), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+class FramePack:
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, META_NAME), 'r') as f:
+            self.meta = json.load(f)
+        self.index = np.load(os.path.join(folder, INDEX_NAME))
+        self.slot = {n: i for i, n in enumerate(self.meta["names"])}
+        self.removed = set(self.meta.get("removed", []))
+        st = os.stat(os.path.join(folder, PACK_NAME))
+        self.stamp = f"{st.st_mtime_ns:x}"
+        with open(os.path.join(folder, PACK_NAME), 'rb') as f:  # the mapping outlives the fd
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+
+    def close(self):
+        """Unmap, unless a frame view is still out (then it goes when the last view does)."""
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+
+    def names(self):
+        return [n for n in self.meta["names"] if n not in self.removed]
+
+    def version(self, name):
+        return f"p{self.stamp}{int(self.index[self.slot[name]]['offset']):x}"
+
+    def get(self, name):
+        i = self.slot.get(name)
+        if i is None or name in self.removed or self._mm is None:
+            return None
+        off, length = int(self.index[i]['offset']), int(self.index[i]['length'])
+        try:
+            return memoryview(self._mm)[off:off + length]
+        except ValueError:  # closed: replaced by a newer pack while we held this one
+            fresh = open_pack(self.folder)
+            return fresh.get(name) if fresh is not None and fresh is not self else None
+
+
+class FramePackWriter:
+    """
+    Append encoded frames, then close() to publish pack + index + meta atomically.
+    lock=False when the caller already holds folder_lock (flock doesn't nest).
+    """
+
+    def __init__(self, folder, lock=True):
+        self.folder = folder
+        self.lock = lock
+        os.makedirs(folder, exist_ok=True)
+        self._tmp = os.path.join(folder, PACK_NAME + '.tmp')
+        self._f = open(self._tmp, 'wb')
+        self.names, self.rows = [], []
+        self.offset = 0
+
+    def add(self, name, data):
+        self._f.write(data)
+        self.names.append(name)
+        self.rows.append((self.offset, len(data)))
+        self.offset += len(data)
+
+    def close(self):
+        if self.lock:
+            with folder_lock(self.folder):
+                self._publish()
+        else:
+            self._publish()
+
+    def _publish(self):
+        self._f.close()
+        index = np.array(self.rows, dtype=INDEX_DTYPE) if self.rows else np.zeros(0, dtype=INDEX_DTYPE)
+        idx_tmp = os.path.join(self.folder, INDEX_NAME + '.tmp.npy')
+        np.save(idx_tmp, index)
+        meta_tmp = os.path.join(self.folder, META_NAME + '.tmp')
+        with open(meta_tmp, 'w') as f:
+            json.dump({"names": self.names, "removed": []}, f)
+        os.replace(self._tmp, os.path.join(self.folder, PACK_NAME))
+        os.replace(idx_tmp, os.path.join(self.folder, INDEX_NAME))
+        os.replace(meta_tmp, os.path.join(self.folder, META_NAME))
+        _invalidate(self.folder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            os.remove(self._tmp)
+
+
+# ---------- open-pack cache (keyed by folder, refreshed when meta changes) ----------
+_packs = {}
+_lock = threading.Lock()
+
+
+def _invalidate(folder):
+    with _lock:
+        old = _packs.pop(os.path.normpath(folder), None)
+    if old:
+        old[1].close()
+
+
+def open_pack(folder):
+    key = os.path.normpath(folder)
+    try:
+        stamp = os.stat(os.path.join(folder, META_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lock:
+        hit = _packs.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+    pack = FramePack(folder)
+    with _lock:
+        old = _packs.get(key)
+        _packs[key] = (stamp, pack)
+    if old and old[1] is not pack:
+        old[1].close()
+    return pack
+
+
+# ---------- folder-level helpers used by the routes ----------
+def frame_names(folder, exts=FRAME_EXTS):
+    """{name: version} for loose + packed frames in folder (loose shadows packed)."""
+    out = {}
+    pack = open_pack(folder)
+    if pack:
+        for n in pack.names():
+            out[n] = pack.version(n)
+    with os.scandir(folder) as it:
+        for e in it:
+            if e.is_file() and e.name.lower().endswith(exts):
+                st = e.stat()
+                out[e.name] = f"{st.st_mtime_ns:x}{st.st_size:x}"
+    return out
+
+
+def read_packed(folder, name):
+    """(blob, version) for a packed frame with no loose file shadowing it, else (None, None)."""
+    if os.path.isfile(os.path.join(folder, name)):
+        return None, None
+    pack = open_pack(folder)
+    blob = pack.get(name) if pack else None
+    return (blob, pack.version(name)) if blob is not None else (None, None)
+
+
+def read_frame(folder, name):
+    """Encoded bytes of a frame, loose or packed, or None."""
+    path = os.path.join(folder, name)
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    blob, _ = read_packed(folder, name)
+    return bytes(blob) if blob is not None else None
+
+
+def frame_exists(folder, name):
+    return os.path.isfile(os.path.join(folder, name)) or read_packed(folder, name)[0] is not None
+
+
+def decode_frame(folder, name, flags=None):
+    import cv2
+
+    data = read_frame(folder, name)
+    if data is None:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR if flags is None else flags)
+
+
+def materialize(folder, name, dest):
+    """Make sure dest holds the frame as a regular file (copying out of the pack if needed)."""
+    data = read_frame(folder, name)
+    if data is None:
+        raise FileNotFoundError(os.path.join(folder, name))
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    with open(dest, 'wb') as f:
+        f.write(data)
+    return dest
+
+
+def remove_packed(folder, name):
+    """Hide a packed frame (e.g. after it moved to manual_review/)."""
+    meta_path = os.path.join(folder, META_NAME)
+    if not os.path.isfile(meta_path):
+        return False
+    with folder_lock(folder):
+        # re-read under the lock: the cached pack may predate another worker's removal
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if name not in meta["names"]:
+            return False
+        meta["removed"] = sorted(set(meta.get("removed", [])) | {name})
+        tmp = os.path.join(folder, META_NAME + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+    _invalidate(folder)
+    return True
+
+
+def drop_stale(folder, prefix, current, packed):
+    """
+    After re-extracting into folder, delete frames named prefix* that an earlier run left
+    behind; with dedupe the new run can produce fewer frames, and leftovers would be served
+    alongside the new set (loose ones even shadow freshly packed frames of the same name).
+    packed=True: the new frames were just published as the pack, so every loose prefix* frame
+    is stale. packed=False: the new frames are loose; loose ones not in current and the old
+    pack as a whole are stale. Returns how many loose files were removed.
+    """
+    current = set() if packed else set(current)
+    removed = 0
+    with folder_lock(folder):
+        with os.scandir(folder) as it:
+            stale = [e.path for e in it if e.is_file() and e.name.startswith(prefix)
+                     and e.name.lower().endswith(FRAME_EXTS) and e.name not in current]
+        for path in stale:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if not packed:
+            for name in (META_NAME, INDEX_NAME, PACK_NAME):  # meta first: open_pack keys off it
+                try:
+                    os.remove(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass
+    _invalidate(folder)
+    return removed
+
+
+def pack_folder(folder, remove_loose=False):
+    """Pack every loose frame in folder (plus anything already packed) into a fresh container."""
+    with folder_lock(folder):  # a removal mid-pack would otherwise be undone by the new meta
+        names = sorted(frame_names(folder))
+        with FramePackWriter(folder, lock=False) as w:
+            for n in names:
+                w.add(n, read_frame(folder, n))
+    if remove_loose:
+        for n in names:
+            p = os.path.join(folder, n)
+            if os.path.isfile(p):
+                os.remove(p)
+    return len(names)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pack a frame_cache/<video> folder into one memory-mapped container")
+    ap.add_argument("folders", nargs="+")
+    ap.add_argument("--remove-loose", action="store_true", help="delete the loose JPEGs after packing")
+    args = ap.parse_args()
+    for folder in args.folders:
+        n = pack_folder(folder, remove_loose=args.remove_loose)
+        print(f"📦 Packed {n} frames into {os.path.join(folder, PACK_NAME)}")
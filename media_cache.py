@@ -0,0 +1,103 @@
+"""
+Caching policy for served media (videos, extracted frames, static assets).
+
+send_from_directory already answers conditional (ETag / Last-Modified -> 304) and
+Range requests; this adds explicit Cache-Control on top:
+    - a request carrying ?v=<version> that matches the file's current version is
+      content-addressed, so it is cached for a year as immutable
+    - frames without a version must revalidate (cheap 304s while re-extraction can still
+      overwrite them); videos are cached for an hour then revalidated
+    - text assets under /static are served from a precompressed .br / .gz sibling when
+      the client accepts it and the sibling is current
+"""
+import os
+import mimetypes
+
+from flask import Response, request, send_from_directory
+from werkzeug.security import safe_join
+
+from frame_store import read_packed
+
+YEAR = 365 * 24 * 3600
+VIDEO_MAX_AGE = 3600
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = {".js", ".jsx", ".css", ".html", ".json", ".svg", ".txt", ".map"}
+VIDEO_EXTS = {".mp4", ".mov", ".webm", ".mkv", ".m4v"}
+
+
+def file_version(path):
+    """Short version tag from mtime + size — changes whenever the file is rewritten."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}{st.st_size:x}"
+
+
+def _apply_policy(resp, path, max_age, version=None):
+    resp.headers["Accept-Ranges"] = "bytes"
+    v = request.args.get("v")
+    if version is None and v and path and os.path.isfile(path):
+        version = file_version(path)
+    if v and v == version:
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = YEAR
+        resp.cache_control.immutable = True
+    elif max_age:
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = max_age
+    else:
+        resp.cache_control.no_cache = True
+    return resp
+
+
+def send_media(directory, filename, max_age=0):
+    """send_from_directory with conditional/range handling plus an explicit cache policy."""
+    resp = send_from_directory(directory, filename, conditional=True, max_age=max_age or None)
+    return _apply_policy(resp, safe_join(directory, filename), max_age)
+
+
+def send_blob(data, mimetype, version, max_age=0):
+    """In-memory body (e.g. a frame out of a pack) with the same ETag/Range/cache handling as files."""
+    resp = Response(bytes(data), mimetype=mimetype)
+    resp.set_etag(version)
+    resp = resp.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    return _apply_policy(resp, None, max_age, version=version)
+
+
+def send_video(directory, filename):
+    return send_media(directory, filename, max_age=VIDEO_MAX_AGE)
+
+
+def send_frame(directory, filename):
+    blob, version = read_packed(directory, filename)  # frames may live in a per-video pack
+    if blob is not None:
+        return send_blob(blob, mimetypes.guess_type(filename)[0] or "image/jpeg", version)
+    return send_media(directory, filename, max_age=0)
+
+
+def install_static_caching(app):
+    """Wrap Flask's static view: precompressed siblings for text, cache policy for media."""
+    static_dir = app.static_folder
+
+    def static(filename):
+        ext = os.path.splitext(filename)[1].lower()
+        path = safe_join(static_dir, filename)
+        if ext in COMPRESSIBLE and path:
+            accepted = request.accept_encodings
+            for encoding, suffix in PRECOMPRESSED:
+                packed = path + suffix
+                if accepted[encoding] and os.path.isfile(packed) and os.path.isfile(path) \
+                        and os.path.getmtime(packed) >= os.path.getmtime(path):
+                    resp = send_from_directory(static_dir, filename + suffix, conditional=True,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                    resp.headers["Content-Encoding"] = encoding
+                    resp.vary.add("Accept-Encoding")
+                    return _apply_policy(resp, path, 0)
+            resp = send_from_directory(static_dir, filename, conditional=True)
+            resp.vary.add("Accept-Encoding")
+            return _apply_policy(resp, path, 0)
+        if ext in VIDEO_EXTS:
+            return send_video(static_dir, filename)
+        return send_media(static_dir, filename, max_age=0)
+
+    app.view_functions["static"] = static
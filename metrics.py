@@ -0,0 +1,202 @@
+"""
+Lightweight request/stage latency metrics in Prometheus text format.
+
+install(app) times every request (histogram per route/method/status) and keeps an
+in-flight gauge per route. Inside a handler, `with metrics.stage("predict"):` times one
+step (decode, predict, post-process, ...) into a per-route stage histogram; lap() does
+the same for handlers that are easier to mark between steps than to indent. Cache hit
+rates, upstream breaker state and the serving model are read at scrape time from
+callables registered with add_collector(), so nothing is polled in the background.
+
+GET /metrics serves the text exposition. With DOACH_SERVER_TIMING=1, or when a request
+sends `X-Server-Timing: 1`, responses also carry a Server-Timing header listing the
+stages, so browser devtools show where a frame's latency went.
+
+Everything is per process: with several gunicorn workers, Prometheus should scrape
+each one; the serving-model label shows which weights that worker has loaded.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request, Response
+
+# seconds; tuned for 5 ms JSON encodes up to multi-second vision/TTS calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SERVER_TIMING = os.getenv("DOACH_SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}       # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for labels, s in sorted(series.items()):
+            cum = 0
+            for le, n in zip(self.buckets, s):
+                cum += n
+                out.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (_fmt(le),))} {cum}")
+            out.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + ('+Inf',))} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(s[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {s[-1]}")
+        return out
+
+
+class Gauge:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, by=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + by
+
+    def dec(self, *labels):
+        self.inc(*labels, by=-1)
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+        return out
+
+
+class Metrics:
+    def __init__(self, prefix="doach"):
+        self.prefix = prefix
+        self.requests = Histogram(f"{prefix}_request_seconds", "Request latency by route",
+                                  ("route", "method", "status"))
+        self.stages = Histogram(f"{prefix}_stage_seconds", "Latency of one step inside a route",
+                                ("route", "stage"))
+        self.in_flight = Gauge(f"{prefix}_requests_in_flight", "Requests currently being handled", ("route",))
+        self._collectors = []   # (name, type, help, labelnames, fn -> [(label values, value)])
+
+    # ---------- request hooks ----------
+    def install(self, app, path="/metrics"):
+        @app.before_request
+        def _metrics_start():
+            g._metrics_t0 = time.perf_counter()
+            g._metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+            g._metrics_stages = []
+            self.in_flight.inc(g._metrics_route)
+
+        @app.after_request
+        def _metrics_observe(resp):
+            t0 = getattr(g, "_metrics_t0", None)
+            if t0 is None:
+                return resp
+            total = time.perf_counter() - t0
+            self.requests.observe(total, g._metrics_route, request.method, str(resp.status_code))
+            if SERVER_TIMING or request.headers.get("X-Server-Timing") == "1":
+                parts = [f"{name};dur={dur * 1000:.1f}" for name, dur in g._metrics_stages]
+                parts.append(f"total;dur={total * 1000:.1f}")
+                resp.headers["Server-Timing"] = ", ".join(parts)
+            return resp
+
+        @app.teardown_request
+        def _metrics_done(exc=None):
+            route = getattr(g, "_metrics_route", None)
+            if route is not None:
+                self.in_flight.dec(route)
+                g._metrics_route = None
+
+        app.add_url_rule(path, "metrics", lambda: Response(self.render(), mimetype=CONTENT_TYPE))
+
+    def _record(self, name, dur):
+        route = getattr(g, "_metrics_route", None) if g else None
+        self.stages.observe(dur, route or "none", name)
+        stages = getattr(g, "_metrics_stages", None) if g else None
+        if stages is not None:
+            stages.append((name, dur))
+
+    @contextmanager
+    def stage(self, name):
+        """Time a step of the current request."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - t0)
+
+    def lap(self):
+        """Stage timer for straight-line handlers: lap("decode") records the time since the previous lap."""
+        last = [time.perf_counter()]
+
+        def mark(name):
+            now = time.perf_counter()
+            self._record(name, now - last[0])
+            last[0] = now
+        return mark
+
+    # ---------- scrape-time collectors ----------
+    def add_collector(self, name, type, help, labelnames, fn):
+        self._collectors.append((f"{self.prefix}_{name}", type, help, tuple(labelnames), fn))
+
+    def add_cache(self, cache, stats):
+        """Hit/miss counters for anything with a .stats() that returns hits/misses."""
+        def read():
+            s = stats()
+            return [((cache, "hit"), s.get("hits", 0)), ((cache, "miss"), s.get("misses", 0))]
+        self.add_collector("cache_lookups_total", "counter", "Cache lookups by result", ("cache", "result"), read)
+
+    def render(self):
+        lines = self.requests.render() + self.stages.render() + self.in_flight.render()
+        grouped = {}
+        for name, type, help, labelnames, fn in self._collectors:
+            try:
+                samples = fn()
+            except Exception as e:
+                print(f"⚠️ metrics collector {name} failed: {e}")
+                continue
+            entry = grouped.setdefault(name, (type, help, labelnames, []))
+            entry[3].extend(samples)
+        for name, (type, help, labelnames, samples) in grouped.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+            lines += [f"{name}{_labels(labelnames, k)} {_fmt(v)}" for k, v in samples]
+        return "\n".join(lines) + "\n"
+
+
+def model_version(path):
+    """Label value for a weights file: name plus its mtime, so a promotion shows up as a new series."""
+    try:
+        return f"{os.path.basename(str(path))}@{int(os.path.getmtime(path))}"
+    except OSError:
+        return os.path.basename(str(path))
@@ -0,0 +1,185 @@
+"""
+Cheap motion pass over a video to find shot-relevant windows.
+
+Frames are decoded (from the 640w analysis proxy when available), shrunk to 240 px
+grayscale and processed in windows of WINDOW frames at a time: the absdiff/threshold
+from the old fallback_motion_ball is computed for the whole window in one numpy op, then
+reduced to three per-frame signals:
+
+    motion  fraction of pixels that changed anywhere
+    hoop    fraction that changed inside the hoop region (given, or the upper-middle band)
+    ball    1 if the diff has a small, roughly round blob (ball-sized), else 0
+
+score = motion + HOOP_WEIGHT * hoop + BALL_WEIGHT * ball, smoothed over ~0.5 s. Segments
+where the score clears an adaptive threshold (padded, short gaps merged) are the
+"active" windows; extraction samples them densely and skips the dead time between.
+"""
+import os
+import json
+
+import cv2
+import numpy as np
+
+MOTION_WIDTH = 240
+WINDOW = 64                 # frames per vectorized batch
+DIFF_THRESH = 15            # the full-res differencing used 20; small frames dilute contrast
+HOOP_WEIGHT = 3.0
+BALL_WEIGHT = 0.02
+PAD_S = 0.75                # seconds added around each active segment
+MERGE_GAP_S = 1.0           # segments closer than this are merged
+TIMELINE_NAME = "motion_timeline.json"
+
+
+def _default_hoop_mask(h, w):
+    """Without a locked hoop box, weight the upper-middle band where rims usually sit."""
+    m = np.zeros((h, w), dtype=bool)
+    m[: int(h * 0.5), int(w * 0.2): int(w * 0.8)] = True
+    return m
+
+
+def _hoop_mask(h, w, hoop):
+    if not hoop:
+        return _default_hoop_mask(h, w)
+    x1, y1, x2, y2 = [float(v) for v in hoop]  # normalized 0..1
+    # widen the box: the approach and the net below it matter as much as the rim
+    bw, bh = x2 - x1, y2 - y1
+    x1, x2 = max(0.0, x1 - bw), min(1.0, x2 + bw)
+    y1, y2 = max(0.0, y1 - 2 * bh), min(1.0, y2 + bh)
+    m = np.zeros((h, w), dtype=bool)
+    m[int(y1 * h): max(int(y1 * h) + 1, int(y2 * h)), int(x1 * w): max(int(x1 * w) + 1, int(x2 * w))] = True
+    return m
+
+
+def _ball_like(mask, min_area=3, max_area=200, min_circularity=0.5):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for c in contours:
+        area = cv2.contourArea(c)
+        if min_area <= area <= max_area:
+            perim = cv2.arcLength(c, True)
+            if perim and 4 * np.pi * area / (perim * perim) >= min_circularity:
+                return 1.0
+    return 0.0
+
+
+def _segments(score, fps, sample_step):
+    if not len(score):
+        return [], None
+    dt = sample_step / fps
+    floor = 0.003  # roughly one ball-sized blob moving near the hoop
+    thresh = max(floor, float(np.median(score) + 1.5 * score.std()))
+    active = score > thresh
+    pad = int(round(PAD_S / dt))
+    gap = int(round(MERGE_GAP_S / dt))
+
+    segs = []
+    i, n = 0, len(active)
+    while i < n:
+        if not active[i]:
+            i += 1
+            continue
+        j = i
+        while j + 1 < n and active[j + 1]:
+            j += 1
+        s, e = max(0, i - pad), min(n - 1, j + pad)
+        if segs and s - segs[-1][1] <= gap:
+            segs[-1][1] = e
+        else:
+            segs.append([s, e])
+        i = j + 1
+    return [{"start": round(s * dt, 3), "end": round((e + 1) * dt, 3),
+             "start_frame": s * sample_step, "end_frame": (e + 1) * sample_step,
+             "peak": round(float(score[s:e + 1].max()), 4)} for s, e in segs], thresh
+
+
+def analyze(video_path, hoop=None, sample_step=2):
+    """Motion timeline for a video: per-sample scores plus active segments (seconds and frame indices)."""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"cannot open {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    batch, motion, hoop_m, ball = [], [], [], []
+    prev = None
+    mask = None
+    idx = 0
+
+    def flush(batch, prev):
+        stack = np.stack(batch)                              # (n, h, w) uint8
+        ref = np.concatenate([prev[None], stack[:-1]]) if prev is not None else np.concatenate([stack[:1], stack[:-1]])
+        moved = np.abs(stack.astype(np.int16) - ref.astype(np.int16)) > DIFF_THRESH   # (n, h, w) bool
+        motion.extend(moved.mean(axis=(1, 2)).tolist())
+        hoop_m.extend(moved[:, mask].mean(axis=1).tolist())
+        ball.extend(_ball_like(m.astype(np.uint8) * 255) for m in moved)
+        return stack[-1]
+
+    try:
+        while True:
+            if idx % sample_step:
+                if not cap.grab():
+                    break
+                idx += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            h, w = frame.shape[:2]
+            small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+                               (MOTION_WIDTH, max(1, int(h * MOTION_WIDTH / w))), interpolation=cv2.INTER_AREA)
+            small = cv2.GaussianBlur(small, (3, 3), 0)
+            if mask is None:
+                mask = _hoop_mask(small.shape[0], small.shape[1], hoop)
+            batch.append(small)
+            if len(batch) == WINDOW:
+                prev = flush(batch, prev)
+                batch = []
+            idx += 1
+        if batch:
+            flush(batch, prev)
+    finally:
+        cap.release()
+
+    motion, hoop_m, ball = np.array(motion), np.array(hoop_m), np.array(ball)
+    raw = motion + HOOP_WEIGHT * hoop_m + BALL_WEIGHT * ball
+    k = max(1, int(round(0.5 * fps / sample_step)))
+    score = np.convolve(raw, np.ones(k) / k, mode="same") if len(raw) else raw
+    segments, thresh = _segments(score, fps, sample_step)
+
+    return {
+        "fps": round(fps, 3),
+        "frames": idx,
+        "sample_step": sample_step,
+        "dt": round(sample_step / fps, 5),
+        "threshold": round(thresh, 5) if thresh is not None else None,
+        "scores": [round(float(v), 4) for v in score],
+        "segments": segments,
+        "active_fraction": round(float(sum(s["end_frame"] - s["start_frame"] for s in segments)) / idx, 4) if idx else 0,
+    }
+
+
+def frame_plan(timeline, dense_step=2, idle_step=30):
+    """Frame indices to extract: every dense_step inside active segments, every idle_step elsewhere."""
+    keep = set(range(0, timeline["frames"], idle_step))
+    for s in timeline["segments"]:
+        keep.update(range(s["start_frame"], min(s["end_frame"], timeline["frames"]), dense_step))
+    return keep
+
+
+def cached_timeline(video_path, out_dir, hoop=None, sample_step=2):
+    """analyze() memoized in out_dir/motion_timeline.json, keyed by the video's mtime/size and the hoop box."""
+    st = os.stat(video_path)
+    key = [st.st_mtime_ns, st.st_size, list(hoop) if hoop else None, sample_step]
+    path = os.path.join(out_dir, TIMELINE_NAME)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["timeline"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    timeline = analyze(video_path, hoop=hoop, sample_step=sample_step)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"key": key, "timeline": timeline}, f)
+    os.replace(tmp, path)
+    return timeline
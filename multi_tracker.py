@@ -0,0 +1,233 @@
+"""
+Multi-object Kalman tracker for balls, players and hoops.
+
+Replaces the single-target filters (KalmanFilter2D in detect_and_track.py and the
+cv2 init_kalman/track_ball_with_kalman pair in the apps). Every track has the state
+[cx, cy, w, h, vx, vy] under a constant-velocity model; all tracks live in stacked
+arrays (means (N, 6), covariances (N, 6, 6)) so predict and update are a handful of
+batched matmuls/solves regardless of how many balls, players or hoops are on screen.
+
+Association is per class: players and hoops (and nets/backboards) match on IoU,
+balls on gated center distance, since a small fast ball rarely overlaps its own
+prediction. Matching uses scipy's Hungarian solver when scipy is installed and a
+greedy lowest-cost-first pass otherwise.
+
+A track is reported once it has `min_hits` matches and dropped after `max_age`
+updates without one; both are per class (balls coast briefly, hoops barely move).
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; greedy matching is close enough at these densities
+    linear_sum_assignment = None
+
+# label -> association metric and lifetime settings
+CLASS_CONFIG = {
+    'basketball': {'metric': 'distance', 'max_age': 8, 'min_hits': 2, 'q': 4.0},
+    'player':     {'metric': 'iou', 'max_age': 30, 'min_hits': 3, 'q': 1.0},
+    'hoop':       {'metric': 'iou', 'max_age': 90, 'min_hits': 3, 'q': 0.05},
+    'net':        {'metric': 'iou', 'max_age': 60, 'min_hits': 3, 'q': 0.2},
+    'backboard':  {'metric': 'iou', 'max_age': 90, 'min_hits': 3, 'q': 0.05},
+}
+IOU_MIN = 0.2          # below this an IoU pair is not a match
+GATE_MIN_PX = 40       # ball gate floor, px
+GATE_SIZES = 4.0       # ball gate in ball diameters, plus the predicted per-frame speed
+MEAS_NOISE = 4.0       # px^2 on cx, cy; box size is noisier
+MAX_DT = 30            # frame gaps beyond this start the session over (seek/new clip)
+
+_H = np.hstack([np.eye(4), np.zeros((4, 2))])                 # measure cx, cy, w, h
+_R = np.diag([MEAS_NOISE, MEAS_NOISE, 4 * MEAS_NOISE, 4 * MEAS_NOISE])
+
+
+def _transition(dt):
+    F = np.eye(6)
+    F[0, 4] = F[1, 5] = dt
+    return F
+
+
+def _xyxy(state):
+    cx, cy, w, h = state[:, 0], state[:, 1], np.abs(state[:, 2]), np.abs(state[:, 3])
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def assign(cost, valid):
+    """(track_idx, det_idx) pairs minimising cost over the valid entries."""
+    if not cost.size or not valid.any():
+        return []
+    if linear_sum_assignment is not None:
+        big = cost[valid].max() + 1e6
+        rows, cols = linear_sum_assignment(np.where(valid, cost, big))
+        return [(r, c) for r, c in zip(rows, cols) if valid[r, c]]
+    pairs = []
+    used_r, used_c = set(), set()
+    rs, cs = np.nonzero(valid)
+    for k in np.argsort(cost[rs, cs], kind='stable'):
+        r, c = int(rs[k]), int(cs[k])
+        if r not in used_r and c not in used_c:
+            pairs.append((r, c))
+            used_r.add(r)
+            used_c.add(c)
+    return pairs
+
+
+class MultiObjectTracker:
+    def __init__(self, classes=None):
+        self.classes = classes or CLASS_CONFIG
+        self.x = np.zeros((0, 6))
+        self.P = np.zeros((0, 6, 6))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.labels = np.zeros(0, dtype=object)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.missed = np.zeros(0, dtype=np.int64)
+        self.conf = np.zeros(0)
+        self.next_id = 1
+        self.last_frame = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def reset(self):
+        self.__init__(self.classes)
+
+    def _q(self, dt):
+        qs = np.array([self.classes[l]['q'] for l in self.labels], dtype=float)
+        base = np.diag([dt, dt, dt, dt, 1.0, 1.0]) * dt
+        return qs[:, None, None] * base[None]
+
+    def predict(self, dt=1.0):
+        if not len(self):
+            return
+        F = _transition(dt)
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + self._q(dt)
+
+    def _correct(self, idx, z):
+        """Batched Kalman update of tracks `idx` with (k, 4) measurements."""
+        P = self.P[idx]
+        HP = _H @ P                                          # (k, 4, 6)
+        S = HP @ _H.T + _R                                   # (k, 4, 4)
+        K = np.linalg.solve(S, HP).transpose(0, 2, 1)        # P H^T S^-1, S symmetric
+        innov = z - self.x[idx] @ _H.T
+        self.x[idx] += (K @ innov[:, :, None])[:, :, 0]
+        self.P[idx] = P - K @ HP
+
+    def _spawn(self, label, z, conf):
+        n = len(z)
+        x = np.zeros((n, 6))
+        x[:, :4] = z
+        P = np.tile(np.diag([10.0, 10.0, 10.0, 10.0, 1e3, 1e3]), (n, 1, 1))
+        self.x = np.vstack([self.x, x])
+        self.P = np.concatenate([self.P, P])
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + n)])
+        self.next_id += n
+        self.labels = np.concatenate([self.labels, np.array([label] * n, dtype=object)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+        self.missed = np.concatenate([self.missed, np.zeros(n, dtype=np.int64)])
+        self.conf = np.concatenate([self.conf, conf])
+
+    def _cost(self, cfg, tracks, boxes):
+        if cfg['metric'] == 'iou':
+            iou = iou_matrix(_xyxy(self.x[tracks]), boxes)
+            return 1.0 - iou, iou >= IOU_MIN
+        t = self.x[tracks]
+        centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        dist = np.hypot(t[:, None, 0] - centers[None, :, 0], t[:, None, 1] - centers[None, :, 1])
+        gate = np.maximum(GATE_MIN_PX, GATE_SIZES * np.abs(t[:, 2:4]).max(axis=1)) + np.hypot(t[:, 4], t[:, 5])
+        return dist, dist <= gate[:, None]
+
+    def update(self, detections, frame_index=None):
+        """
+        Advance one frame with this frame's detections (dicts with 'label' and an xyxy 'box').
+        Matched detections get a 'track_id'; returns the confirmed tracks as dicts.
+        """
+        dt = 1.0
+        if frame_index is not None:
+            if self.last_frame is not None:
+                step = frame_index - self.last_frame
+                if step <= 0 or step > MAX_DT:
+                    self.reset()
+                else:
+                    dt = float(step)
+            self.last_frame = frame_index
+        self.predict(dt)
+
+        matched = np.zeros(len(self), dtype=bool)
+        idx_all, z_all = [], []
+        for label, cfg in self.classes.items():
+            dets = [d for d in detections if d.get('label') == label and d.get('box')]
+            if not dets:
+                continue
+            boxes = np.array([d['box'] for d in dets], dtype=float)
+            tracks = np.nonzero(self.labels == label)[0] if len(self) else np.zeros(0, dtype=np.int64)
+            pairs = []
+            if len(tracks):
+                cost, valid = self._cost(cfg, tracks, boxes)
+                pairs = assign(cost, valid)
+            z = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                          boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+            used = set()
+            for r, c in pairs:
+                t = tracks[r]
+                idx_all.append(t)
+                z_all.append(z[c])
+                matched[t] = True
+                self.conf[t] = float(dets[c].get('confidence', 0.0))
+                dets[c]['track_id'] = int(self.ids[t])
+                used.add(c)
+            new = [c for c in range(len(dets)) if c not in used]
+            if new:
+                first = self.next_id
+                self._spawn(label, z[new], np.array([float(dets[c].get('confidence', 0.0)) for c in new]))
+                for k, c in enumerate(new):
+                    dets[c]['track_id'] = first + k
+
+        if idx_all:
+            idx = np.array(idx_all)
+            self._correct(idx, np.array(z_all))
+            self.hits[idx] += 1
+        n_old = len(matched)
+        self.missed[:n_old][matched] = 0
+        self.missed[:n_old][~matched] += 1
+
+        max_age = np.array([self.classes[l]['max_age'] for l in self.labels], dtype=np.int64)
+        keep = self.missed <= max_age
+        if not keep.all():
+            for name in ('x', 'P', 'ids', 'labels', 'hits', 'missed', 'conf'):
+                setattr(self, name, getattr(self, name)[keep])
+        return self.tracks()
+
+    def tracks(self):
+        if not len(self):
+            return []
+        min_hits = np.array([self.classes[l]['min_hits'] for l in self.labels], dtype=np.int64)
+        boxes = _xyxy(self.x)
+        out = []
+        for i in np.nonzero(self.hits >= min_hits)[0]:
+            cx, cy, _, _, vx, vy = self.x[i]
+            out.append({
+                'id': int(self.ids[i]),
+                'label': self.labels[i],
+                'box': [int(round(v)) for v in boxes[i]],
+                'x': int(round(cx)),
+                'y': int(round(cy)),
+                'vx': round(float(vx), 2),
+                'vy': round(float(vy), 2),
+                'confidence': round(float(self.conf[i]), 3),
+                'hits': int(self.hits[i]),
+                'missed': int(self.missed[i]),
+            })
+        return out
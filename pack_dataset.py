@@ -0,0 +1,218 @@
+"""
+Pack a YOLO image folder into a single memory-mapped file so training epochs
+stop paying for JPEG decode.
+
+    python pack_dataset.py --data datasets/doach_seg --imgsz 640
+
+Writes, per split (train/val):
+    <data>/packed/<split>.bin        concatenated uint8 BGR pixels, pre-resized to imgsz
+    <data>/packed/<split>.idx.npy    offset index (offset, h, w, h0, w0) per image
+    <data>/packed/<split>.meta.json  image paths, source mtimes, imgsz and label text
+"""
+import os
+import json
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+DATA_DIR = os.path.join('datasets', 'doach_seg')
+PACK_DIRNAME = 'packed'
+IMG_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('h', '<u4'), ('w', '<u4'),    # stored (resized) shape
+    ('h0', '<u4'), ('w0', '<u4'),  # original shape
+])
+
+
+def resize_long_side(img, imgsz):
+    """Match ultralytics' load_image: scale so the long side equals imgsz, keep aspect."""
+    h0, w0 = img.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return img
+    w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+    interp = cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR
+    return cv2.resize(img, (w, h), interpolation=interp)
+
+
+def _label_path(img_path):
+    # images/<split>/x.jpg -> labels/<split>/x.txt (same rule ultralytics uses)
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return sb.join(img_path.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt'
+
+
+def _read_label(img_path):
+    p = _label_path(img_path)
+    if not os.path.exists(p):
+        return ''
+    with open(p, 'r') as f:
+        return f.read().strip()
+
+
+def pack_split(data_dir, split, imgsz=640, workers=8):
+    img_dir = os.path.join(data_dir, 'images', split)
+    if not os.path.isdir(img_dir):
+        print(f"⚠️ No {split} images at {img_dir}")
+        return None
+
+    files = sorted(os.path.join(img_dir, f) for f in os.listdir(img_dir) if f.lower().endswith(IMG_EXTS))
+    out_dir = os.path.join(data_dir, PACK_DIRNAME)
+    os.makedirs(out_dir, exist_ok=True)
+    bin_path = os.path.join(out_dir, f"{split}.bin")
+    idx_path = os.path.join(out_dir, f"{split}.idx.npy")
+    meta_path = os.path.join(out_dir, f"{split}.meta.json")
+
+    def load(path):
+        img = cv2.imread(path)
+        if img is None:
+            return path, None, None
+        return path, img.shape[:2], resize_long_side(img, imgsz)
+
+    index = np.zeros(len(files), dtype=INDEX_DTYPE)
+    kept, mtimes, labels = [], [], []
+    offset = 0
+    tmp_bin = bin_path + '.tmp'
+
+    # cv2 decode/resize release the GIL, so threads are enough and keep write order simple
+    with open(tmp_bin, 'wb') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, shape0, img in pool.map(load, files):
+            if img is None:
+                print(f"⚠️ Skipping unreadable image: {path}")
+                continue
+            buf = np.ascontiguousarray(img).tobytes()
+            out.write(buf)
+            i = len(kept)
+            index[i] = (offset, img.shape[0], img.shape[1], shape0[0], shape0[1])
+            offset += len(buf)
+            kept.append(os.path.abspath(path))
+            mtimes.append(os.path.getmtime(path))
+            labels.append(_read_label(path))
+
+    index = index[:len(kept)]
+    np.save(idx_path + '.tmp.npy', index)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'imgsz': imgsz, 'files': kept, 'mtimes': mtimes, 'labels': labels}, f)
+
+    os.replace(tmp_bin, bin_path)
+    os.replace(idx_path + '.tmp.npy', idx_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+    print(f"📦 Packed {len(kept)} {split} images → {bin_path} ({offset / 1e6:.1f} MB)")
+    return bin_path
+
+
+class PackedDataset:
+    """Zero-copy reader for a packed split. Images come back as read-only views into the mmap."""
+
+    def __init__(self, data_dir=DATA_DIR, split='train'):
+        base = os.path.join(data_dir, PACK_DIRNAME, split)
+        with open(base + '.meta.json', 'r') as f:
+            meta = json.load(f)
+        self.imgsz = meta['imgsz']
+        self.files = meta['files']
+        self.mtimes = meta['mtimes']
+        self.labels = meta['labels']
+        self.index = np.load(base + '.idx.npy')
+        self.data = np.memmap(base + '.bin', dtype=np.uint8, mode='r')
+        self._by_path = {p: i for i, p in enumerate(self.files)}
+
+    def __len__(self):
+        return len(self.files)
+
+    def image(self, i):
+        rec = self.index[i]
+        h, w = int(rec['h']), int(rec['w'])
+        start = int(rec['offset'])
+        return self.data[start:start + h * w * 3].reshape(h, w, 3)
+
+    def original_shape(self, i):
+        rec = self.index[i]
+        return int(rec['h0']), int(rec['w0'])
+
+    def label_array(self, i):
+        """YOLO label rows as float32 (n, 5+) — bbox or polygon rows."""
+        rows = [list(map(float, ln.split())) for ln in self.labels[i].splitlines() if ln.strip()]
+        return [np.array(r, dtype=np.float32) for r in rows]
+
+    def lookup(self, path):
+        """Index for an image path, or None if missing or the source changed since packing."""
+        i = self._by_path.get(os.path.abspath(path))
+        if i is None:
+            return None
+        try:
+            if os.path.getmtime(path) != self.mtimes[i]:
+                return None
+        except OSError:
+            pass
+        return i
+
+    def __getitem__(self, i):
+        return self.image(i), self.label_array(i)
+
+
+def use_packed_cache(data_dir=DATA_DIR, splits=('train', 'val')):
+    """
+    Route ultralytics' image loading through the packed files. Call before model.train().
+    Packs hold long-side-resized images, i.e. rect_mode=True; square-stretch loads
+    (rect_mode=False), images already in the dataset's RAM cache, and images that aren't
+    in the pack (or changed since) go through the original load_image. Packed loads fill
+    the same ims/buffer cache the original does, so mosaic still samples from it.
+    """
+    from ultralytics.data.base import BaseDataset
+
+    packs = []
+    for split in splits:
+        try:
+            packs.append(PackedDataset(data_dir, split))
+        except FileNotFoundError:
+            print(f"⚠️ No packed {split} split in {data_dir}; run pack_dataset.py first")
+
+    if not packs or getattr(BaseDataset.load_image, '_packed', False):
+        return packs
+
+    original = BaseDataset.load_image
+
+    def load_image(self, i, rect_mode=True):
+        if not rect_mode or self.ims[i] is not None:
+            return original(self, i, rect_mode)
+        path = self.im_files[i]
+        for pack in packs:
+            j = pack.lookup(path)
+            if j is not None and pack.imgsz == self.imgsz:
+                im = pack.image(j).copy()  # augmentations write in place
+                hw0 = pack.original_shape(j)
+                if self.augment:  # same buffer bookkeeping as BaseDataset.load_image
+                    self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+                    self.buffer.append(i)
+                    if 1 < len(self.buffer) >= self.max_buffer_length:
+                        k = self.buffer.pop(0)
+                        if getattr(self, 'cache', None) != 'ram':
+                            self.ims[k], self.im_hw0[k], self.im_hw[k] = None, None, None
+                return im, hw0, im.shape[:2]
+        return original(self, i, rect_mode)
+
+    load_image._packed = True
+    BaseDataset.load_image = load_image
+    print(f"📦 Training will read images from {len(packs)} packed split(s)")
+    return packs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack YOLO images into a memory-mapped training cache.")
+    parser.add_argument('--data', default=DATA_DIR, help="dataset root containing images/ and labels/")
+    parser.add_argument('--imgsz', type=int, default=640, help="training imgsz (long side)")
+    parser.add_argument('--splits', default='train,val')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    for split in [s.strip() for s in args.splits.split(',') if s.strip()]:
+        pack_split(args.data, split, args.imgsz, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import os
 import shutil
 import random
 
+from frame_store import frame_names, materialize
+
 LABELS = ['basketball', 'hoop', 'player', 'backboard', 'net']
 
 SRC_FRAMES = "frame_cache"
@@ -24,10 +26,7 @@ def collect_gpt_frames():
         if not os.path.isdir(session_path):
             continue
 
-        for file in os.listdir(session_path):
-            if not file.endswith(".jpg"):
-                continue
-
+        for file in sorted(frame_names(session_path, (".jpg",))):  # loose + packed frames
             img_path = os.path.join(session_path, file)
             base = os.path.splitext(file)[0]
             label_path = os.path.join(SRC_LABELS, base + ".txt")
@@ -44,7 +43,10 @@ def copy_pairs(pairs, img_dst, lbl_dst):
         filename = os.path.basename(img_path)
         labelname = os.path.basename(lbl_path)
 
-        shutil.copy2(img_path, os.path.join(img_dst, filename))
+        if os.path.exists(img_path):
+            shutil.copy2(img_path, os.path.join(img_dst, filename))
+        else:
+            materialize(os.path.dirname(img_path), filename, os.path.join(img_dst, filename))
         shutil.copy2(lbl_path, os.path.join(lbl_dst, labelname))
 
 def write_yaml():
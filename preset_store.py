@@ -0,0 +1,106 @@
+"""
+Voice preset store backed by SQLite.
+
+Presets live in data/voice_presets.sqlite keyed by (namespace, name), so upserts and
+deletes are single indexed statements that are safe across gunicorn workers. Each
+process keeps an in-memory name index per namespace and drops it whenever the
+database or its WAL file changes on disk (mtime/size), i.e. after any worker's write.
+The legacy data/voice_presets.json is imported into the default namespace the first
+time the store is created.
+"""
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+PRESET_DB = Path("data") / "voice_presets.sqlite"
+LEGACY_PRESET_FILE = Path("data") / "voice_presets.json"
+DEFAULT_NAMESPACE = "default"
+
+
+class PresetStore:
+    def __init__(self, db_path=PRESET_DB, legacy_file=LEGACY_PRESET_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._index = {}        # namespace -> {name: preset}, insertion ordered
+        self._version = None
+
+        with self._conn() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS presets (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            namespace TEXT NOT NULL,
+                            name TEXT NOT NULL,
+                            data TEXT NOT NULL,
+                            updated REAL NOT NULL,
+                            UNIQUE (namespace, name))""")
+            empty = c.execute("SELECT COUNT(*) FROM presets").fetchone()[0] == 0
+        if empty and legacy_file and Path(legacy_file).exists():
+            self._import_legacy(Path(legacy_file))
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _import_legacy(self, path):
+        try:
+            items = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for p in items if isinstance(items, list) else []:
+            if isinstance(p, dict) and p.get("name"):
+                self.upsert(p)
+        print(f"📥 Imported {len(items)} voice presets from {path}")
+
+    def _disk_signature(self):
+        sig = []
+        for p in (self.db_path, Path(f"{self.db_path}-wal")):
+            try:
+                st = p.stat()
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _fresh(self):
+        """Drop the in-memory index if the database changed on disk since we built it."""
+        version = self._disk_signature()
+        if version != self._version:
+            with self._lock:
+                self._index.clear()
+                self._version = version
+
+    def _namespace_index(self, namespace):
+        self._fresh()
+        idx = self._index.get(namespace)
+        if idx is None:
+            rows = self._conn().execute(
+                "SELECT name, data FROM presets WHERE namespace=? ORDER BY id", (namespace,)).fetchall()
+            idx = {name: json.loads(data) for name, data in rows}
+            with self._lock:
+                self._index[namespace] = idx
+        return idx
+
+    def list(self, namespace=DEFAULT_NAMESPACE):
+        return list(self._namespace_index(namespace).values())
+
+    def get(self, name, namespace=DEFAULT_NAMESPACE):
+        return self._namespace_index(namespace).get(name)
+
+    def upsert(self, preset, namespace=DEFAULT_NAMESPACE):
+        with self._conn() as c:
+            c.execute("""INSERT INTO presets (namespace, name, data, updated) VALUES (?, ?, ?, ?)
+                         ON CONFLICT (namespace, name) DO UPDATE SET data=excluded.data, updated=excluded.updated""",
+                      (namespace, preset["name"], json.dumps(preset, ensure_ascii=False), time.time()))
+        return preset
+
+    def delete(self, name, namespace=DEFAULT_NAMESPACE):
+        with self._conn() as c:
+            deleted = c.execute("DELETE FROM presets WHERE namespace=? AND name=?", (namespace, name)).rowcount
+        return deleted > 0
@@ -0,0 +1,159 @@
+"""
+Background proxy transcodes for uploaded videos.
+
+Every upload gets two proxies in a .proxies/ folder next to it, named after the full
+file name so clip.mp4 and clip.mov don't share proxies:
+    <name>.analysis.mp4  — 640 wide, the source's frames and timing untouched (frame N of the
+                           proxy is frame N of the original), H.264 tuned for fast decode,
+                           no audio. Server-side analysis (frame extraction, motion
+                           timelines) reads this instead of the 1080p/4K HEVC original.
+    <name>.playback.mp4  — 1280 wide H.264 + AAC with faststart, for scrubbing in the browser.
+
+ffmpeg does the work when it is on PATH; otherwise the analysis proxy is written with
+OpenCV (mp4v) and no playback proxy is made. Jobs run one at a time on a background
+thread so an upload never waits on a transcode. Analysis needs the same input every
+time, so analysis_source() builds the analysis proxy on the spot, or waits for the job
+already building it; an flock per proxy keeps workers from building it twice.
+"""
+import os
+import fcntl
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROXY_DIRNAME = ".proxies"
+ANALYSIS_WIDTH = 640
+PLAYBACK_WIDTH = 1280
+ANALYSIS_GOP = 30   # keyframe every 30 frames, so seeks decode at most that many
+
+
+def proxy_path(video_path, kind):
+    p = Path(video_path)
+    return p.parent / PROXY_DIRNAME / f"{p.name}.{kind}.mp4"
+
+
+def _fresh(proxy, source):
+    try:
+        return proxy.stat().st_mtime >= Path(source).stat().st_mtime and proxy.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+
+class ProxyTranscoder:
+    def __init__(self, workers=1):
+        self.ffmpeg = shutil.which("ffmpeg")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    # ---------- lookups ----------
+    def analysis_source(self, video_path):
+        """
+        (path, kind) to decode for analysis: the analysis proxy, built now if it isn't
+        current yet, with kind "analysis"; the original with kind "original" only if the
+        proxy can't be built.
+        """
+        proxy = proxy_path(video_path, "analysis")
+        try:
+            self._build_analysis(video_path, proxy)
+        except Exception as e:
+            print(f"⚠️ Analysis proxy failed for {video_path}, decoding the original: {e}")
+        if _fresh(proxy, video_path):
+            return str(proxy), "analysis"
+        return str(video_path), "original"
+
+    def status(self, video_path):
+        out = {"pending": str(video_path) in self._pending}
+        for kind in ("analysis", "playback"):
+            out[kind] = _fresh(proxy_path(video_path, kind), video_path)
+        return out
+
+    # ---------- jobs ----------
+    def submit(self, video_path):
+        video_path = str(video_path)
+        with self._lock:
+            if video_path in self._pending:
+                return
+            self._pending.add(video_path)
+        self._pool.submit(self._run, video_path)
+
+    def _run(self, video_path):
+        try:
+            self.build(video_path)
+        except Exception as e:
+            print(f"⚠️ Proxy transcode failed for {video_path}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(video_path)
+
+    def _build_analysis(self, video_path, analysis):
+        if _fresh(analysis, video_path):
+            return
+        analysis.parent.mkdir(parents=True, exist_ok=True)
+        with open(analysis.with_name(analysis.name + ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # someone else building it: wait, then reuse
+            if _fresh(analysis, video_path):
+                return
+            if self.ffmpeg:
+                # scale only; -vsync passthrough keeps every source frame once, so frame indices match
+                self._ffmpeg(video_path, analysis, [
+                    "-vf", f"scale={ANALYSIS_WIDTH}:-2", "-vsync", "passthrough",
+                    "-c:v", "libx264", "-preset", "veryfast", "-tune", "fastdecode",
+                    "-g", str(ANALYSIS_GOP), "-bf", "0", "-pix_fmt", "yuv420p", "-an",
+                ])
+            else:
+                self._opencv_analysis(video_path, analysis)
+            print(f"🎞️ Analysis proxy ready: {analysis}")
+
+    def build(self, video_path):
+        analysis = proxy_path(video_path, "analysis")
+        playback = proxy_path(video_path, "playback")
+        self._build_analysis(video_path, analysis)
+
+        if self.ffmpeg and not _fresh(playback, video_path):
+            self._ffmpeg(video_path, playback, [
+                "-vf", f"scale='min({PLAYBACK_WIDTH},iw)':-2",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+                "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart",
+            ])
+            print(f"🎞️ Playback proxy ready: {playback}")
+
+    def _ffmpeg(self, src, dest, args):
+        tmp = dest.with_name(f"{dest.stem}.{os.getpid()}.part.mp4")
+        cmd = [self.ffmpeg, "-y", "-loglevel", "error", "-i", str(src), *args, str(tmp)]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, timeout=3600)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    @staticmethod
+    def _opencv_analysis(src, dest):
+        import cv2
+
+        cap = cv2.VideoCapture(str(src))
+        if not cap.isOpened():
+            raise RuntimeError("cannot open video")
+        tmp = dest.with_name(f"{dest.stem}.{os.getpid()}.part.mp4")
+        writer = None
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                h, w = frame.shape[:2]
+                size = (ANALYSIS_WIDTH, int(round(h * ANALYSIS_WIDTH / w / 2)) * 2)
+                if writer is None:
+                    writer = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+                writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        finally:
+            cap.release()
+            if writer is not None:
+                writer.release()
+        if writer is None:
+            raise RuntimeError("no frames decoded")
+        os.replace(tmp, dest)
@@ -0,0 +1,40 @@
+"""
+Small LRU of per-client-session objects (fallback detectors, trackers).
+
+Entries are created on first use by `factory()`, dropped after `idle_ttl` seconds
+without a get(), and the least recently used are evicted past `max_sessions`.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+MAX_SESSIONS = 64
+IDLE_TTL = 600
+
+
+class SessionPool:
+    def __init__(self, factory, max_sessions=MAX_SESSIONS, idle_ttl=IDLE_TTL):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()    # id -> (last_used, obj)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            for sid in [s for s, (t, _) in self._sessions.items() if now - t > self.idle_ttl]:
+                del self._sessions[sid]
+            entry = self._sessions.pop(session_id, None)
+            obj = entry[1] if entry else self.factory()
+            self._sessions[session_id] = (now, obj)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return obj
+
+    def reset(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
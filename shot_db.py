@@ -0,0 +1,329 @@
+"""
+Indexed shot and session history for "my_doach" and the community feed.
+
+Rows live in SQLite (data/shots.sqlite); the trails themselves stay in the compact
+per-session logs (shot_log.py). Every insert also bumps the session's running totals
+(shots, made, angle/arc sums), so a session summary is one row read instead of a scan
+over its shots.
+
+Listings page by keyset: pass the `next` cursor from one page as `before` to get the
+next, which costs the same at page 1 and page 1000. Plain ?page= is still accepted for
+small jumps, like the video catalog.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SHOTS_DB = Path("data") / "shots.sqlite"
+MAX_PER_PAGE = 200
+
+
+def _tags(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return sorted({str(t).strip().lower() for t in value if str(t).strip()})
+
+
+def _num(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _cursor(ts, rowid):
+    return f"{int(ts)}.{int(rowid)}"
+
+
+def _parse_cursor(cursor):
+    try:
+        ts, rowid = str(cursor).split(".", 1)
+        return int(ts), int(rowid)
+    except (TypeError, ValueError):
+        return None
+
+
+class ShotDB:
+    def __init__(self, db_path=SHOTS_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        with self._conn() as c:
+            c.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    user TEXT NOT NULL DEFAULT 'anonymous',
+                    created INTEGER NOT NULL,
+                    updated INTEGER NOT NULL,
+                    title TEXT, video_url TEXT, notes TEXT,
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    public INTEGER NOT NULL DEFAULT 0,
+                    shots INTEGER NOT NULL DEFAULT 0,
+                    made INTEGER NOT NULL DEFAULT 0,
+                    release_sum REAL NOT NULL DEFAULT 0, release_n INTEGER NOT NULL DEFAULT 0,
+                    entry_sum REAL NOT NULL DEFAULT 0, entry_n INTEGER NOT NULL DEFAULT 0,
+                    arc_sum REAL NOT NULL DEFAULT 0, arc_n INTEGER NOT NULL DEFAULT 0,
+                    made_pct REAL);
+                CREATE TABLE IF NOT EXISTS shots (
+                    id INTEGER PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    made INTEGER NOT NULL,
+                    release_angle REAL, entry_angle REAL, arc_height REAL,
+                    miss_reason TEXT,
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    data TEXT);
+                CREATE TABLE IF NOT EXISTS shot_tags (tag TEXT NOT NULL, shot_id INTEGER NOT NULL, ts INTEGER NOT NULL,
+                                                      PRIMARY KEY (tag, ts, shot_id)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS session_tags (tag TEXT NOT NULL, session_id TEXT NOT NULL, updated INTEGER NOT NULL,
+                                                         PRIMARY KEY (tag, session_id));
+                CREATE INDEX IF NOT EXISTS idx_shots_user_ts ON shots (user, ts, id);
+                CREATE INDEX IF NOT EXISTS idx_shots_session_ts ON shots (session_id, ts, id);
+                CREATE INDEX IF NOT EXISTS idx_shots_made_ts ON shots (made, ts, id);
+                CREATE INDEX IF NOT EXISTS idx_shots_ts ON shots (ts, id);
+                CREATE INDEX IF NOT EXISTS idx_sessions_user_updated ON sessions (user, updated, id);
+                CREATE INDEX IF NOT EXISTS idx_sessions_public_updated ON sessions (public, updated, id);
+                CREATE INDEX IF NOT EXISTS idx_session_tags_updated ON session_tags (tag, updated, session_id);
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---------- writes ----------
+    def upsert_session(self, session_id, user=None, title=None, video_url=None, notes=None,
+                       tags=None, public=None, created=None, conn=None):
+        """
+        Create or update a session's descriptive fields; totals are left alone. `user` only
+        sets the owner of a new session; an existing session keeps its owner.
+        """
+        now = int(time.time() * 1000)
+        c = conn or self._conn()
+        with c:
+            c.execute("INSERT OR IGNORE INTO sessions (id, user, created, updated) VALUES (?, ?, ?, ?)",
+                      (session_id, user or "anonymous", int(created or now), int(created or now)))
+            sets, args = [], []
+            for col, val in (("title", title), ("video_url", video_url),
+                             ("notes", notes), ("public", None if public is None else int(bool(public)))):
+                if val is not None:
+                    sets.append(f"{col}=?"); args.append(val)
+            if tags is not None:
+                tags = _tags(tags)
+                sets.append("tags=?"); args.append(json.dumps(tags))
+            if sets:
+                c.execute(f"UPDATE sessions SET {', '.join(sets)} WHERE id=?", args + [session_id])
+            if tags is not None:
+                self._sync_session_tags(c, session_id)
+
+    def _sync_session_tags(self, c, session_id):
+        row = c.execute("SELECT tags, updated FROM sessions WHERE id=?", (session_id,)).fetchone()
+        c.execute("DELETE FROM session_tags WHERE session_id=?", (session_id,))
+        c.executemany("INSERT INTO session_tags (tag, session_id, updated) VALUES (?, ?, ?)",
+                      [(t, session_id, row["updated"]) for t in json.loads(row["tags"])])
+
+    def add_shots(self, session_id, shots, user=None):
+        """Index shot records (the shot_logger.js shape) and fold them into the session totals."""
+        c = self._conn()
+        self.upsert_session(session_id, user=user, conn=c)
+        user = c.execute("SELECT user FROM sessions WHERE id=?", (session_id,)).fetchone()["user"]
+        now = int(time.time() * 1000)
+        with c:
+            latest = 0
+            new_tags = set()
+            for shot in shots:
+                ts = int(shot.get("timestamp") or now)
+                made = int(bool(shot.get("made")))
+                rel = _num(shot.get("releaseAngle"))
+                ent = _num(shot.get("entryAngle"))
+                arc = _num(shot.get("arcHeight"))
+                reason = shot.get("missReason")
+                tags = _tags(shot.get("tags"))
+                if not made and reason:
+                    tags = sorted(set(tags) | {str(reason).strip().lower()})
+                extra = {k: v for k, v in shot.items() if k not in ("trail", "pre", "post", "poseSnapshot")}
+                cur = c.execute(
+                    "INSERT INTO shots (session_id, user, ts, made, release_angle, entry_angle, arc_height, "
+                    "miss_reason, tags, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, user, ts, made, rel, ent, arc, reason, json.dumps(tags),
+                     json.dumps(extra, separators=(",", ":"))))
+                c.executemany("INSERT OR IGNORE INTO shot_tags (tag, shot_id, ts) VALUES (?, ?, ?)",
+                              [(t, cur.lastrowid, ts) for t in tags])
+                new_tags.update(tags)
+                c.execute("""UPDATE sessions SET shots=shots+1, made=made+?,
+                                 release_sum=release_sum+?, release_n=release_n+?,
+                                 entry_sum=entry_sum+?, entry_n=entry_n+?,
+                                 arc_sum=arc_sum+?, arc_n=arc_n+?
+                             WHERE id=?""",
+                          (made, rel or 0.0, rel is not None, ent or 0.0, ent is not None,
+                           arc or 0.0, arc is not None, session_id))
+                latest = max(latest, ts)
+            c.execute("UPDATE sessions SET updated=MAX(updated, ?), made_pct=CAST(made AS REAL)/MAX(shots, 1) WHERE id=?",
+                      (latest, session_id))
+            if new_tags:
+                row = c.execute("SELECT tags FROM sessions WHERE id=?", (session_id,)).fetchone()
+                c.execute("UPDATE sessions SET tags=? WHERE id=?",
+                          (json.dumps(sorted(set(json.loads(row["tags"])) | new_tags)), session_id))
+            self._sync_session_tags(c, session_id)
+        return len(shots)
+
+    def seed_summary(self, session_id, made_pct=None, avg_release=None):
+        """Totals for a session imported without shot rows (e.g. a published community summary)."""
+        c = self._conn()
+        with c:
+            if made_pct is not None:
+                c.execute("UPDATE sessions SET made_pct=? WHERE id=? AND shots=0", (float(made_pct), session_id))
+            if avg_release is not None:
+                c.execute("UPDATE sessions SET release_sum=?, release_n=1 WHERE id=? AND shots=0",
+                          (float(avg_release), session_id))
+
+    # ---------- reads ----------
+    @staticmethod
+    def _summary(r):
+        avg = lambda s, n: round(r[s] / r[n], 2) if r[n] else None
+        return {
+            "id": r["id"],
+            "user": r["user"],
+            "created": r["created"],
+            "updated": r["updated"],
+            "title": r["title"],
+            "video_url": r["video_url"],
+            "tags": json.loads(r["tags"]),
+            "public": bool(r["public"]),
+            "summary": {
+                "shots": r["shots"],
+                "made": r["made"],
+                "made_percentage": round(r["made_pct"], 3) if r["made_pct"] is not None else None,
+                "avg_release_angle": avg("release_sum", "release_n"),
+                "avg_entry_angle": avg("entry_sum", "entry_n"),
+                "avg_arc_height": avg("arc_sum", "arc_n"),
+                "user_notes": r["notes"],
+            },
+        }
+
+    @staticmethod
+    def _shot(r):
+        item = json.loads(r["data"] or "{}")
+        item.update({
+            "id": r["id"], "session_id": r["session_id"], "user": r["user"], "timestamp": r["ts"],
+            "made": bool(r["made"]), "releaseAngle": r["release_angle"], "entryAngle": r["entry_angle"],
+            "arcHeight": r["arc_height"], "missReason": r["miss_reason"], "tags": json.loads(r["tags"]),
+        })
+        return item
+
+    @staticmethod
+    def _page(items, per_page, page, before, key):
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        return {
+            "items": items,
+            "page": page if before is None else None,
+            "per_page": per_page,
+            "next": key(items[-1]) if has_more and items else None,
+        }
+
+    def session(self, session_id):
+        r = self._conn().execute("SELECT * FROM sessions WHERE id=?", (session_id,)).fetchone()
+        return self._summary(r) if r else None
+
+    def query_shots(self, user=None, session=None, made=None, tag=None, since=None, until=None,
+                    before=None, page=1, per_page=50):
+        """Newest first. Filters are ANDed; every combination is served by one of the indexes."""
+        where, args = [], []
+        src, ts_col, id_col = "shots s", "s.ts", "s.id"
+        if tag:  # walk the (tag, ts) index, newest first
+            src, ts_col, id_col = "shot_tags t JOIN shots s ON s.id = t.shot_id", "t.ts", "t.shot_id"
+            where.append("t.tag = ?"); args.append(str(tag).strip().lower())
+        if user:
+            where.append("s.user = ?"); args.append(user)
+        if session:
+            where.append("s.session_id = ?"); args.append(session)
+        if made is not None:
+            where.append("s.made = ?"); args.append(int(bool(made)))
+        if since is not None:
+            where.append("s.ts >= ?"); args.append(int(since))
+        if until is not None:
+            where.append("s.ts <= ?"); args.append(int(until))
+        cur = _parse_cursor(before) if before else None
+        if cur:
+            where.append(f"({ts_col} < ? OR ({ts_col} = ? AND {id_col} < ?))"); args += [cur[0], cur[0], cur[1]]
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        page = max(1, int(page))
+        per_page = max(1, min(MAX_PER_PAGE, int(per_page)))
+        offset = 0 if cur else (page - 1) * per_page
+        rows = self._conn().execute(
+            f"SELECT s.* FROM {src} {clause} ORDER BY {ts_col} DESC, {id_col} DESC LIMIT ? OFFSET ?",
+            args + [per_page + 1, offset]).fetchall()
+        items = [self._shot(r) for r in rows]
+        return self._page(items, per_page, page, cur, lambda it: _cursor(it["timestamp"], it["id"]))
+
+    def query_sessions(self, user=None, public=None, tag=None, before=None, page=1, per_page=20):
+        """Session summaries, most recently active first."""
+        where, args = [], []
+        src, ts_col, id_col = "sessions s", "s.updated", "s.id"
+        if tag:
+            src, ts_col, id_col = "session_tags t JOIN sessions s ON s.id = t.session_id", "t.updated", "t.session_id"
+            where.append("t.tag = ?"); args.append(str(tag).strip().lower())
+        if user:
+            where.append("s.user = ?"); args.append(user)
+        if public is not None:
+            where.append("s.public = ?"); args.append(int(bool(public)))
+        cur = None
+        if before:
+            try:
+                ts, sid = str(before).split(".", 1)
+                cur = (int(ts), sid)
+            except ValueError:
+                cur = None
+        if cur:
+            where.append(f"({ts_col} < ? OR ({ts_col} = ? AND {id_col} < ?))"); args += [cur[0], cur[0], cur[1]]
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        page = max(1, int(page))
+        per_page = max(1, min(MAX_PER_PAGE, int(per_page)))
+        offset = 0 if cur else (page - 1) * per_page
+        rows = self._conn().execute(
+            f"SELECT s.* FROM {src} {clause} ORDER BY {ts_col} DESC, {id_col} DESC LIMIT ? OFFSET ?",
+            args + [per_page + 1, offset]).fetchall()
+        items = [self._summary(r) for r in rows]
+        return self._page(items, per_page, page, cur, lambda it: f"{it['updated']}.{it['id']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from shot_log import ShotStore, SHOTS_DIR
+
+    ap = argparse.ArgumentParser(description="Build the shot index from existing shot logs and community sessions")
+    ap.add_argument("--shots", default=SHOTS_DIR, help="shot_log directory to index")
+    ap.add_argument("--community", default=os.path.join("public", "community-sessions.json"))
+    args = ap.parse_args()
+
+    db = ShotDB()
+    store = ShotStore(args.shots)
+    for sid in store.sessions():
+        if db.session(sid):
+            print(f"⏭️ {sid}: already indexed")
+            continue
+        n = db.add_shots(sid, store.load(sid, trails=False))
+        print(f"📦 {sid}: {n} shots")
+    if os.path.exists(args.community):
+        with open(args.community) as f:
+            for s in json.load(f):
+                summary = s.get("summary") or {}
+                db.upsert_session(s["id"], user=s.get("user"), video_url=s.get("video_url"),
+                                  notes=summary.get("user_notes"), tags=s.get("tags"), public=True)
+                db.seed_summary(s["id"], summary.get("made_percentage"), summary.get("avg_release_angle"))
+                print(f"🌐 {s['id']}: community session")
@@ -0,0 +1,258 @@
+"""
+Compact, append-only shot logs.
+
+The browser's shot records carry the ball `trail` (and the legacy files `pre`/`post`)
+as lists of {x, y, frame} objects, most of them repeated verbatim (the same detection
+is pushed once per render tick). Here each trail is rounded to integers, consecutive duplicates are dropped and the rest is
+stored as one absolute int32 point followed by int16 deltas (int32 if a jump does not
+fit), so a typical 100-point trail shrinks from ~4 KB of JSON to a few hundred bytes.
+
+One file per session, data/shots/<session>.shots:
+
+    b"DSH1"                                     file magic
+    per shot:  <II  meta_len, trail_len
+               meta_len bytes   the shot record without its trails, as JSON; "_trails"
+                                lists which TRAIL_KEYS follow, in order
+               trail_len bytes  per trail: <BI flags, n | 3 x int32 | (n-1) x 3 x int16/int32
+
+Appends take an flock so concurrent workers never interleave records, and cut off a torn
+tail left by an interrupted append before writing, so one crash can't hide every later
+shot. JSON in the old shape is produced on demand by export(); migrate() converts the
+legacy static/assets/shot_*.json and static/js/shot_logs.json files, skipping shots it
+already imported.
+"""
+import os
+import re
+import json
+import glob
+import time
+import fcntl
+import struct
+import argparse
+
+import numpy as np
+
+SHOTS_DIR = os.path.join("data", "shots")
+MAGIC = b"DSH1"
+RECORD = struct.Struct("<II")
+TRAIL_HEAD = struct.Struct("<BI")
+WIDE = 0x01                      # deltas stored as int32
+TRAIL_KEYS = ("trail", "pre", "post")
+_SESSION_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def safe_session(session):
+    s = _SESSION_RE.sub("_", str(session or "default"))[:64].strip(".")
+    return s or "default"
+
+
+def compact_trail(trail):
+    """(n, 3) int32 array of x, y, frame with consecutive duplicate points removed."""
+    pts = [(p.get("x"), p.get("y"), p.get("frame", 0)) for p in trail or [] if isinstance(p, dict)]
+    pts = [p for p in pts if p[0] is not None and p[1] is not None]
+    if not pts:
+        return np.zeros((0, 3), dtype=np.int32)
+    a = np.rint(np.array(pts, dtype=np.float64)).astype(np.int32)
+    keep = np.ones(len(a), dtype=bool)
+    keep[1:] = np.any(a[1:] != a[:-1], axis=1)
+    return a[keep]
+
+
+def encode_trail(points):
+    points = np.asarray(points, dtype=np.int32).reshape(-1, 3)
+    n = len(points)
+    if not n:
+        return TRAIL_HEAD.pack(0, 0)
+    deltas = np.diff(points.astype(np.int64), axis=0)
+    wide = bool(deltas.size) and (deltas.min() < -32768 or deltas.max() > 32767)
+    dtype = "<i4" if wide else "<i2"
+    return (TRAIL_HEAD.pack(WIDE if wide else 0, n) + points[0].astype("<i4").tobytes()
+            + deltas.astype(dtype).tobytes())
+
+
+def decode_trail(buf, offset=0):
+    """(points, offset just past this trail)."""
+    flags, n = TRAIL_HEAD.unpack_from(buf, offset)
+    off = offset + TRAIL_HEAD.size
+    if not n:
+        return np.zeros((0, 3), dtype=np.int32), off
+    first = np.frombuffer(buf, dtype="<i4", count=3, offset=off)
+    dtype = "<i4" if flags & WIDE else "<i2"
+    deltas = np.frombuffer(buf, dtype=dtype, count=(n - 1) * 3, offset=off + 12).reshape(-1, 3)
+    out = np.empty((n, 3), dtype=np.int32)
+    out[0] = first
+    out[1:] = first + np.cumsum(deltas, axis=0, dtype=np.int64)
+    return out, off + 12 + deltas.nbytes
+
+
+def _valid_end(f, size):
+    """Offset just past the last complete record, walking only the record headers."""
+    off = len(MAGIC)
+    while off + RECORD.size <= size:
+        f.seek(off)
+        ml, tl = RECORD.unpack(f.read(RECORD.size))
+        if off + RECORD.size + ml + tl > size:
+            break
+        off += RECORD.size + ml + tl
+    return off
+
+
+def trail_to_json(points):
+    return [{"x": int(x), "y": int(y), "frame": int(f)} for x, y, f in points]
+
+
+class ShotStore:
+    def __init__(self, root=SHOTS_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, session):
+        return os.path.join(self.root, f"{safe_session(session)}.shots")
+
+    def sessions(self):
+        return sorted(os.path.basename(p)[:-len(".shots")] for p in glob.glob(os.path.join(self.root, "*.shots")))
+
+    def append(self, session, shots):
+        """Append one shot dict or a list of them; returns the number written."""
+        if isinstance(shots, dict):
+            shots = [shots]
+        blob = bytearray()
+        for shot in shots:
+            keys = [k for k in TRAIL_KEYS if isinstance(shot.get(k), list)]
+            meta = {k: v for k, v in shot.items() if k not in keys}
+            meta.setdefault("timestamp", int(time.time() * 1000))
+            meta["_trails"] = keys
+            mb = json.dumps(meta, separators=(",", ":")).encode()
+            tb = b"".join(encode_trail(compact_trail(shot[k])) for k in keys)
+            blob += RECORD.pack(len(mb), len(tb)) + mb + tb
+        with open(self.path(session), "ab+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC):
+                f.truncate(0)
+                f.write(MAGIC)
+            else:
+                f.seek(0)
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"not a shot log: {self.path(session)}")
+                end = _valid_end(f, size)
+                if end < size:
+                    print(f"⚠️ Dropping {size - end} torn bytes from {self.path(session)}")
+                    f.truncate(end)
+            f.write(blob)
+            f.flush()
+        return len(shots)
+
+    def iter_raw(self, session):
+        """(meta dict, encoded trails bytes) per shot, in append order."""
+        try:
+            with open(self.path(session), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if data[:4] != MAGIC:
+            raise ValueError(f"not a shot log: {self.path(session)}")
+        off, end = 4, len(data)
+        while off + RECORD.size <= end:
+            ml, tl = RECORD.unpack_from(data, off)
+            off += RECORD.size
+            if off + ml + tl > end:
+                break  # torn tail from an interrupted append
+            yield json.loads(data[off:off + ml]), data[off + ml:off + ml + tl]
+            off += ml + tl
+
+    def load(self, session, trails=True):
+        """Shot dicts; trails as (n, 3) int arrays, or omitted with trails=False."""
+        out = []
+        for meta, tb in self.iter_raw(session):
+            keys = meta.pop("_trails", ["trail"])
+            if trails:
+                off = 0
+                for k in keys:
+                    meta[k], off = decode_trail(tb, off)
+            out.append(meta)
+        return out
+
+    def export(self, session):
+        """The session in the legacy JSON shape: {"session_id", "shots": [..., "trail": [{x, y, frame}]]}."""
+        shots = []
+        for i, shot in enumerate(self.load(session), 1):
+            for k in TRAIL_KEYS:
+                if k in shot:
+                    shot[k] = trail_to_json(shot[k])
+            shot.setdefault("id", i)
+            shots.append(shot)
+        return {"session_id": safe_session(session), "shots": shots}
+
+    def size(self, session):
+        try:
+            return os.path.getsize(self.path(session))
+        except FileNotFoundError:
+            return 0
+
+
+def _legacy_shots(doc):
+    if isinstance(doc, list):
+        return doc
+    if isinstance(doc, dict) and isinstance(doc.get("shots"), list):
+        return doc["shots"]
+    if isinstance(doc, dict) and "trail" in doc:
+        return [doc]
+    return []
+
+
+def migrate(paths, store, session=None):
+    """
+    Import legacy JSON shot logs. Every imported shot records its `source`, and shots
+    whose source is already in the target session are skipped, so re-running is safe.
+    Returns {path: shots imported}.
+    """
+    done = {}
+    seen = {}
+    for path in paths:
+        with open(path) as f:
+            doc = json.load(f)
+        shots = _legacy_shots(doc)
+        target = safe_session(session or (doc.get("session_id") if isinstance(doc, dict) else None) or "legacy")
+        if target not in seen:
+            seen[target] = {meta.get("source") for meta, _ in store.iter_raw(target)}
+        m = re.search(r"shot_(.+)\.json$", os.path.basename(path))
+        new = []
+        for i, shot in enumerate(shots, 1):
+            if "source" not in shot:
+                base = m.group(1) if m else os.path.basename(path)
+                source = base if m and len(shots) == 1 else f"{base}:{i}"
+                shot = {**shot, "source": source}
+            if shot["source"] in seen[target]:
+                continue
+            seen[target].add(shot["source"])
+            new.append(shot)
+        if new:
+            store.append(target, new)
+        done[path] = len(new)
+    return done
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Shot log tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="import legacy JSON shot logs into data/shots")
+    m.add_argument("paths", nargs="*", default=None)
+    m.add_argument("--session", help="store everything under this session (default: the file's session_id or 'legacy')")
+    m.add_argument("--root", default=SHOTS_DIR)
+    e = sub.add_parser("export", help="print a session as JSON")
+    e.add_argument("session")
+    e.add_argument("--root", default=SHOTS_DIR)
+    args = ap.parse_args()
+
+    store = ShotStore(args.root)
+    if args.cmd == "migrate":
+        paths = args.paths or sorted(glob.glob("static/assets/shot_*.json")) + ["static/js/shot_logs.json"]
+        before = 0
+        for path, n in migrate([p for p in paths if os.path.exists(p)], store, args.session).items():
+            before += os.path.getsize(path)
+            print(f"📦 {path}: {n} shots")
+        after = sum(store.size(s) for s in store.sessions())
+        print(f"✅ {before} bytes of JSON -> {after} bytes in {args.root}")
+    else:
+        print(json.dumps(store.export(args.session), indent=2))
@@ -5,17 +5,23 @@ export default function CommunityFeed() {
   const [sessions, setSessions] = useState([]);
   const [activeTag, setActiveTag] = useState(null);
 
+  const [allTags, setAllTags] = useState([]);
+
+  // the server filters by tag (indexed), so only one page is ever fetched
   useEffect(() => {
-    fetch('https://your-api.com/community-sessions')
+    const params = new URLSearchParams({ per_page: 50 });
+    if (activeTag) params.set('tag', activeTag);
+    fetch('/api/feed?' + params)
       .then(res => res.json())
-      .then(data => setSessions(data));
-  }, []);
-
-  const filteredSessions = activeTag
-    ? sessions.filter(s => s.tags.includes(activeTag))
-    : sessions;
+      .then(data => {
+        const items = data.items || [];
+        setSessions(items);
+        if (!activeTag) setAllTags([...new Set(items.flatMap(s => s.tags))]);
+      });
+  }, [activeTag]);
 
-  const uniqueTags = [...new Set(sessions.flatMap(s => s.tags))];
+  const filteredSessions = sessions;
+  const uniqueTags = allTags;
 
   return (
     <div style={{ padding: '1rem', maxWidth: '1000px', margin: '0 auto' }}>
@@ -0,0 +1,150 @@
+// chunked_upload.js — resumable uploads against /api/uploads
+// window.doachUploadResumable(file, { target: 'videos'|'uploads', onProgress(sent, total) })
+// resolves to { name, url, duplicate }. An interrupted upload picks up where it stopped
+// the next time the same file is chosen (id kept in localStorage per name/size/mtime).
+// New uploads send the file's sha256 so the server can answer with a stored copy up front.
+(function () {
+  const STORE_KEY = 'doachPendingUploads';
+  const HASH_CHUNK = 8 * 1024 * 1024;
+  const SUBTLE_MAX = 64 * 1024 * 1024;   // crypto.subtle has no streaming digest; above this hash incrementally
+
+  // Minimal incremental SHA-256 so large videos are hashed slice by slice instead of in one buffer.
+  const K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2]);
+
+  function Sha256() {
+    this.h = new Uint32Array([0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+                              0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]);
+    this.w = new Uint32Array(64);
+    this.buf = new Uint8Array(64);
+    this.fill = 0;
+    this.len = 0;
+  }
+  Sha256.prototype.block = function (b, o) {
+    const w = this.w, h = this.h;
+    for (let i = 0; i < 16; i++) w[i] = (b[o + 4 * i] << 24) | (b[o + 4 * i + 1] << 16) | (b[o + 4 * i + 2] << 8) | b[o + 4 * i + 3];
+    for (let i = 16; i < 64; i++) {
+      const x = w[i - 15], y = w[i - 2];
+      const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+      const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+      w[i] = (w[i - 16] + s0 + w[i - 7] + s1) | 0;
+    }
+    let a = h[0], bb = h[1], c = h[2], d = h[3], e = h[4], f = h[5], g = h[6], hh = h[7];
+    for (let i = 0; i < 64; i++) {
+      const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+      const t1 = (hh + S1 + ((e & f) ^ (~e & g)) + K[i] + w[i]) | 0;
+      const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+      const t2 = (S0 + ((a & bb) ^ (a & c) ^ (bb & c))) | 0;
+      hh = g; g = f; f = e; e = (d + t1) | 0; d = c; c = bb; bb = a; a = (t1 + t2) | 0;
+    }
+    h[0] += a; h[1] += bb; h[2] += c; h[3] += d; h[4] += e; h[5] += f; h[6] += g; h[7] += hh;
+  };
+  Sha256.prototype.update = function (bytes) {
+    let i = 0;
+    this.len += bytes.length;
+    if (this.fill) {
+      while (this.fill < 64 && i < bytes.length) this.buf[this.fill++] = bytes[i++];
+      if (this.fill < 64) return;
+      this.block(this.buf, 0);
+      this.fill = 0;
+    }
+    for (; i + 64 <= bytes.length; i += 64) this.block(bytes, i);
+    while (i < bytes.length) this.buf[this.fill++] = bytes[i++];
+  };
+  Sha256.prototype.hex = function () {
+    const bits = this.len * 8;
+    const pad = new Uint8Array(((this.fill < 56 ? 56 : 120) - this.fill) + 8);
+    pad[0] = 0x80;
+    const dv = new DataView(pad.buffer);
+    dv.setUint32(pad.length - 8, Math.floor(bits / 2 ** 32));
+    dv.setUint32(pad.length - 4, bits >>> 0);
+    this.update(pad);
+    return Array.from(this.h, x => x.toString(16).padStart(8, '0')).join('');
+  };
+
+  const toHex = buf => Array.from(new Uint8Array(buf), b => b.toString(16).padStart(2, '0')).join('');
+
+  async function fileSha256(file) {
+    if (window.crypto?.subtle && file.size <= SUBTLE_MAX) {
+      return toHex(await crypto.subtle.digest('SHA-256', await file.arrayBuffer()));
+    }
+    const h = new Sha256();
+    for (let off = 0; off < file.size; off += HASH_CHUNK) {
+      h.update(new Uint8Array(await file.slice(off, off + HASH_CHUNK).arrayBuffer()));
+    }
+    return h.hex();
+  }
+
+  function pending() {
+    try { return JSON.parse(localStorage.getItem(STORE_KEY) || '{}'); } catch { return {}; }
+  }
+  function remember(fileKey, id) {
+    const p = pending();
+    if (id) p[fileKey] = id; else delete p[fileKey];
+    try { localStorage.setItem(STORE_KEY, JSON.stringify(p)); } catch {}
+  }
+
+  async function json(res) {
+    const j = await res.json().catch(() => ({}));
+    if (!res.ok && res.status !== 409) throw new Error(j.error || `HTTP ${res.status}`);
+    return j;
+  }
+
+  async function start(file, target) {
+    let sha256 = null;
+    try { sha256 = await fileSha256(file); } catch (e) { console.warn('sha256 failed, uploading without it', e); }
+    return json(await fetch('/api/uploads', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, target, sha256 })
+    }));
+  }
+
+  window.doachUploadResumable = async function (file, { target = 'videos', onProgress, retries = 5 } = {}) {
+    const fileKey = `${target}:${file.name}:${file.size}:${file.lastModified}`;
+    let state = null;
+
+    const savedId = pending()[fileKey];
+    if (savedId) {
+      const r = await fetch(`/api/uploads/${savedId}`);
+      if (r.ok) state = await r.json();
+    }
+    if (!state) state = await start(file, target);
+    if (state.done) { remember(fileKey, null); return state; }
+    remember(fileKey, state.id);
+
+    let offset = state.offset || 0;
+    const chunk = state.chunk_size || 8 * 1024 * 1024;
+    let failures = 0;
+    while (true) {
+      const body = file.slice(offset, Math.min(offset + chunk, file.size));
+      let res;
+      try {
+        res = await json(await fetch(`/api/uploads/${state.id}?offset=${offset}`, {
+          method: 'PUT',
+          headers: { 'Content-Type': 'application/octet-stream' },
+          body
+        }));
+      } catch (e) {
+        if (++failures > retries) throw e;
+        await new Promise(r => setTimeout(r, 500 * 2 ** failures));
+        // ask the server where it actually got to before retrying
+        const st = await fetch(`/api/uploads/${state.id}`).then(r => r.ok ? r.json() : null).catch(() => null);
+        if (st?.done) { remember(fileKey, null); onProgress?.(file.size, file.size); return st; }
+        if (st) offset = st.offset;
+        continue;
+      }
+      failures = 0;
+      if (res.done) { remember(fileKey, null); onProgress?.(file.size, file.size); return res; }
+      offset = res.offset;
+      onProgress?.(offset, file.size);
+    }
+  };
+})();
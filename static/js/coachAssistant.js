@@ -4,6 +4,7 @@
   // ---------- Config ----------
   const DOACH = window.DOACH || {
     chatEndpoint: '/api/coach',  // POST {prompt, model}
+    chatStreamEndpoint: '/api/coach/stream',  // same body, SSE reply
     ttsEndpoint:  '/api/tts',    // POST {text, voice}
     model:        'gpt-4o-mini',
     tts:          'openai',      // 'openai' or 'web'
@@ -386,6 +387,59 @@
     await playWithEQ(blob, p);
   };
 
+  // ---------- Public: streaming coach (SSE) — speak sentence by sentence ----------
+  // POSTs to /api/coach/stream; the server hands each finished sentence to TTS and sends
+  // its audio URL, so playback starts after the first sentence instead of the whole answer.
+  // A failure after the first sentence rethrows with err.spoken = true: the player already
+  // heard part of the answer, so callers must not replay it from the JSON endpoint.
+  window.doachCoachStream = async function(body, { onToken, onSentence } = {}){
+    const p = {...{voice:DOACH.voice, tts:DOACH.tts, speed:1, volume:1, bassDb:0, trebleDb:0}, ...getPrefs()};
+    const speak = isAudioOn();
+    const useServerTTS = speak && p.tts !== 'web';
+    const res = await fetch(DOACH.chatStreamEndpoint || '/api/coach/stream', {
+      method:'POST', headers:{'Content-Type':'application/json'},
+      body: JSON.stringify({ ...body, lang: body.lang || p.lang, tts: useServerTTS ? { voice: p.voice || 'alloy' } : undefined })
+    });
+    if(!res.ok || !res.body) throw new Error(`coach stream failed: ${res.status}`);
+
+    let playChain = Promise.resolve();
+    const play = (job) => { playChain = playChain.then(job).catch(e => console.warn('[Doach] stream audio', e)); };
+
+    const reader = res.body.getReader();
+    const dec = new TextDecoder();
+    let buf = '', full = '', spoken = false;
+    try{
+      for(;;){
+        const { value, done } = await reader.read();
+        if(done) break;
+        buf += dec.decode(value, { stream:true });
+        let sep;
+        while((sep = buf.indexOf('\n\n')) >= 0){
+          const raw = buf.slice(0, sep); buf = buf.slice(sep + 2);
+          const ev = (raw.match(/^event: (.*)$/m) || [])[1];
+          const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || '{}');
+          if(ev === 'token'){ onToken?.(data.text); }
+          else if(ev === 'sentence'){
+            spoken = true;
+            onSentence?.(data.text, data.index);
+            if(speak && p.tts === 'web') play(() => speakWeb(data.text, p));
+          }
+          else if(ev === 'audio' && data.url && useServerTTS){
+            const blobP = fetch(data.url).then(r => r.blob());   // fetch now, play in order
+            play(async () => playWithEQ(await blobP, p));
+          }
+          else if(ev === 'done'){ full = data.text || full; }
+          else if(ev === 'error'){ throw new Error(data.error || 'coach stream error'); }
+        }
+      }
+    } catch(e){
+      if(spoken){ e.spoken = true; await playChain; }  // let what was said finish
+      throw e;
+    }
+    await playChain;
+    return full.trim();
+  };
+
   // ---------- Capture pose content for analysis ----------
   window.capturePoseSnapshot = function(playerState, hoopBox){
     try{
@@ -516,7 +570,19 @@
         const r = await fetch(window.DOACH.chatEndpoint, {
           method:'POST',
           headers:{'Content-Type':'application/json'},
-          body: JSON.stringify({ prompt, model: window.DOACH.model, temperature: 0.8 })
+          body: JSON.stringify({
+            prompt, model: window.DOACH.model, temperature: 0.8,
+            lang: getPrefs().lang || 'en-US',
+            // structured metrics + prompt inputs let the server reuse feedback for the same miss pattern
+            shot: { made, releaseAngle: shot.releaseAngle, entryAngle: shot.entryAngle,
+                    arcHeight: shot.arcHeight, missReason: shot.missReason },
+            cue: {
+              category: (window.__coachCueHistory || []).at(-1) || null,
+              lastCategories: (window.__coachCueHistory || []).slice(-4, -1),
+              draft: mode === 'polish' ? localText : '',
+              personality: window.DOACH?.personality || 'positive, concise'
+            }
+          })
         });
         const j = await r.json();
         const llm = (j?.text || '').trim();
@@ -1051,15 +1117,21 @@ window.addEventListener('shot:summary', (e) => {
 
       // Fallback to model for anything not covered by our quick rules
       if (!/(feet|stance|release|wrist|elbow|power|knee|arc|entry|angle|make|accuracy)/.test(q) && DOACH.chatEndpoint) {
+        const ctx = { lastShot: lastShot(), recent: window.DOACH_MEM?.recent?.(5) };
+        const body = {
+          prompt: `You are Doach. User asked: "${finalText}". Use this context JSON:\n${JSON.stringify(ctx)}\nGive a specific, actionable answer in 1–2 short sentences.`,
+          model: DOACH.model
+        };
+        // Stream it: speech starts on the first finished sentence
+        if (window.doachCoachStream) {
+          // fall back to the JSON endpoint only if nothing was said yet, or the answer repeats
+          try { await window.doachCoachStream(body); return; } catch (e) { if (e?.spoken) return; }
+        }
         try {
-          const ctx = { lastShot: lastShot(), recent: window.DOACH_MEM?.recent?.(5) };
           const r = await fetch(DOACH.chatEndpoint, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              prompt: `You are Doach. User asked: "${finalText}". Use this context JSON:\n${JSON.stringify(ctx)}\nGive a specific, actionable answer in 1–2 short sentences.`,
-              model: DOACH.model
-            })
+            body: JSON.stringify(body)
           });
           const j = await r.json();
           if (j?.text) reply = j.text.trim();
@@ -1,28 +1,36 @@
 // feedLoader.js
-// Load from local stremioExport.json for development
-async function loadFeed() {
+// Community feed from /api/feed, one page at a time (keyset cursor, see shot_db.py)
+let feedCursor = null;
+
+async function loadFeed({ tag = null, more = false } = {}) {
   const container = document.getElementById('feedContainer');
   const template = document.getElementById('videoCard');
-  container.innerHTML = '';
-
-  const localJson = await fetch('/static/stremioExport.json');
-  const raw = await localJson.json();
+  if (!more) { container.innerHTML = ''; feedCursor = null; }
 
-  const sessions = raw.libraryItems || raw.items || [];
+  const params = new URLSearchParams({ per_page: 20 });
+  if (tag) params.set('tag', tag);
+  if (more && feedCursor) params.set('before', feedCursor);
+  const res = await fetch('/api/feed?' + params);
+  const page = await res.json();
+  feedCursor = page.next;
 
-  sessions.forEach(session => {
+  (page.items || []).forEach(session => {
     const node = template.content.cloneNode(true);
     const video = node.querySelector('video');
     const user = node.querySelector('.uploader');
     const date = node.querySelector('.date');
     const notes = node.querySelector('.notes');
+    const s = session.summary || {};
 
-    video.src = session.meta?.trailer || session.video || '';
-    video.poster = session.meta?.poster || '';
-    user.textContent = session.user || session.meta?.name || 'Anonymous';
-    date.textContent = new Date(session.timestamp || Date.now()).toLocaleString();
-    notes.textContent = session.description || session.meta?.description || '';
+    video.src = session.video_url || '';
+    user.textContent = session.user || 'Anonymous';
+    date.textContent = new Date(session.updated || Date.now()).toLocaleString();
+    const pct = s.made_percentage != null ? `${Math.round(s.made_percentage * 100)}% made` : '';
+    notes.textContent = [pct, s.user_notes].filter(Boolean).join(' — ');
 
     container.appendChild(node);
   });
-}
\ No newline at end of file
+
+  const btn = document.getElementById('feedMore');
+  if (btn) btn.style.display = feedCursor ? '' : 'none';
+}
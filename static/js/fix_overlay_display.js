@@ -188,6 +188,8 @@ export function drawLiveOverlay(objects = [], playerState) {
 
 
 let isDetectingFrame = false;
+// per-tab id so the server keeps a separate motion-fallback background model for us
+const detectSessionId = (window.doachSessionId ||= (crypto.randomUUID?.() || `s${Date.now()}${Math.random().toString(36).slice(2)}`));
 const reusableYOLOCanvas = document.createElement("canvas");
 const reusableYOLOCtx = reusableYOLOCanvas.getContext("2d");
 
@@ -212,10 +214,15 @@ export async function sendFrameToDetectServer(canvas, frameIndex) {
     reusableYOLOCtx.drawImage(video, 0, 0, vw, vh);   // use raw frame
 
     const dataURL = reusableYOLOCanvas.toDataURL("image/jpeg", 0.5);
+    // frameIndex lets the server tracker scale its motion model by the real frame gap
+    // (skipped frames, seeks); the -1 warm-up call sends none
     const res = await fetch("/detect_frame", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ frame: dataURL, width: vw, height: vh }),
+      body: JSON.stringify({
+        frame: dataURL, width: vw, height: vh, session: detectSessionId,
+        frameIndex: Number.isInteger(frameIndex) && frameIndex >= 0 ? frameIndex : undefined,
+      }),
     });
     if (!res.ok) return { objects: [] };
     return await res.json(); // {objects:[], frameIndex?}
@@ -586,7 +586,33 @@ export function scoringTick(__frameIdx) {
 
 
 // ===== UI Helpers =====
-export function logShot(data) { shotLog.push({ id: shotLog.length + 1, timestamp: Date.now(), ...data }); }
+export function logShot(data) {
+  const rec = { id: shotLog.length + 1, timestamp: Date.now(), ...data };
+  shotLog.push(rec);
+  persistShot(rec);
+}
+
+function randomId(prefix) {
+  return crypto.randomUUID?.() || `${prefix}${Date.now()}${Math.random().toString(36).slice(2)}`;
+}
+
+// per-browser owner id: the server only lists and edits sessions stored under it
+export function doachUserId() {
+  let id = localStorage.getItem('doachUser');
+  if (!id) { id = randomId('u'); localStorage.setItem('doachUser', id); }
+  return id;
+}
+
+// server keeps a compact per-session log (/api/shots/<session> exports it as JSON)
+function persistShot(rec) {
+  const session = (window.doachSessionId ||= randomId('s'));
+  fetch('/api/shots', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'X-Doach-User': doachUserId() },
+    body: JSON.stringify({ session, shot: rec }),
+    keepalive: true,
+  }).catch(e => console.warn('[shot_logger] persist failed:', e));
+}
 export function resetShotLog() { shotLog.length = 0; }
 
 export function drawShotStatsTable() {
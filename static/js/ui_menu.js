@@ -168,7 +168,7 @@
 
     // Try server list, else local list
     let videos = [];
-    try { const r = await fetch('/videos'); if (r.ok) { const j = await r.json(); videos = Array.isArray(j.videos)? j.videos: []; } } catch {}
+    try { const r = await fetch('/videos?sort=date&order=desc&per_page=100'); if (r.ok) { const j = await r.json(); const arr = j.items || j.videos; videos = Array.isArray(arr)? arr: []; } } catch {}
     try { const loc = JSON.parse(localStorage.getItem('doachVideos')||'[]'); if (!videos.length && Array.isArray(loc)) videos = loc; } catch {}
 
     function triggerFilePicker(){
@@ -192,7 +192,8 @@
         el('div', {class:'doach-list-item'},
           el('div', {}, v.name || v.filename || 'Untitled'),
           el('div', {},
-            el('button', {class:'doach-btn ghost', onclick:()=>loadViaURL(v.url||v.path)}, 'Use URL')
+            // 1280w H.264 proxy when it's built: scrubs smoothly where the HEVC/4K original won't
+            el('button', {class:'doach-btn ghost', onclick:()=>loadViaURL(v.playback_url||v.url||v.path)}, 'Use URL')
           )
         )
       ) : [el('div', {class:'doach-list-item'}, 'No saved videos yet')])
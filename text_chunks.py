@@ -0,0 +1,87 @@
+"""
+Sentence chunking for speech: cut streamed or long text into sentence-sized pieces
+that can be synthesized independently.
+"""
+import re
+
+# End of sentence: . ! ? … followed by whitespace (so "3." + "5 sec" mid-stream isn't cut),
+# CJK 。！？ (no space needed), or a newline
+_SENT_END = re.compile(r'[.!?…]["”’)\]]*\s+|[。！？]["”’)\]]*|\n+')
+
+# Don't split after these ("Dr. Smith", "e.g. this")
+_ABBREV = {"mr", "mrs", "ms", "dr", "st", "vs", "e.g", "i.e", "etc", "approx", "no"}
+
+MIN_CHARS = 12      # merge fragments like "Close." into the next sentence
+MAX_CHARS = 280     # hard cap per chunk for TTS
+
+
+def _is_abbrev(text_before):
+    words = text_before.split()
+    last = words[-1].lower() if words else ""
+    return last in _ABBREV or (len(last) == 1 and last.isalpha())
+
+
+def _hard_wrap(sentence, max_chars):
+    if len(sentence) <= max_chars:
+        return [sentence]
+    out, cur = [], ""
+    for part in re.split(r'(?<=[,;:—])\s+|\s+', sentence):
+        if cur and len(cur) + 1 + len(part) > max_chars:
+            out.append(cur)
+            cur = part
+        else:
+            cur = f"{cur} {part}".strip()
+    if cur:
+        out.append(cur)
+    return out
+
+
+def split_sentences(text, min_chars=MIN_CHARS, max_chars=MAX_CHARS):
+    """Whole text → list of sentence chunks (short fragments merged, long ones wrapped)."""
+    chunker = SentenceChunker(min_chars, max_chars)
+    return chunker.feed(text) + chunker.flush()
+
+
+class SentenceChunker:
+    """Incremental splitter for token streams: feed() deltas, get back completed sentences."""
+
+    def __init__(self, min_chars=MIN_CHARS, max_chars=MAX_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buf = ""
+        self.pending = ""  # short sentence waiting to be merged with the next one
+
+    def _emit(self, sentence):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            return []
+        joined = f"{self.pending} {sentence}".strip()
+        if len(joined) < self.min_chars:
+            self.pending = joined
+            return []
+        self.pending = ""
+        return _hard_wrap(joined, self.max_chars)
+
+    def feed(self, delta):
+        self.buf += delta or ""
+        out = []
+        start = 0
+        for m in _SENT_END.finditer(self.buf):
+            if m.group(0)[0] == "." and _is_abbrev(self.buf[start:m.start()]):
+                continue
+            out.extend(self._emit(self.buf[start:m.end()]))
+            start = m.end()
+        self.buf = self.buf[start:]
+        # Runaway sentence with no punctuation: wrap it rather than wait forever
+        if len(self.buf) > self.max_chars * 2:
+            out.extend(self._emit(self.buf))
+            self.buf = ""
+        return out
+
+    def flush(self):
+        out = self._emit(self.buf)
+        self.buf = ""
+        if self.pending:
+            out.append(self.pending)
+            self.pending = ""
+        return out
@@ -0,0 +1,475 @@
+"""
+Training job queue for the extraction page's "Start training" button.
+
+Jobs run one at a time by default (DOACH_TRAIN_CONCURRENCY to raise it), each as a
+child process with its CPU thread count pinned. Status is kept in data/training_jobs.sqlite,
+shared by every gunicorn worker: each job records the PID of the worker that owns it, and
+a starting worker only fails active jobs whose owner is no longer alive, stopping their
+orphaned training process group (it runs in its own session, so it outlives the server
+and would keep holding its training slot). Per-epoch metrics are read straight from the
+run's results.csv. A promoted model is published in data/serving_weights.json, which
+every worker checks (one stat) before detecting, so they all switch to it.
+
+Run names are sanitized and suffixed with the job id, so a job always gets a fresh folder
+under runs/detect. The child writes the folder ultralytics actually used (trainer.save_dir)
+to <run name>.run.json, and metrics/weights are read from there.
+
+The child process is this file:
+    python training_jobs.py --data datasets/doach_seg/data.yaml --name doach_gpt_v14 --epochs 60
+"""
+import os
+import sys
+import re
+import csv
+import json
+import time
+import uuid
+import signal
+import sqlite3
+import argparse
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+JOBS_DB = BASE_DIR / "data" / "training_jobs.sqlite"
+LEGACY_JOBS_FILE = BASE_DIR / "data" / "training_jobs.json"
+RUNS_PROJECT = BASE_DIR / "runs" / "detect"
+SLOTS_DIR = BASE_DIR / "data" / "training_slots"
+SERVING_FILE = BASE_DIR / "data" / "serving_weights.json"
+
+DEFAULT_CONCURRENCY = int(os.getenv("DOACH_TRAIN_CONCURRENCY", "1"))
+DEFAULT_THREADS = int(os.getenv("DOACH_TRAIN_THREADS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+ACTIVE_STATES = ("queued", "running")
+_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def safe_run_name(name, job_id):
+    """A run folder name that stays inside the project and can't collide with another job."""
+    base = _NAME_RE.sub("_", str(name or "")).strip("._")[:48] or "doach_gpt"
+    return f"{base}_{job_id}"
+
+
+def read_results_csv(run_dir):
+    """Per-epoch metrics ultralytics writes after every epoch, as a list of dicts."""
+    path = Path(run_dir) / "results.csv"
+    if not path.exists():
+        return []
+    rows = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            clean = {}
+            for k, v in row.items():
+                k = (k or "").strip()
+                try:
+                    clean[k] = float(v)
+                except (TypeError, ValueError):
+                    clean[k] = (v or "").strip()
+            rows.append(clean)
+    return rows
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_training_child(pid):
+    """True unless /proc shows the pid now belongs to something other than a training child."""
+    try:
+        cmdline = Path(f"/proc/{int(pid)}/cmdline").read_bytes()
+    except FileNotFoundError:
+        return _pid_alive(pid)  # no procfs (macOS): trust the pid
+    except (OSError, ValueError):
+        return False
+    return Path(__file__).name.encode() in cmdline
+
+
+def _kill_group(pgid, grace=10):
+    """SIGTERM a process group, then SIGKILL whatever is left after `grace` seconds."""
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except OSError:
+        return
+    deadline = time.time() + grace
+    while time.time() < deadline:
+        if not _pid_alive(pgid):
+            return
+        time.sleep(0.2)
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def publish_weights(weights, serving_file=SERVING_FILE):
+    """Make `weights` the model every worker serves (see published_weights)."""
+    serving_file = Path(serving_file)
+    serving_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = serving_file.with_name(f"{serving_file.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"weights": str(Path(weights).resolve()), "published": time.time()}),
+                   encoding="utf-8")
+    os.replace(tmp, serving_file)
+
+
+def published_weights(serving_file=SERVING_FILE):
+    """(weights path, stamp) of the last promotion, or (None, None); the stamp changes on every publish."""
+    try:
+        stamp = os.stat(serving_file).st_mtime_ns
+        with open(serving_file, encoding="utf-8") as f:
+            return json.load(f)["weights"], stamp
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+class TrainingJobManager:
+    def __init__(self, db_path=JOBS_DB, project=RUNS_PROJECT, legacy_file=LEGACY_JOBS_FILE,
+                 concurrency=DEFAULT_CONCURRENCY, threads=DEFAULT_THREADS, on_complete=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.project = Path(project)
+        self.concurrency = max(1, concurrency)
+        self.threads = max(1, threads)
+        self.on_complete = on_complete  # called with the job dict after a successful run
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queue = deque()   # this worker's queued job ids
+        self._procs = {}        # this worker's running children
+
+        with self._tx() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                            id TEXT PRIMARY KEY,
+                            owner INTEGER,
+                            status TEXT NOT NULL,
+                            created REAL NOT NULL,
+                            data TEXT NOT NULL)""")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            empty = c.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        if empty and legacy_file and Path(legacy_file).exists():
+            self._import_legacy(Path(legacy_file))
+        self.reap()
+
+    # ---------- persistence ----------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """Write transaction taken up front, so read-modify-write is atomic across workers."""
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+
+    @staticmethod
+    def _read(c, job_id):
+        row = c.execute("SELECT data FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _write(c, job):
+        c.execute("INSERT OR REPLACE INTO jobs (id, owner, status, created, data) VALUES (?, ?, ?, ?, ?)",
+                  (job["id"], job.get("owner"), job["status"], job["created"], json.dumps(job)))
+
+    def _update(self, job_id, fn):
+        """Apply fn(job) to the stored job under a write lock; returns the updated job (or None)."""
+        with self._tx() as c:
+            job = self._read(c, job_id)
+            if job is None:
+                return None
+            fn(job)
+            self._write(c, job)
+            return job
+
+    def _import_legacy(self, path):
+        try:
+            items = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        with self._tx() as c:
+            for job in items if isinstance(items, list) else []:
+                if isinstance(job, dict) and job.get("id"):
+                    self._write(c, job)
+        print(f"📥 Imported {len(items)} training jobs from {path}")
+
+    def reap(self):
+        """
+        Fail active jobs whose owning server process is gone (crash, restart, reload) and
+        stop their training process group, so it no longer holds a training slot.
+        """
+        orphans = []
+        with self._tx() as c:
+            rows = c.execute("SELECT data FROM jobs WHERE status IN (?, ?, ?)",
+                             ACTIVE_STATES + ("cancelling",)).fetchall()
+            for (data,) in rows:
+                job = json.loads(data)
+                if _pid_alive(job.get("owner")):
+                    continue
+                pgid = job.get("pgid") or job.get("pid")
+                if pgid and _pid_alive(pgid) and _is_training_child(pgid):
+                    orphans.append(int(pgid))
+                job["status"] = "failed"
+                job["error"] = "server restarted before training finished"
+                job["finished"] = time.time()
+                self._write(c, job)
+        for pgid in orphans:
+            print(f"🧹 Stopping orphaned training process group {pgid}")
+            _kill_group(pgid)
+
+    # ---------- public API ----------
+    def submit(self, data_yaml, name=None, model="yolov8n.pt", epochs=60, imgsz=640, promote=False):
+        job_id = uuid.uuid4().hex[:12]
+        name = safe_run_name(name or f"doach_gpt_{time.strftime('%Y%m%d_%H%M%S')}", job_id)
+        job = {
+            "id": job_id,
+            "name": name,
+            "status": "queued",
+            "owner": os.getpid(),
+            "data": str(data_yaml),
+            "model": model,
+            "epochs": int(epochs),
+            "imgsz": int(imgsz),
+            "promote": bool(promote),
+            "run_dir": str(self.project / name),
+            "run_file": str(self.project / f"{name}.run.json"),
+            "weights": None,
+            "error": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+        }
+        with self._tx() as c:
+            self._write(c, job)
+        with self._lock:
+            self._queue.append(job_id)
+        self._pump()
+        return dict(job)
+
+    def get(self, job_id, with_metrics=True):
+        job = self._read(self._conn(), job_id)
+        if job is None:
+            return None
+        _resolve_run_dir(job)
+        if with_metrics:
+            job["metrics"] = read_results_csv(job["run_dir"])
+            job["epoch"] = len(job["metrics"])
+            bench = Path(job["run_dir"]) / "benchmark.json"
+            if bench.exists():
+                job["benchmark"] = json.loads(bench.read_text(encoding="utf-8"))
+        return job
+
+    def list(self):
+        rows = self._conn().execute("SELECT data FROM jobs ORDER BY created DESC").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def cancel(self, job_id):
+        """Works from any worker: queued jobs are marked, running ones get their process group signalled."""
+        state = {}
+
+        def mark(job):
+            state["before"] = job["status"]
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished"] = time.time()
+            elif job["status"] == "running":
+                job["status"] = "cancelling"
+
+        job = self._update(job_id, mark)
+        if job is None or state["before"] not in ACTIVE_STATES:
+            return False
+        if state["before"] == "queued":
+            with self._lock:
+                if job_id in self._queue:
+                    self._queue.remove(job_id)
+            return True
+        with self._lock:
+            proc = self._procs.get(job_id)
+        if proc is not None:
+            _terminate(proc)
+        elif _pid_alive(job.get("pgid") or job.get("pid")):
+            # another worker owns it; its _wait() sees the exit and the "cancelling" status
+            try:
+                os.killpg(int(job.get("pgid") or job["pid"]), signal.SIGTERM)
+            except OSError:
+                pass
+        return True
+
+    # ---------- scheduling ----------
+    def _pump(self):
+        with self._lock:
+            while self._queue and len(self._procs) < self.concurrency:
+                job_id = self._queue.popleft()
+                job = self._read(self._conn(), job_id)
+                if job is None or job["status"] != "queued":
+                    continue  # cancelled from another worker
+                try:
+                    proc = self._spawn(job)
+                except Exception as e:
+                    err = str(e)
+                    self._update(job_id, lambda j: j.update(status="failed", error=err))
+                    continue
+
+                def started(j, proc=proc, log=job.get("log")):
+                    # start_new_session: the child leads its own process group
+                    j.update(status="running", started=time.time(), pid=proc.pid, pgid=proc.pid, log=log)
+                self._update(job_id, started)
+                self._procs[job_id] = proc
+                threading.Thread(target=self._wait, args=(job_id, proc), daemon=True).start()
+
+    def _spawn(self, job):
+        env = dict(os.environ)
+        n = str(self.threads)
+        env.update({"OMP_NUM_THREADS": n, "MKL_NUM_THREADS": n, "OPENBLAS_NUM_THREADS": n})
+        cmd = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--data", job["data"], "--model", job["model"], "--name", job["name"],
+            "--project", str(self.project), "--epochs", str(job["epochs"]),
+            "--imgsz", str(job["imgsz"]), "--threads", n, "--slots", str(self.concurrency),
+            "--run-file", job["run_file"],
+        ]
+        print("🚀 Running:", " ".join(cmd))
+        self.project.mkdir(parents=True, exist_ok=True)
+        job["log"] = str(self.project / f"{job['name']}.log")
+        with open(job["log"], "ab") as log:
+            # New process group so cancel() also stops dataloader workers
+            return subprocess.Popen(cmd, cwd=str(BASE_DIR), env=env, stdout=log, stderr=subprocess.STDOUT,
+                                    start_new_session=True)
+
+    def _wait(self, job_id, proc):
+        code = proc.wait()
+        with self._lock:
+            self._procs.pop(job_id, None)
+
+        def finish(job):
+            _resolve_run_dir(job)
+            job["finished"] = time.time()
+            job["returncode"] = code
+            best = Path(job["run_dir"]) / "weights" / "best.pt"
+            if job["status"] == "cancelling":
+                job["status"] = "cancelled"
+            elif code == 0 and best.exists():
+                job["status"] = "completed"
+                job["weights"] = str(best)
+            else:
+                job["status"] = "failed"
+                job["error"] = job.get("error") or f"training exited with code {code}"
+        done = self._update(job_id, finish)
+
+        if done and done["status"] == "completed" and done["promote"] and self.on_complete:
+            try:
+                self.on_complete(done)
+            except Exception as e:
+                print(f"❌ Promoting {done['weights']} failed: {e}")
+        self._pump()
+
+
+def _resolve_run_dir(job):
+    """Point run_dir at the folder the child reported (ultralytics may have picked another)."""
+    try:
+        with open(job.get("run_file") or "", encoding="utf-8") as f:
+            job["run_dir"] = json.load(f)["save_dir"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return job
+
+
+def _terminate(proc, grace=10):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except Exception:
+        proc.terminate()
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except Exception:
+            proc.kill()
+
+
+def _acquire_slot(slots):
+    """
+    Cross-process training slot. Each gunicorn worker has its own manager, so the
+    child also takes one of N lock files; the lock is released when the process exits.
+    """
+    import fcntl
+
+    SLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    handles = [open(SLOTS_DIR / f"slot{i}.lock", "w") for i in range(max(1, slots))]
+    for h in handles:
+        try:
+            fcntl.flock(h, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return h
+        except OSError:
+            continue
+    print("⏳ Waiting for a free training slot...", flush=True)
+    fcntl.flock(handles[0], fcntl.LOCK_EX)
+    return handles[0]
+
+
+def run_training(args):
+    """Child-process entrypoint: take a slot, pin threads, use the packed image cache if present, train."""
+    slot = _acquire_slot(args.slots)  # noqa: F841 — held for the life of the process
+
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(args.threads)
+
+    data_root = os.path.dirname(os.path.abspath(args.data))
+    try:
+        from pack_dataset import use_packed_cache
+        use_packed_cache(data_root)
+    except Exception as e:
+        print(f"⚠️ Packed cache unavailable, decoding JPEGs: {e}")
+
+    model = YOLO(args.model)
+    if args.run_file:
+        def report_save_dir(trainer):
+            tmp = args.run_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"save_dir": str(Path(trainer.save_dir).resolve())}, f)
+            os.replace(tmp, args.run_file)
+        model.add_callback("on_pretrain_routine_start", report_save_dir)
+    model.train(
+        data=args.data, name=args.name, project=args.project, epochs=args.epochs,
+        imgsz=args.imgsz, device="cpu", workers=min(8, args.threads), exist_ok=False,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one DOACH training job (used by TrainingJobManager).")
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--name", required=True)
+    parser.add_argument("--project", default=str(RUNS_PROJECT))
+    parser.add_argument("--epochs", type=int, default=60)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--slots", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--run-file", default=None, help="write the run's actual save_dir here as JSON")
+    run_training(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
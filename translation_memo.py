@@ -0,0 +1,162 @@
+"""
+Persistent memo for translate_if_needed.
+
+Translations are stored per target locale in data/translations.sqlite (safe to share
+across gunicorn workers) with an in-process dict in front, so a repeated coaching cue
+costs one lookup instead of one LLM round trip. prewarm() fills the memo for the
+standard cue vocabulary in one batched call per language.
+"""
+import json
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+MEMO_DB = Path("data") / "translations.sqlite"
+
+# Cues and openers coachAssistant.js speaks over and over
+COACHING_CUES = [
+    "elbow under ball", "hold follow-through", "higher arc", "feet placement", "snap wrist", "release point",
+    "Hold your follow-through for a count.",
+    "Load a touch more with your knees and finish high.",
+    "Feet too narrow — widen ~2–3\".", "Feet too wide — bring them in slightly.",
+    "Open your base a touch for balance.", "Narrow your base slightly to stay stacked.",
+    "Square both toes to the rim.", "Make your toes more parallel.",
+    "Level your feet — reduce the front/back stagger.", "Even out your stance front-to-back.",
+    "Add more knee bend to generate power.", "Dip a touch more with the knees.",
+    "Stay taller through the lift.", "Slightly more upright through the shot.",
+    "Get the shooting arm more vertical on release.", "Finish with a taller arm line.",
+    "Release above your shoulder line.", "Snap the wrist high — finish above the elbow.",
+    "Entry angle is flat — add arc.", "Entry angle is steep — soften the arc.",
+    "A bit flat — add arc.", "A tad steep — soften the arc.",
+    "Lift the arc slightly (more upward energy).", "Flatten the arc a touch (drive forward).",
+    "Money.", "Buckets.", "Splash.", "Nice make.", "There it is.", "Cash.",
+    "Lock that in.", "That’s repeatable.", "Keep that feel.", "Love that tempo.",
+    "Good look.", "Right idea.", "Close.", "Almost.", "Not far off.",
+    "Quick cue:", "Small tweak:", "Next rep,", "Dial this in:", "Fix this next:",
+]
+
+
+def _norm(text):
+    return " ".join((text or "").split())
+
+
+class TranslationMemo:
+    def __init__(self, db_path=MEMO_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._mem = {}
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        with self._conn() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS translations (
+                            lang TEXT NOT NULL,
+                            source TEXT NOT NULL,
+                            translated TEXT NOT NULL,
+                            PRIMARY KEY (lang, source))""")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, text, lang):
+        key = (lang, _norm(text))
+        out = self._mem.get(key)
+        if out is None:
+            row = self._conn().execute(
+                "SELECT translated FROM translations WHERE lang=? AND source=?", key).fetchone()
+            if row:
+                out = row[0]
+                with self._lock:
+                    self._mem[key] = out
+        return out
+
+    def peek(self, text, lang):
+        """Like get(), without counting a hit or miss."""
+        return self._lookup(text, lang)
+
+    def get(self, text, lang):
+        out = self._lookup(text, lang)
+        if out is None:
+            self.misses[lang] += 1
+        else:
+            self.hits[lang] += 1
+        return out
+
+    def put(self, text, lang, translated):
+        self.put_many(lang, [(text, translated)])
+
+    def put_many(self, lang, pairs):
+        rows = [(lang, _norm(src), dst) for src, dst in pairs if _norm(src) and dst]
+        if not rows:
+            return
+        with self._conn() as c:
+            c.executemany("INSERT OR REPLACE INTO translations (lang, source, translated) VALUES (?, ?, ?)", rows)
+        with self._lock:
+            for lang_, src, dst in rows:
+                self._mem[(lang_, src)] = dst
+
+    def translate(self, text, lang, translate_fn, memoize=True):
+        """
+        Memoized translate_fn(text, lang). Results equal to the input are memoized too
+        (names, numbers, "Money." in en-GB), so they don't cost a round trip every time;
+        pass memoize=False for a translate_fn that echoes text it could not translate.
+        An empty/None result is never memoized; the caller gets text back unchanged.
+        """
+        out = self.get(text, lang)
+        if out is None:
+            out = translate_fn(text, lang)
+            if not out:
+                return text
+            if memoize:
+                self.put(text, lang, out)
+        return out
+
+    def prewarm(self, langs, translate_batch, cues=COACHING_CUES):
+        """Fill the memo for every cue in every lang. translate_batch(texts, lang) -> list of same length."""
+        done = {}
+        for lang in langs:
+            missing = [c for c in cues if self._lookup(c, lang) is None]
+            if not missing:
+                done[lang] = 0
+                continue
+            try:
+                out = translate_batch(missing, lang)
+            except Exception as e:
+                print(f"⚠️ Prewarm {lang} failed: {e}")
+                done[lang] = 0
+                continue
+            pairs = [(src, dst) for src, dst in zip(missing, out or []) if dst]
+            self.put_many(lang, pairs)
+            done[lang] = len(pairs)
+            print(f"🌐 Prewarmed {len(pairs)} cues for {lang}")
+        return done
+
+    def stats(self):
+        langs = sorted(set(self.hits) | set(self.misses))
+        total_hits, total_misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": round(total_hits / (total_hits + total_misses), 4) if total_hits + total_misses else None,
+            "per_lang": {l: {"hits": self.hits[l], "misses": self.misses[l]} for l in langs},
+        }
+
+
+def parse_json_list(text, n):
+    """Pull a JSON string array of length n out of a chat reply (tolerates ``` fences)."""
+    t = (text or "").strip()
+    if t.startswith("```"):
+        t = t.strip("`")
+        t = t[t.find("["):]
+    start, end = t.find("["), t.rfind("]")
+    items = json.loads(t[start:end + 1]) if start >= 0 and end > start else []
+    if not isinstance(items, list) or len(items) != n:
+        raise ValueError(f"expected {n} translations, got {len(items) if isinstance(items, list) else 'none'}")
+    return [str(x).strip() for x in items]
@@ -0,0 +1,168 @@
+"""
+Content-addressed on-disk cache for /api/tts audio.
+
+Key = sha256(normalized text + voice + lang + model), so the same coaching cue in the
+same voice/language is synthesized once and then served from disk. Least-recently-used
+files are evicted once the cache grows past max_bytes (file mtime is the LRU clock).
+
+mp3_frames() strips a clip down to its audio frames so per-sentence clips can be
+joined into one stream without a stale ID3 tag or Xing/Info length header in between.
+"""
+import os
+import re
+import hashlib
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path("data") / "tts_cache"
+LEGACY_EXTS = (".mp3",)   # clips were all MP3 before the local backend added WAV
+MAX_BYTES = int(os.getenv("DOACH_TTS_CACHE_MB", "256")) * 1024 * 1024
+
+
+def normalize_text(text):
+    """Case/whitespace/trailing-punctuation insensitive, so 'Higher arc!' and 'higher arc' share audio."""
+    t = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return t.rstrip(" .!?")
+
+
+# MPEG audio layer III frame sizes: kbps by bitrate index, Hz by sample-rate index
+_MP3_KBPS = {1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+             2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+_MP3_HZ = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame_len(data, off):
+    """Length of the layer III frame at `off`, or None if there isn't one."""
+    if off + 4 > len(data) or data[off] != 0xFF or data[off + 1] & 0xE0 != 0xE0:
+        return None
+    version, layer = (data[off + 1] >> 3) & 3, (data[off + 1] >> 1) & 3
+    br, sr, pad = data[off + 2] >> 4, (data[off + 2] >> 2) & 3, (data[off + 2] >> 1) & 1
+    if layer != 1 or version not in _MP3_HZ or sr == 3 or br in (0, 15):
+        return None
+    kbps = _MP3_KBPS[1 if version == 3 else 2][br]
+    return (144 if version == 3 else 72) * kbps * 1000 // _MP3_HZ[version][sr] + pad
+
+
+def mp3_frames(data):
+    """The clip without a leading ID3v2 tag, its Xing/Info/VBRI header frame or a trailing ID3v1 tag."""
+    start = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size + (10 if data[5] & 0x10 else 0)  # footer flag
+    end = len(data)
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    n = _mp3_frame_len(data, start)
+    if n and any(tag in data[start:start + n] for tag in (b"Xing", b"Info", b"VBRI")):
+        start += n
+    return data[start:end]
+
+
+def cache_key(text, voice, lang, model):
+    raw = "\x1f".join([normalize_text(text), voice or "", lang or "", model or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, ext=".audio"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ext = ext
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._adopt_legacy()
+        self._total = sum(p.stat().st_size for p in self.root.glob(f"*{ext}"))
+
+    def _adopt_legacy(self):
+        """Rename clips cached under an old extension (same key), so they keep hitting and get evicted."""
+        for old in LEGACY_EXTS:
+            if old == self.ext:
+                continue
+            for p in self.root.glob(f"*{old}"):
+                try:
+                    os.replace(p, p.with_suffix(self.ext))
+                except FileNotFoundError:
+                    continue  # another worker got there first
+
+    def path_for(self, key):
+        return self.root / f"{key}{self.ext}"
+
+    @staticmethod
+    def mimetype(path):
+        """Clips are MP3 from OpenAI, WAV from the local backend — sniff instead of trusting the name."""
+        with open(path, "rb") as f:
+            head = f.read(4)
+        return "audio/wav" if head == b"RIFF" else "audio/mpeg"
+
+    def get(self, key):
+        """Path of a cached clip (and bump it to most-recently-used), or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def tee(self, key, chunks):
+        """
+        Yield chunks through to the client while writing them to the cache.
+        The clip is only committed if the upstream stream finished cleanly.
+        """
+        tmp = self.root / f"{key}.{os.getpid()}.{threading.get_ident()}.part"
+        size = 0
+        ok = False
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    if chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+                        yield chunk
+            ok = size > 0
+        finally:
+            if ok:
+                os.replace(tmp, self.path_for(key))
+                with self._lock:
+                    self._total += size
+                self._evict()
+            else:
+                try:
+                    tmp.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def put(self, key, data):
+        for _ in self.tee(key, [data]):
+            pass
+        return self.path_for(key)
+
+    def _evict(self):
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            files = sorted(self.root.glob(f"*{self.ext}"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            for p in files:
+                if total <= self.max_bytes * 0.9:  # evict a little extra so we don't rescan every put
+                    break
+                try:
+                    size = p.stat().st_size
+                    p.unlink()
+                    total -= size
+                except FileNotFoundError:
+                    continue
+            self._total = total
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+        }
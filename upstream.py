@@ -0,0 +1,207 @@
+"""
+Shared client for upstream AI calls (OpenAI speech, chat, vision).
+
+One pooled keep-alive requests.Session for raw HTTP (TTS audio streaming) and one
+OpenAI SDK client over a pooled httpx client for chat, both pointed at the same
+base URL. Set OPENAI_BASE_URL to a local stand-in server for tests/load runs.
+Every call goes through per-endpoint timeouts, jittered retry and a circuit breaker.
+"""
+import os
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# (connect, read) seconds per logical endpoint
+TIMEOUTS = {
+    "speech": (3.05, 60),
+    "chat": (3.05, 30),
+    "vision": (3.05, 60),
+    "default": (3.05, 30),
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `cooldown` seconds."""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()  # half-open: one trial per cooldown window
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+
+class UpstreamClient:
+    def __init__(self, base_url=None, api_key=None, timeouts=None, retries=2, backoff=0.25,
+                 pool_size=16, breaker_threshold=5, breaker_cooldown=30.0):
+        load_dotenv()  # Ensure .env is loaded
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._breaker_args = (breaker_threshold, breaker_cooldown)
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._openai = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def has_key(self):
+        return bool(self.api_key)
+
+    def _require_key(self):
+        if not self.api_key:
+            raise ValueError("❌ OPENAI_API_KEY not set in environment or .env file.")
+
+    def breaker(self, endpoint):
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(*self._breaker_args)
+            return self._breakers[endpoint]
+
+    def _sleep_before_retry(self, attempt):
+        # full jitter: uniform(0, backoff * 2^attempt)
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    # ---------- raw HTTP (pooled session) ----------
+    def post(self, endpoint, path, json=None, headers=None, stream=False):
+        """
+        POST base_url + path. Returns the response for any non-retryable status (callers
+        bubble API errors to the UI as before); raises after retries are exhausted.
+        """
+        self._require_key()
+        br = self.breaker(endpoint)
+        if not br.allow():
+            raise CircuitOpenError(f"upstream {endpoint} circuit open; retry shortly")
+
+        hdrs = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        hdrs.update(headers or {})
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        timeout = self.timeouts.get(endpoint, self.timeouts["default"])
+
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.session.post(url, json=json, headers=hdrs, stream=stream, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt < self.retries:
+                    self._sleep_before_retry(attempt)
+                    continue
+                br.record(False)
+                raise
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                r.close()
+                self._sleep_before_retry(attempt)
+                continue
+            br.record(r.status_code < 500)
+            return r
+
+    def speech(self, text, voice, model, accept="audio/mpeg"):
+        return self.post("speech", "audio/speech", json={"model": model, "voice": voice, "input": text},
+                         headers={"Accept": accept}, stream=True)
+
+    # ---------- OpenAI SDK (pooled httpx) ----------
+    def openai(self):
+        if self._openai is not None:
+            return self._openai
+        self._require_key()
+        import httpx
+        from openai import OpenAI
+
+        connect, read = self.timeouts["default"]
+        with self._lock:
+            if self._openai is None:
+                http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                    timeout=httpx.Timeout(read, connect=connect),
+                )
+                # retries are ours (jittered + breaker), not the SDK's
+                self._openai = OpenAI(api_key=self.api_key, base_url=self.base_url,
+                                      http_client=http_client, max_retries=0)
+        return self._openai
+
+    def call(self, endpoint, fn, **kwargs):
+        """Run an SDK call with the endpoint's timeout, jittered retry and circuit breaker."""
+        from openai import APIConnectionError, APITimeoutError, APIStatusError
+
+        br = self.breaker(endpoint)
+        if not br.allow():
+            raise CircuitOpenError(f"upstream {endpoint} circuit open; retry shortly")
+        connect, read = self.timeouts.get(endpoint, self.timeouts["default"])
+        kwargs.setdefault("timeout", read)
+
+        for attempt in range(self.retries + 1):
+            try:
+                out = fn(**kwargs)
+                br.record(True)
+                return out
+            except (APIConnectionError, APITimeoutError, APIStatusError) as e:
+                status = getattr(e, "status_code", None)
+                retryable = status is None or status in RETRY_STATUS
+                if retryable and attempt < self.retries:
+                    self._sleep_before_retry(attempt)
+                    continue
+                br.record(not retryable)
+                raise
+
+    def chat(self, endpoint="chat", **kwargs):
+        return self.call(endpoint, self.openai().chat.completions.create, **kwargs)
+
+    def stats(self):
+        return {"base_url": self.base_url,
+                "breakers": {k: {"state": b.state, "failures": b.failures} for k, b in self._breakers.items()}}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_upstream():
+    """Process-wide shared client (one connection pool per worker)."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = UpstreamClient()
+    return _default
@@ -0,0 +1,228 @@
+"""
+Indexed catalog of the video library (static/videos).
+
+Rows live in SQLite (data/video_catalog.sqlite). The folder is only rescanned when its
+directory mtime changes, so a library page is one indexed query instead of listdir + stat
+on every file. Duration/fps/resolution and a thumbnail are probed once per file
+(at upload, or in the background the first time a file is seen).
+"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from proxy_transcode import PROXY_DIRNAME, proxy_path
+
+CATALOG_DB = Path("data") / "video_catalog.sqlite"
+THUMB_DIRNAME = ".thumbs"
+THUMB_WIDTH = 320
+
+SORT_COLUMNS = {"name": "name", "date": "mtime", "mtime": "mtime", "size": "size", "duration": "duration"}
+
+
+def probe_video(path, thumb_path=None):
+    """Read container metadata with OpenCV and optionally write a thumbnail ~10% in."""
+    import cv2
+
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        meta = {
+            "fps": round(fps, 3) if fps else None,
+            "frames": frames or None,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0) or None,
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0) or None,
+            "duration": round(frames / fps, 3) if fps and frames else None,
+            "thumb": None,
+        }
+        if thumb_path:
+            if frames:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, frames // 10))
+            ok, frame = cap.read()
+            if ok and frame is not None:
+                h, w = frame.shape[:2]
+                scale = THUMB_WIDTH / float(w)
+                thumb = cv2.resize(frame, (THUMB_WIDTH, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+                Path(thumb_path).parent.mkdir(parents=True, exist_ok=True)
+                cv2.imwrite(str(thumb_path), thumb, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                meta["thumb"] = Path(thumb_path).name
+        return meta
+    finally:
+        cap.release()
+
+
+class VideoCatalog:
+    def __init__(self, video_dir, url_prefix="/static/videos", frame_dir="frame_cache",
+                 db_path=CATALOG_DB, exts=(".mp4", ".mov", ".webm", ".mkv")):
+        self.video_dir = Path(video_dir)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.frame_dir = Path(frame_dir)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.exts = tuple(exts)
+        self._local = threading.local()
+        self._scan_lock = threading.Lock()
+        self._dir_mtime = None
+        self._probe_pool = ThreadPoolExecutor(max_workers=1)
+        self._probing = set()
+
+        with self._conn() as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS videos (
+                            name TEXT PRIMARY KEY,
+                            size INTEGER NOT NULL,
+                            mtime INTEGER NOT NULL,
+                            duration REAL, fps REAL, frames INTEGER,
+                            width INTEGER, height INTEGER,
+                            thumb TEXT,
+                            probed INTEGER NOT NULL DEFAULT 0,
+                            analyzed INTEGER NOT NULL DEFAULT 0)""")
+            for col in ("mtime", "size", "duration", "analyzed"):
+                c.execute(f"CREATE INDEX IF NOT EXISTS idx_videos_{col} ON videos ({col})")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---------- sync with disk ----------
+    def refresh(self, force=False):
+        """Rescan the folder only if its mtime changed (files added/removed/renamed)."""
+        try:
+            dir_mtime = self.video_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and dir_mtime == self._dir_mtime:
+            return
+        with self._scan_lock:
+            if not force and dir_mtime == self._dir_mtime:
+                return
+            on_disk = {}
+            with os.scandir(self.video_dir) as it:
+                for e in it:
+                    if e.is_file() and os.path.splitext(e.name)[1].lower() in self.exts:
+                        st = e.stat()
+                        on_disk[e.name] = (st.st_size, int(st.st_mtime))
+
+            conn = self._conn()
+            known = {r["name"]: (r["size"], r["mtime"]) for r in conn.execute("SELECT name, size, mtime FROM videos")}
+            with conn:
+                gone = [n for n in known if n not in on_disk]
+                conn.executemany("DELETE FROM videos WHERE name=?", [(n,) for n in gone])
+                for name, (size, mtime) in on_disk.items():
+                    if known.get(name) != (size, mtime):
+                        conn.execute("""INSERT INTO videos (name, size, mtime, analyzed) VALUES (?, ?, ?, ?)
+                                        ON CONFLICT (name) DO UPDATE SET size=excluded.size, mtime=excluded.mtime,
+                                        probed=0""",
+                                     (name, size, mtime, int(self._is_analyzed(name))))
+            self._dir_mtime = dir_mtime
+
+        for row in self._conn().execute("SELECT name FROM videos WHERE probed=0"):
+            self.probe_async(row["name"])
+
+    def _is_analyzed(self, name):
+        return (self.frame_dir / os.path.splitext(name)[0]).is_dir()
+
+    def mark_analyzed(self, name, analyzed=True):
+        with self._conn() as c:
+            c.execute("UPDATE videos SET analyzed=? WHERE name=? OR name LIKE ?",
+                      (int(analyzed), name, f"{os.path.splitext(name)[0]}.%"))
+
+    # ---------- metadata probing ----------
+    def probe(self, name):
+        path = self.video_dir / name
+        if not path.exists():
+            return None
+        thumb = self.video_dir / THUMB_DIRNAME / f"{os.path.splitext(name)[0]}.jpg"
+        try:
+            meta = probe_video(path, thumb) or {}
+        except Exception as e:
+            print(f"⚠️ Probe failed for {name}: {e}")
+            meta = {}
+        st = path.stat()
+        with self._conn() as c:
+            c.execute("""INSERT INTO videos (name, size, mtime, duration, fps, frames, width, height, thumb, probed, analyzed)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                         ON CONFLICT (name) DO UPDATE SET size=excluded.size, mtime=excluded.mtime,
+                           duration=excluded.duration, fps=excluded.fps, frames=excluded.frames,
+                           width=excluded.width, height=excluded.height, thumb=excluded.thumb, probed=1""",
+                      (name, st.st_size, int(st.st_mtime), meta.get("duration"), meta.get("fps"), meta.get("frames"),
+                       meta.get("width"), meta.get("height"), meta.get("thumb"), int(self._is_analyzed(name))))
+        return meta
+
+    def probe_async(self, name):
+        if name in self._probing:
+            return
+        self._probing.add(name)
+
+        def run():
+            try:
+                self.probe(name)
+            finally:
+                self._probing.discard(name)
+
+        self._probe_pool.submit(run)
+
+    # ---------- queries ----------
+    def _row_to_item(self, r):
+        item = {
+            "name": r["name"],
+            "url": f"{self.url_prefix}/{r['name']}",  # direct static path
+            "size": r["size"],
+            "mtime": r["mtime"],
+            "duration": r["duration"],
+            "fps": r["fps"],
+            "width": r["width"],
+            "height": r["height"],
+            "analyzed": bool(r["analyzed"]),
+            "thumb": f"{self.url_prefix}/{THUMB_DIRNAME}/{r['thumb']}" if r["thumb"] else None,
+            "playback_url": None,
+        }
+        playback = proxy_path(self.video_dir / r["name"], "playback")
+        if playback.exists():
+            item["playback_url"] = f"{self.url_prefix}/{PROXY_DIRNAME}/{playback.name}"
+        return item
+
+    def query(self, page=1, per_page=50, sort="name", order="asc", q=None, since=None, until=None,
+              min_size=None, max_size=None, analyzed=None):
+        self.refresh()
+        where, args = [], []
+        if q:
+            where.append("name LIKE ? ESCAPE '\\'")
+            args.append("%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if since is not None:
+            where.append("mtime >= ?"); args.append(int(since))
+        if until is not None:
+            where.append("mtime <= ?"); args.append(int(until))
+        if min_size is not None:
+            where.append("size >= ?"); args.append(int(min_size))
+        if max_size is not None:
+            where.append("size <= ?"); args.append(int(max_size))
+        if analyzed is not None:
+            where.append("analyzed = ?"); args.append(int(bool(analyzed)))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        col = SORT_COLUMNS.get(sort, "name")
+        direction = "DESC" if str(order).lower() == "desc" else "ASC"
+        page = max(1, int(page))
+        per_page = max(1, min(500, int(per_page)))
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM videos {clause}", args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM videos {clause} ORDER BY {col} {direction}, name ASC LIMIT ? OFFSET ?",
+            args + [per_page, (page - 1) * per_page]).fetchall()
+        return {
+            "items": [self._row_to_item(r) for r in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page,
+        }